@@ -1,9 +1,8 @@
-from flask import Flask, render_template, request, jsonify, send_file, redirect, url_for, session
+from flask import Flask, Response, make_response, render_template, request, jsonify, send_file, redirect, url_for, session
 from flask_cors import CORS
 from functools import wraps
 import sqlite3
 import pandas as pd
-import qrcode
 import hashlib
 import secrets
 import os
@@ -15,10 +14,30 @@ from email.mime.image import MIMEImage
 from datetime import datetime
 import pytz
 import json
+import re
 from io import BytesIO
 import base64
+import zlib
+import atexit
 from cryptography.fernet import Fernet
 from dotenv import load_dotenv
+import attendance_stats
+from compression import compressor
+import database
+from database import get_db
+import jobs
+from jobs import job_runner
+from migrations import run_migrations
+from qr_render import qr_renderer
+import roster_import
+import roster_pages
+import scan_time
+import student_search
+from roster_index import roster_index
+from scan_cache import scan_cache
+from scan_events import ScanBroadcaster
+from scan_journal import ScanJournal, SCAN_WRITE_MODE, SCAN_JOURNAL_PATH
+from snapshot_cache import snapshot_cache
 
 # Try to import SendGrid (optional)
 try:
@@ -40,6 +59,7 @@ load_dotenv()
 
 app = Flask(__name__)
 CORS(app)
+compressor.init_app(app)
 
 # Configure session
 app.secret_key = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production')
@@ -56,7 +76,7 @@ def admin_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
         if not session.get('admin_authenticated'):
-            return redirect(url_for('admin_login'))
+            return redirect(url_for('admin_login', next=request.path))
         return f(*args, **kwargs)
     return decorated_function
 
@@ -69,6 +89,35 @@ def api_admin_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+# Conditional GET counters, reported by /api/metrics
+conditional_get_stats = {'not_modified': 0, 'full': 0}
+
+def data_version_etag(f):
+    """Weak ETag from the latest scan id, roster version and scan version; a
+    matching If-None-Match is answered with 304 before the view runs any queries"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        with get_db() as conn:
+            cursor = conn.cursor()
+            scan_cursor, roster_version = dashboard_cursor(cursor)
+            scans_changed = scan_version(cursor)
+        query = zlib.crc32(request.query_string) if request.query_string else 0
+        etag = f'{roster_version}-{scans_changed}-{scan_cursor}-{query:x}'
+
+        if request.if_none_match.contains_weak(etag):
+            conditional_get_stats['not_modified'] += 1
+            response = Response(status=304)
+        else:
+            conditional_get_stats['full'] += 1
+            response = make_response(f(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+        # Tagged before the view ran, so the body is never older than its tag
+        response.set_etag(etag, weak=True)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+    return decorated_function
+
 def send_email_sendgrid(to_email, subject, body, attachment_path=None, attachment_name=None):
     """Send email using SendGrid API"""
     try:
@@ -153,6 +202,13 @@ def send_email_mailtrap(to_email, subject, body, attachment_path=None, attachmen
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', secrets.token_hex(16))
 app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['QR_FOLDER'] = 'static/qr_codes'
+app.config['DATABASE'] = os.getenv('DATABASE_PATH', 'student_event.db')
+app.config['MAX_BATCH_SCANS'] = int(os.getenv('MAX_BATCH_SCANS', 1000))
+app.config['MAX_DELTA_SCANS'] = int(os.getenv('MAX_DELTA_SCANS', 500))
+
+# Shared SQLite connections (WAL mode, per-thread reuse)
+database.configure(app.config['DATABASE'])
+atexit.register(lambda: database.pool.close_all())
 
 # Create necessary directories
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
@@ -166,49 +222,12 @@ def init_db():
     """Initialize database with error handling"""
     try:
         print("🔧 Initializing database...")
-        conn = sqlite3.connect('student_event.db')
-        cursor = conn.cursor()
-
-        # Students table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS students (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                prn_number TEXT UNIQUE NOT NULL,
-                email TEXT NOT NULL,
-                qr_code_path TEXT,
-                qr_hash TEXT UNIQUE,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                email_sent BOOLEAN DEFAULT FALSE
-            )
-        ''')
-
-        # Scans table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS scans (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                student_id INTEGER,
-                scanned_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                scanner_info TEXT,
-                FOREIGN KEY (student_id) REFERENCES students (id)
-            )
-        ''')
-
-        # Events table for future extensibility
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS events (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                description TEXT,
-                event_date DATE,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                is_active BOOLEAN DEFAULT TRUE
-            )
-        ''')
-
-        conn.commit()
-        conn.close()
-        print("✅ Database initialized successfully")
+        with get_db() as conn:
+            applied = run_migrations(conn)
+        if applied:
+            print(f"✅ Database initialized successfully (schema version {applied[-1]})")
+        else:
+            print("✅ Database initialized successfully")
         return True
 
     except Exception as e:
@@ -218,6 +237,234 @@ def init_db():
 # Initialize database on startup
 init_db()
 
+# Load the in-memory roster index used by QR validation
+try:
+    roster_index.load()
+except Exception as e:
+    print(f"⚠️ Roster index not loaded, validating against the database: {str(e)}")
+
+# Live check-in fan-out for /api/scans/stream; its poller thread starts with
+# the first subscriber
+scan_events = ScanBroadcaster(lambda cursor: dashboard_counters(cursor))
+atexit.register(lambda: scan_events.stop())
+
+# Optional write-behind scan journal: check-ins are acknowledged once journaled
+# and flushed to the scans table in batches (SCAN_WRITE_MODE=journal)
+scan_journal = None
+if SCAN_WRITE_MODE == 'journal':
+    # Flushed scans reach the table after the check-in returned; wake the streams then too
+    scan_journal = ScanJournal(SCAN_JOURNAL_PATH, on_flush=lambda: scan_events.notify())
+    scan_journal.start()
+    atexit.register(lambda: scan_journal.stop())
+
+CHECK_IN_SQL = '''
+    INSERT INTO scans (student_id, scanner_info, scanned_at)
+    SELECT id, ?, ? FROM students WHERE qr_hash = ?
+    ON CONFLICT (student_id) DO NOTHING
+    RETURNING student_id,
+              (SELECT name FROM students WHERE id = scans.student_id),
+              (SELECT prn_number FROM students WHERE id = scans.student_id),
+              (SELECT email FROM students WHERE id = scans.student_id)
+'''
+
+# The other queries on hot paths; test_schema_migrations.py checks that each
+# of these (and CHECK_IN_SQL) is planned on an index
+STUDENT_BY_HASH_SQL = '''
+    SELECT id, name, prn_number, email
+    FROM students
+    WHERE qr_hash = ?
+'''
+
+RECENT_SCANS_SQL = '''
+    SELECT s.name, s.prn_number, sc.scanned_at
+    FROM students s
+    JOIN scans sc ON s.id = sc.student_id
+    ORDER BY sc.id DESC
+    LIMIT 10
+'''
+
+LATEST_SCANS_SQL = '''
+    SELECT * FROM (
+        SELECT sc.id, s.name, s.prn_number, s.email, sc.scanned_at
+        FROM scans sc
+        JOIN students s ON s.id = sc.student_id
+        ORDER BY sc.id DESC
+        LIMIT ?
+    ) ORDER BY id
+'''
+
+SCANS_AFTER_SQL = '''
+    SELECT sc.id, s.name, s.prn_number, s.email, sc.scanned_at
+    FROM scans sc
+    JOIN students s ON s.id = sc.student_id
+    WHERE sc.id > ?
+    ORDER BY sc.id
+    LIMIT ?
+'''
+
+ROSTER_STATUS_SQL = '''
+    SELECT s.name, s.prn_number, s.email,
+           CASE WHEN sc.id IS NOT NULL THEN 'Scanned' ELSE 'Pending' END as status,
+           sc.scanned_at
+    FROM students s
+    LEFT JOIN scans sc ON s.id = sc.student_id
+    ORDER BY s.name
+'''
+
+ARRIVALS_RANGE_SQL = 'SELECT MIN(scanned_at), MAX(scanned_at) FROM scans'
+
+ARRIVAL_BUCKETS_SQL = '''
+    SELECT (scanned_at + ?) / ? * ? - ? AS bucket_start, COUNT(*)
+    FROM scans
+    WHERE scanned_at >= ? AND scanned_at < ?
+    GROUP BY bucket_start
+'''
+
+ARRIVALS_BEFORE_SQL = 'SELECT COUNT(*) FROM scans WHERE scanned_at < ?'
+
+EMAIL_QUEUE_SQL = '''
+    SELECT id, name, prn_number, email, qr_code_path
+    FROM students
+    WHERE qr_code_path IS NOT NULL AND email_sent = FALSE
+'''
+
+QR_QUEUE_SQL = 'SELECT id, prn_number FROM students WHERE qr_code_path IS NULL'
+
+def check_in_batch(scans):
+    """Record first scans for a list of (qr_hash, scanner_info, scanned_at) in one transaction
+
+    Returns one (student, first_scan) per input, in input order, where student
+    is (id, name, prn_number, email) or None for an unknown QR code. When the
+    same code appears more than once, the earliest scanned_at wins.
+    """
+    results = [None] * len(scans)
+
+    # Repeats of a badge admitted moments ago are answered before anything else
+    remaining = []
+    for position, (qr_hash, _, _) in enumerate(scans):
+        student = scan_cache.get(qr_hash)
+        if student is None:
+            remaining.append(position)
+        else:
+            results[position] = (student, False)
+    if not remaining:
+        return results
+
+    # Answer unknown and already-scanned codes from memory when the index is current
+    try:
+        roster_index.ensure_fresh()
+        use_index = True
+    except sqlite3.Error as e:
+        print(f"⚠️ Roster index unavailable: {str(e)}")
+        use_index = False
+
+    pending = []
+    claimed = set()
+    for position in sorted(remaining, key=lambda p: scans[p][2]):
+        qr_hash, scanner_info, scanned_at = scans[position]
+        if not use_index:
+            pending.append((position, None, qr_hash, scanner_info, scanned_at))
+            continue
+
+        entry = roster_index.lookup(qr_hash)
+        if entry is None:
+            roster_index.count('invalid')
+            results[position] = (None, False)
+        elif entry[1] or qr_hash in claimed:
+            roster_index.count('already_scanned')
+            results[position] = (entry[0], False)
+        else:
+            claimed.add(qr_hash)
+            pending.append((position, entry[0], qr_hash, scanner_info, scanned_at))
+
+    if not pending:
+        remember_checked_in(scans, results, remaining)
+        return results
+
+    if use_index and scan_journal:
+        first_scans = scan_journal.record_many([
+            (student, qr_hash, scanner_info, scanned_at)
+            for _, student, qr_hash, scanner_info, scanned_at in pending
+        ])
+        for (position, student, _, _, _), first_scan in zip(pending, first_scans):
+            results[position] = (student, first_scan)
+        if any(first_scans):
+            scan_events.notify()
+        remember_checked_in(scans, results, remaining)
+        return results
+
+    checked_in = []
+    with get_db() as conn:
+        for position, student, qr_hash, scanner_info, scanned_at in pending:
+            # The unique index on scans.student_id makes concurrent gates race safely:
+            # only one INSERT wins, the others hit the conflict and return no row
+            rows = conn.execute(CHECK_IN_SQL, (scanner_info, scanned_at, qr_hash)).fetchall()
+            if rows:
+                results[position] = (rows[0], True)
+                checked_in.append(qr_hash)
+                continue
+
+            # Nothing inserted: either an unknown code or an earlier scan exists
+            if student is None:
+                student = conn.execute(STUDENT_BY_HASH_SQL, (qr_hash,)).fetchone()
+            if student:
+                checked_in.append(qr_hash)
+            results[position] = (student, False)
+        conn.commit()
+
+    for qr_hash in checked_in:
+        roster_index.mark_checked_in(qr_hash)
+    if any(first_scan for _, first_scan in results):
+        scan_events.notify()
+    remember_checked_in(scans, results, remaining)
+    return results
+
+def remember_checked_in(scans, results, positions):
+    """Cache known codes answered outside the cache; their next scan is a repeat
+
+    Cache hits are not re-added, so an entry expires TTL after the scan that
+    last checked the database however often the badge keeps arriving.
+    """
+    for position in positions:
+        student = results[position][0]
+        if student:
+            scan_cache.put(scans[position][0], student)
+
+def check_in_student(qr_hash, scanner_info):
+    """Record a student's first scan in one atomic statement
+
+    Returns (student, first_scan) where student is (id, name, prn_number, email),
+    or (None, False) when the QR code is unknown.
+    """
+    return check_in_batch([(qr_hash, scanner_info, scan_time.now_ms())])[0]
+
+def scan_result(qr_hash, student, first_scan):
+    """Per-code response body shared by the batch and sync endpoints"""
+    if not student:
+        return {'qr_hash': qr_hash, 'valid': False, 'message': 'Invalid QR code'}
+    student_id, name, prn_number, email = student
+    if first_scan:
+        return {
+            'qr_hash': qr_hash,
+            'valid': True,
+            'message': 'QR code scanned successfully',
+            'student': {'name': name, 'prn': prn_number, 'email': email}
+        }
+    return {
+        'qr_hash': qr_hash,
+        'valid': False,
+        'message': 'QR code already scanned',
+        'student': {'name': name, 'prn': prn_number}
+    }
+
+def summarize_scan_results(results):
+    return {
+        'total': len(results),
+        'admitted': sum(1 for r in results if r['valid']),
+        'already_scanned': sum(1 for r in results if r['message'] == 'QR code already scanned'),
+        'invalid': sum(1 for r in results if not r['valid'] and r['message'] != 'QR code already scanned')
+    }
+
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -231,6 +478,10 @@ def admin_login():
 
         if password == admin_password:
             session['admin_authenticated'] = True
+            # Back to the page that asked for the login; local paths only
+            next_page = request.args.get('next', '')
+            if next_page.startswith('/') and not next_page.startswith('//'):
+                return redirect(next_page)
             return redirect(url_for('admin'))
         else:
             return render_template('admin_login.html', error='Invalid password')
@@ -248,6 +499,7 @@ def admin():
     return render_template('admin.html')
 
 @app.route('/scanner')
+@admin_required
 def scanner():
     return render_template('scanner.html')
 
@@ -260,20 +512,10 @@ def dashboard():
 def validate_qr_url(qr_hash):
     """Handle QR code validation via URL (for external scanners like Google Lens)"""
     try:
-        conn = sqlite3.connect('student_event.db')
-        cursor = conn.cursor()
-
-        # Check if QR code exists and get student info
-        cursor.execute('''
-            SELECT s.id, s.name, s.prn_number, s.email
-            FROM students s
-            WHERE s.qr_hash = ?
-        ''', (qr_hash,))
-
-        student = cursor.fetchone()
+        scanner_info = request.headers.get('User-Agent', 'External Scanner')
+        student, first_scan = check_in_student(qr_hash, scanner_info)
 
         if not student:
-            conn.close()
             return render_template('qr_result.html',
                                  success=False,
                                  message='Invalid QR code',
@@ -281,28 +523,12 @@ def validate_qr_url(qr_hash):
 
         student_id, name, prn_number, email = student
 
-        # Check if already scanned
-        cursor.execute('SELECT id FROM scans WHERE student_id = ?', (student_id,))
-        existing_scan = cursor.fetchone()
-
-        if existing_scan:
-            conn.close()
+        if not first_scan:
             return render_template('qr_result.html',
                                  success=False,
                                  message='QR code already scanned',
                                  student={'name': name, 'prn': prn_number, 'email': email})
 
-        # Record the scan with IST time
-        scanner_info = request.headers.get('User-Agent', 'External Scanner')
-        ist_time = get_ist_time().strftime('%Y-%m-%d %H:%M:%S IST')
-        cursor.execute('''
-            INSERT INTO scans (student_id, scanner_info, scanned_at)
-            VALUES (?, ?, ?)
-        ''', (student_id, scanner_info, ist_time))
-
-        conn.commit()
-        conn.close()
-
         return render_template('qr_result.html',
                              success=True,
                              message='QR code scanned successfully',
@@ -314,7 +540,44 @@ def validate_qr_url(qr_hash):
                              message=f'Error: {str(e)}',
                              student=None)
 
+def start_job(kind, work, message):
+    """Run a view-style work(progress) in the background and answer 202 with
+    the job to poll; its JSON body becomes the job result"""
+    def run(progress):
+        with app.app_context():
+            response = make_response(work(progress))
+        body = response.get_json()
+        if response.status_code >= 400:
+            raise jobs.JobFailed(body.get('error', f'{kind} failed'), body)
+        return body
+
+    try:
+        job_id = job_runner.submit(kind, run)
+    except jobs.JobBusy as e:
+        return jsonify({
+            'error': 'This task is already running; wait for it to finish',
+            'job_id': e.job_id,
+            'status_url': url_for('job_status', job_id=e.job_id)
+        }), 409
+    except jobs.JobQueueFull as e:
+        return jsonify({'error': f'Too many background tasks, try again shortly ({e})'}), 503
+
+    return jsonify({
+        'success': True,
+        'message': message,
+        'job_id': job_id,
+        'status_url': url_for('job_status', job_id=job_id)
+    }), 202
+
 # API Routes
+# Names upload_filename gives saved rosters; a re-import may only be applied to one of these
+UPLOAD_NAME = re.compile(r'students_\d{8}_\d{6}_[0-9a-f]{8}\.\w+')
+
+def upload_filename(original):
+    """Name to save an uploaded roster under; the random part keeps two uploads
+    in the same second from overwriting each other"""
+    return f"students_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{secrets.token_hex(4)}.{original.split('.')[-1]}"
+
 @app.route('/api/upload_students', methods=['POST'])
 @api_admin_required
 def upload_students():
@@ -327,135 +590,283 @@ def upload_students():
             return jsonify({'error': 'No file selected'}), 400
 
         # Save uploaded file
-        filename = f"students_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{file.filename.split('.')[-1]}"
+        filename = upload_filename(file.filename)
         filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
         file.save(filepath)
 
-        # Process the file
-        try:
-            if filename.endswith('.csv'):
-                df = pd.read_csv(filepath)
-            else:
-                df = pd.read_excel(filepath)
-        except Exception as e:
-            return jsonify({'error': f'Error reading file: {str(e)}'}), 400
+        return start_job('upload_students', lambda progress: import_roster(filepath, progress),
+                         f'Importing {file.filename}')
 
-        # Validate required columns
-        required_columns = ['Student Name', 'PRN Number', 'Email Address']
-        missing_columns = [col for col in required_columns if col not in df.columns]
-        if missing_columns:
-            return jsonify({'error': f'Missing required columns: {missing_columns}'}), 400
+    except Exception as e:
+        return jsonify({'error': f'Server error: {str(e)}'}), 500
 
-        # Insert students into database
-        conn = sqlite3.connect('student_event.db')
-        cursor = conn.cursor()
+def validation_message(counts):
+    """What validation left out of or fixed in a sheet, for the upload's message"""
+    message = ''
+    if counts['rejected']:
+        reasons = [f"{counts[key]} {label}" for key, label in (
+            ('missing_values', 'missing a name, PRN or email'),
+            ('invalid_prn', 'with an invalid PRN'),
+            ('invalid_email', 'with an invalid email'),
+        ) if counts[key]]
+        message += f" {counts['rejected']} rows rejected ({', '.join(reasons)}); see rejected_rows."
+    if counts['prns_coerced']:
+        message += f" {counts['prns_coerced']} PRNs stored as numbers were converted back to digits."
+    return message
+
+def import_roster(filepath, progress=jobs.NO_PROGRESS):
+    """Parse and insert a saved upload in fixed-size chunks, each in its own transaction"""
+    try:
+        filename = os.path.basename(filepath)
+        # Streamed CSV and .xlsx chunks report how far into the file they are; .xls only counts rows
+        total = roster_import.progress_total(filepath)
+        progress.set_total(total, unit='bytes' if total is not None else 'rows')
 
-        inserted_count = 0
-        duplicate_count = 0
+        def log_progress(counts, position):
+            progress.update(position if position is not None else counts['rows'])
+            done = f' ({position * 100 // total}%)' if position and total else ''
+            print(f"📥 {filename}: {counts['rows']} rows read, {counts['inserted']} inserted{done}")
 
-        for _, row in df.iterrows():
-            try:
-                cursor.execute('''
-                    INSERT INTO students (name, prn_number, email)
-                    VALUES (?, ?, ?)
-                ''', (row['Student Name'], row['PRN Number'], row['Email Address']))
-                inserted_count += 1
-            except sqlite3.IntegrityError:
-                duplicate_count += 1
+        try:
+            with get_db() as conn:
+                counts = roster_import.import_file(conn, filepath, progress=log_progress)
+                roster_import.record_import(conn, roster_import.file_hash(filepath), filename, 'append', counts)
+                conn.commit()
+        except roster_import.RosterSchemaError as e:
+            # Chunks before the bad row are already in; re-uploading the fixed
+            # file skips them as already registered
+            roster_index.load()
+            return jsonify({
+                'error': str(e),
+                'row': e.row,
+                'inserted': e.counts['inserted'] if e.counts else 0
+            }), 400
+        except Exception as e:
+            return jsonify({'error': f'Error reading file: {str(e)}'}), 400
 
-        conn.commit()
-        conn.close()
+        roster_index.load()
 
+        message = (f"Successfully uploaded {counts['inserted']} students. {counts['duplicates']} duplicates skipped "
+                   f"({counts['duplicates_in_file']} repeated in the file, {counts['duplicates_in_db']} already registered).")
+        message += validation_message(counts)
         return jsonify({
             'success': True,
-            'message': f'Successfully uploaded {inserted_count} students. {duplicate_count} duplicates skipped.',
-            'inserted': inserted_count,
-            'duplicates': duplicate_count
+            'message': message,
+            **counts
         })
 
     except Exception as e:
         return jsonify({'error': f'Server error: {str(e)}'}), 500
 
+@app.route('/api/roster/reimport', methods=['POST'])
+@api_admin_required
+def reimport_students():
+    """Upload an updated roster and preview how it differs; nothing is written yet"""
+    try:
+        if 'file' not in request.files:
+            return jsonify({'error': 'No file uploaded'}), 400
+
+        file = request.files['file']
+        if file.filename == '':
+            return jsonify({'error': 'No file selected'}), 400
+
+        filename = upload_filename(file.filename)
+        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+        file.save(filepath)
+
+        force = request.form.get('force') == '1'
+        return start_job('upload_students', lambda progress: preview_reimport(filepath, force),
+                         f'Comparing {file.filename} with the roster')
+
+    except Exception as e:
+        return jsonify({'error': f'Server error: {str(e)}'}), 500
+
+def preview_reimport(filepath, force=False):
+    """Diff a saved upload against the students table; identical to the last applied re-import is skipped"""
+    try:
+        content_hash = roster_import.file_hash(filepath)
+        with get_db() as conn:
+            # Only a re-import applies names, emails and removals; an appending
+            # upload of the same file since then may have left all of those out
+            previous = roster_import.last_import(conn)
+            if (previous and previous['mode'] == 'reimport' and previous['content_hash'] == content_hash
+                    and not force):
+                return jsonify({
+                    'success': True,
+                    'skipped': True,
+                    'message': f"This file is identical to the last roster re-imported ({previous['filename']} "
+                               f"at {previous['imported_at']}); nothing to do."
+                })
+            rows, counts = roster_import.read_roster(filepath)
+            if scan_journal:
+                scan_journal.drain()
+            diff = roster_import.diff_roster(conn, rows)
+    except roster_import.RosterSchemaError as e:
+        return jsonify({'error': str(e), 'row': e.row}), 400
+    except Exception as e:
+        return jsonify({'error': f'Error reading file: {str(e)}'}), 400
+
+    counts.update(roster_import.diff_counts(diff))
+    message = (f"{counts['new']} new, {counts['changed']} changed, {counts['missing']} no longer listed "
+               f"and {counts['unchanged']} unchanged students.")
+    if counts['kept_checked_in']:
+        message += f" {counts['kept_checked_in']} of those no longer listed have checked in and will be kept."
+    message += validation_message(counts)
+    return jsonify({
+        'success': True,
+        'preview': True,
+        'message': message,
+        'upload_id': os.path.basename(filepath),
+        'changes': roster_import.diff_sample(diff),
+        **counts
+    })
+
+@app.route('/api/roster/reimport/apply', methods=['POST'])
+@api_admin_required
+def apply_reimport():
+    """Apply a previewed re-import: {upload_id, expected: {new, changed, missing}, remove_missing}"""
+    data = request.get_json(silent=True) or {}
+    upload_id = str(data.get('upload_id', ''))
+    filepath = os.path.join(app.config['UPLOAD_FOLDER'], upload_id)
+    # Only files this app saved, never a path chosen by the client
+    if not UPLOAD_NAME.fullmatch(upload_id) or not os.path.isfile(filepath):
+        return jsonify({'error': 'Unknown upload; preview the file again'}), 404
+
+    expected = data.get('expected')
+    if expected is not None and not (
+            isinstance(expected, dict) and
+            all(type(expected.get(key)) is int for key in ('new', 'changed', 'missing'))):
+        return jsonify({'error': 'expected must hold whole-number new, changed and missing counts'}), 400
+    remove_missing = data.get('remove_missing', True)
+    if not isinstance(remove_missing, bool):
+        return jsonify({'error': 'remove_missing must be true or false'}), 400
+    return start_job('upload_students',
+                     lambda progress: apply_roster_changes(filepath, expected, remove_missing),
+                     'Applying roster changes')
+
+def apply_roster_changes(filepath, expected=None, remove_missing=True):
+    try:
+        rows, counts = roster_import.read_roster(filepath)
+        # Who has checked in is read from scans, so journaled check-ins go in first
+        if scan_journal:
+            scan_journal.drain()
+        with get_db() as conn:
+            counts.update(roster_import.apply_reimport(
+                conn, rows, roster_import.file_hash(filepath), os.path.basename(filepath),
+                expected=expected, remove_missing=remove_missing))
+    except roster_import.RosterChangedError as e:
+        return jsonify({'error': str(e)}), 409
+    except roster_import.RosterSchemaError as e:
+        return jsonify({'error': str(e), 'row': e.row}), 400
+
+    roster_index.load()
+    for qr_path in counts.pop('removed_qr_paths'):
+        try:
+            os.remove(qr_path)
+        except OSError:
+            pass
+
+    message = (f"Roster updated: {counts['inserted']} added, {counts['updated']} updated, "
+               f"{counts['removed']} removed.")
+    if remove_missing and counts['kept_checked_in']:
+        message += f" {counts['kept_checked_in']} students no longer listed were kept because they have checked in."
+    return jsonify({
+        'success': True,
+        'message': message,
+        **counts
+    })
+
+def qr_base_url():
+    """Host (and port) the QR links point at, prioritising external URLs"""
+    base_url = os.environ.get('EXTERNAL_URL') or os.environ.get('RENDER_EXTERNAL_URL')
+
+    if not base_url:
+        # Try to detect different hosting environments
+        if 'RENDER' in os.environ:
+            # On Render, try to construct URL from service name
+            service_name = os.environ.get('RENDER_SERVICE_NAME', 'depalievent')
+            base_url = f"{service_name}.onrender.com"
+        elif 'PTERODACTYL' in os.environ or os.environ.get('SERVER_PORT'):
+            # Pterodactyl environment - use configured external URL
+            pterodactyl_url = os.environ.get('PTERODACTYL_URL', 'ryzen9.darknetwork.fun:25575')
+            base_url = pterodactyl_url
+        else:
+            # For local development, use the network IP address
+            try:
+                hostname = socket.gethostname()
+                local_ip = socket.gethostbyname(hostname)
+                base_url = f"{local_ip}:5000"
+            except:
+                base_url = "192.168.1.34:5000"  # Fallback to Flask IP
+
+    # Remove protocol if present in environment variable
+    if base_url.startswith('http://') or base_url.startswith('https://'):
+        base_url = base_url.split('://', 1)[1]
+    return base_url
+
 @app.route('/api/generate_qr_codes', methods=['POST'])
 @api_admin_required
 def generate_qr_codes():
+    return start_job('generate_qr_codes', generate_missing_qr_codes, 'Generating QR codes')
+
+def generate_missing_qr_codes(progress=jobs.NO_PROGRESS):
     try:
-        conn = sqlite3.connect('student_event.db')
-        cursor = conn.cursor()
+        with get_db() as conn:
+            cursor = conn.cursor()
 
-        # Get students without QR codes
-        cursor.execute('SELECT id, prn_number FROM students WHERE qr_code_path IS NULL')
-        students = cursor.fetchall()
+            # Get students without QR codes
+            cursor.execute(QR_QUEUE_SQL)
+            students = cursor.fetchall()
 
-        if not students:
-            return jsonify({'message': 'No students found without QR codes'}), 200
+            if not students:
+                return jsonify({'message': 'No students found without QR codes'}), 200
 
-        generated_count = 0
+            progress.set_total(len(students))
 
-        for student_id, prn_number in students:
-            # Generate secure hash for QR code
-            secret_key = app.config['SECRET_KEY']
-            qr_data = f"{prn_number}:{secret_key}:{datetime.now().isoformat()}"
-            qr_hash = hashlib.sha256(qr_data.encode()).hexdigest()
-
-            # Create QR code with a URL that includes the hash
-            # This makes it more user-friendly when scanned with external apps
-            # Get base URL for QR codes - prioritize external URLs
-            base_url = os.environ.get('EXTERNAL_URL') or os.environ.get('RENDER_EXTERNAL_URL')
-
-            if not base_url:
-                # Try to detect different hosting environments
-                if 'RENDER' in os.environ:
-                    # On Render, try to construct URL from service name
-                    service_name = os.environ.get('RENDER_SERVICE_NAME', 'depalievent')
-                    base_url = f"{service_name}.onrender.com"
-                elif 'PTERODACTYL' in os.environ or os.environ.get('SERVER_PORT'):
-                    # Pterodactyl environment - use configured external URL
-                    pterodactyl_url = os.environ.get('PTERODACTYL_URL', 'ryzen9.darknetwork.fun:25575')
-                    base_url = pterodactyl_url
-                else:
-                    # For local development, use the network IP address
-                    try:
-                        import socket
-                        hostname = socket.gethostname()
-                        local_ip = socket.gethostbyname(hostname)
-                        base_url = f"{local_ip}:5000"
-                    except:
-                        base_url = "192.168.1.34:5000"  # Fallback to Flask IP
-
-            # Remove protocol if present in environment variable
-            if base_url.startswith('http://') or base_url.startswith('https://'):
-                base_url = base_url.split('://', 1)[1]
+            # Same host for every link, so it is worked out once
+            base_url = qr_base_url()
             protocol = 'https' if 'onrender.com' in base_url or 'railway.app' in base_url else 'http'
-            qr_url = f"{protocol}://{base_url}/validate/{qr_hash}"
-
-            # Create QR code
-            qr = qrcode.QRCode(version=1, box_size=10, border=5)
-            qr.add_data(qr_url)
-            qr.make(fit=True)
-
-            # Generate QR code image
-            qr_img = qr.make_image(fill_color="black", back_color="white")
-            qr_filename = f"qr_{prn_number}_{student_id}.png"
-            qr_path = os.path.join(app.config['QR_FOLDER'], qr_filename)
-            qr_img.save(qr_path)
+            secret_key = app.config['SECRET_KEY']
 
-            # Update database
-            cursor.execute('''
+            # Tokens are made here; the render workers only see each URL and file path
+            tokens = []
+            for student_id, prn_number in students:
+                qr_data = f"{prn_number}:{secret_key}:{datetime.now().isoformat()}"
+                qr_hash = hashlib.sha256(qr_data.encode()).hexdigest()
+                qr_path = os.path.join(app.config['QR_FOLDER'], f"qr_{prn_number}_{student_id}.png")
+                tokens.append((student_id, prn_number, qr_hash, qr_path))
+
+            def rendered(count, failures):
+                for index, error in failures.items():
+                    print(f"Failed to generate QR code for {tokens[index][1]}: {error}")
+                    progress.fail(tokens[index][1], error)
+                progress.advance(count - len(failures))
+
+            # The URL includes the hash, so external scanner apps open the validation page
+            failures = qr_renderer.render(
+                [(f"{protocol}://{base_url}/validate/{qr_hash}", qr_path) for _, _, qr_hash, qr_path in tokens],
+                rendered)
+
+            cursor.executemany('''
                 UPDATE students
                 SET qr_code_path = ?, qr_hash = ?
                 WHERE id = ?
-            ''', (qr_path, qr_hash, student_id))
+            ''', [(qr_path, qr_hash, student_id)
+                  for index, (student_id, _, qr_hash, qr_path) in enumerate(tokens) if index not in failures])
+            conn.commit()
+            generated_count = len(tokens) - len(failures)
 
-            generated_count += 1
-
-        conn.commit()
-        conn.close()
+        roster_index.load()
 
+        failed_count = len(students) - generated_count
+        message = f'Generated QR codes for {generated_count} students'
+        if failed_count:
+            message += f' ({failed_count} failed)'
         return jsonify({
             'success': True,
-            'message': f'Generated QR codes for {generated_count} students',
-            'generated': generated_count
+            'message': message,
+            'generated': generated_count,
+            'failed': failed_count
         })
 
     except Exception as e:
@@ -464,6 +875,14 @@ def generate_qr_codes():
 @app.route('/api/send_emails', methods=['POST'])
 @api_admin_required
 def send_emails():
+    configured = ((os.getenv('EMAIL_ADDRESS') and os.getenv('EMAIL_PASSWORD'))
+                  or (MAILTRAP_AVAILABLE and os.getenv('MAILTRAP_API_KEY'))
+                  or (SENDGRID_AVAILABLE and os.getenv('SENDGRID_API_KEY')))
+    if not configured:
+        return jsonify({'error': 'No email service configured. Please set up SMTP, Mailtrap, or SendGrid credentials.'}), 400
+    return start_job('send_emails', send_pending_emails, 'Sending emails')
+
+def send_pending_emails(progress=jobs.NO_PROGRESS):
     try:
         # Check available email services
         use_smtp = os.getenv('EMAIL_ADDRESS') and os.getenv('EMAIL_PASSWORD')
@@ -474,36 +893,36 @@ def send_emails():
         if use_smtp:
             print("Using Google SMTP for email sending (Render compatible)")
             try:
-                return send_emails_smtp()
+                return send_emails_smtp(progress)
             except Exception as smtp_error:
                 print(f"SMTP failed: {str(smtp_error)}, falling back to Mailtrap")
                 if use_mailtrap:
-                    return send_emails_mailtrap()
+                    return send_emails_mailtrap(progress)
                 elif use_sendgrid:
-                    return send_emails_sendgrid()
+                    return send_emails_sendgrid(progress)
                 else:
                     raise smtp_error
         elif use_mailtrap:
             print("Using Mailtrap for email sending")
             try:
-                result = send_emails_mailtrap()
+                result = send_emails_mailtrap(progress)
                 # Check if Mailtrap failed due to recipient restrictions
                 if result[1] == 500:  # If Mailtrap failed
                     result_data = result[0].get_json()
                     if 'Demo domains can only be used' in result_data.get('error', ''):
                         print("Mailtrap failed due to demo domain restrictions, falling back to SendGrid")
                         if use_sendgrid:
-                            return send_emails_sendgrid()
+                            return send_emails_sendgrid(progress)
                 return result
             except Exception as mailtrap_error:
                 print(f"Mailtrap failed: {str(mailtrap_error)}, falling back to SendGrid")
                 if use_sendgrid:
-                    return send_emails_sendgrid()
+                    return send_emails_sendgrid(progress)
                 else:
                     raise mailtrap_error
         elif use_sendgrid:
             print("Using SendGrid for email sending")
-            return send_emails_sendgrid()
+            return send_emails_sendgrid(progress)
         else:
             return jsonify({'error': 'No email service configured. Please set up SMTP, Mailtrap, or SendGrid credentials.'}), 400
 
@@ -511,27 +930,33 @@ def send_emails():
         print(f"Email sending error: {str(e)}")
         return jsonify({'error': f'Email sending failed: {str(e)}'}), 500
 
-def send_emails_sendgrid():
+def mark_emails_sent(student_ids):
+    """Flag students whose QR email went out"""
+    if not student_ids:
+        return
+    with get_db() as conn:
+        conn.executemany('UPDATE students SET email_sent = TRUE WHERE id = ?',
+                         [(student_id,) for student_id in student_ids])
+        conn.commit()
+
+def send_emails_sendgrid(progress=jobs.NO_PROGRESS):
     """Send emails using SendGrid API"""
     try:
-        conn = sqlite3.connect('student_event.db')
-        cursor = conn.cursor()
-
         # Get students with QR codes but emails not sent
-        cursor.execute('''
-            SELECT id, name, prn_number, email, qr_code_path
-            FROM students
-            WHERE qr_code_path IS NOT NULL AND email_sent = FALSE
-        ''')
-        students = cursor.fetchall()
+        with get_db() as conn:
+            cursor = conn.cursor()
+            cursor.execute(EMAIL_QUEUE_SQL)
+            students = cursor.fetchall()
 
         print(f"Found {len(students)} students to send emails to")
+        progress.set_total(len(students))
 
         if not students:
             return jsonify({'message': 'No students found to send emails to. Make sure QR codes are generated first.'}), 200
 
         sent_count = 0
         failed_count = 0
+        sent_ids = []
 
         event_name = os.getenv('EVENT_NAME', 'Student Event')
         event_date = os.getenv('EVENT_DATE', 'TBD')
@@ -545,6 +970,7 @@ def send_emails_sendgrid():
                 if not os.path.exists(qr_path):
                     print(f"QR code file not found: {qr_path}")
                     failed_count += 1
+                    progress.fail(email, 'QR code file not found')
                     continue
 
                 # Email body
@@ -603,18 +1029,21 @@ Event Management Team
 
                 if success:
                     print(f"Email sent successfully to {email}")
-                    cursor.execute('UPDATE students SET email_sent = TRUE WHERE id = ?', (student_id,))
+                    sent_ids.append(student_id)
                     sent_count += 1
+                    progress.advance()
                 else:
                     print(f"Failed to send email to {email}: {message}")
                     failed_count += 1
+                    progress.fail(email, message)
 
             except Exception as e:
                 print(f"Failed to send email to {email}: {str(e)}")
                 failed_count += 1
+                progress.fail(email, e)
 
-        conn.commit()
-        conn.close()
+        # Update database
+        mark_emails_sent(sent_ids)
 
         return jsonify({
             'success': True,
@@ -626,34 +1055,26 @@ Event Management Team
 
     except Exception as e:
         print(f"SendGrid email sending error: {str(e)}")
-        if 'conn' in locals():
-            try:
-                conn.close()
-            except:
-                pass
         return jsonify({'error': f'SendGrid email sending failed: {str(e)}'}), 500
 
-def send_emails_mailtrap():
+def send_emails_mailtrap(progress=jobs.NO_PROGRESS):
     """Send emails using Mailtrap API"""
     try:
-        conn = sqlite3.connect('student_event.db')
-        cursor = conn.cursor()
-
         # Get students with QR codes but emails not sent
-        cursor.execute('''
-            SELECT id, name, prn_number, email, qr_code_path
-            FROM students
-            WHERE qr_code_path IS NOT NULL AND email_sent = FALSE
-        ''')
-        students = cursor.fetchall()
+        with get_db() as conn:
+            cursor = conn.cursor()
+            cursor.execute(EMAIL_QUEUE_SQL)
+            students = cursor.fetchall()
 
         print(f"Found {len(students)} students to send emails to")
+        progress.set_total(len(students))
 
         if not students:
             return jsonify({'message': 'No students found to send emails to. Make sure QR codes are generated first.'}), 200
 
         sent_count = 0
         failed_count = 0
+        sent_ids = []
 
         event_name = os.getenv('EVENT_NAME', 'Student Event')
         event_date = os.getenv('EVENT_DATE', 'TBD')
@@ -667,6 +1088,7 @@ def send_emails_mailtrap():
                 if not os.path.exists(qr_path):
                     print(f"QR code file not found: {qr_path}")
                     failed_count += 1
+                    progress.fail(email, 'QR code file not found')
                     continue
 
                 # Email body
@@ -725,18 +1147,21 @@ Event Management Team
 
                 if success:
                     print(f"Email sent successfully to {email}")
-                    cursor.execute('UPDATE students SET email_sent = TRUE WHERE id = ?', (student_id,))
+                    sent_ids.append(student_id)
                     sent_count += 1
+                    progress.advance()
                 else:
                     print(f"Failed to send email to {email}: {message}")
                     failed_count += 1
+                    progress.fail(email, message)
 
             except Exception as e:
                 print(f"Failed to send email to {email}: {str(e)}")
                 failed_count += 1
+                progress.fail(email, e)
 
-        conn.commit()
-        conn.close()
+        # Update database
+        mark_emails_sent(sent_ids)
 
         return jsonify({
             'success': True,
@@ -748,14 +1173,9 @@ Event Management Team
 
     except Exception as e:
         print(f"Mailtrap email sending error: {str(e)}")
-        if 'conn' in locals():
-            try:
-                conn.close()
-            except:
-                pass
         return jsonify({'error': f'Mailtrap email sending failed: {str(e)}'}), 500
 
-def send_emails_smtp():
+def send_emails_smtp(progress=jobs.NO_PROGRESS):
     """Send emails using SMTP (original method)"""
     try:
         # Email configuration from environment
@@ -769,24 +1189,21 @@ def send_emails_smtp():
         if not email_address or not email_password:
             return jsonify({'error': 'Email configuration not found. Please check environment variables'}), 400
 
-        conn = sqlite3.connect('student_event.db')
-        cursor = conn.cursor()
-
         # Get students with QR codes but emails not sent
-        cursor.execute('''
-            SELECT id, name, prn_number, email, qr_code_path
-            FROM students
-            WHERE qr_code_path IS NOT NULL AND email_sent = FALSE
-        ''')
-        students = cursor.fetchall()
+        with get_db() as conn:
+            cursor = conn.cursor()
+            cursor.execute(EMAIL_QUEUE_SQL)
+            students = cursor.fetchall()
 
         print(f"Found {len(students)} students to send emails to")
+        progress.set_total(len(students))
 
         if not students:
             return jsonify({'message': 'No students found to send emails to. Make sure QR codes are generated first.'}), 200
 
         sent_count = 0
         failed_count = 0
+        sent_ids = []
         server = None
 
         try:
@@ -855,6 +1272,7 @@ def send_emails_smtp():
                 if not os.path.exists(qr_path):
                     print(f"QR code file not found: {qr_path}")
                     failed_count += 1
+                    progress.fail(email, 'QR code file not found')
                     continue
 
                 # Create email message
@@ -920,19 +1338,21 @@ Event Management Team
                 except Exception as e:
                     print(f"Failed to attach QR code for {email}: {str(e)}")
                     failed_count += 1
+                    progress.fail(email, f'Could not attach QR code: {e}')
                     continue
 
                 # Send email
                 server.send_message(msg)
                 print(f"Email sent successfully to {email}")
 
-                # Update database
-                cursor.execute('UPDATE students SET email_sent = TRUE WHERE id = ?', (student_id,))
+                sent_ids.append(student_id)
                 sent_count += 1
+                progress.advance()
 
             except Exception as e:
                 print(f"Failed to send email to {email}: {str(e)}")
                 failed_count += 1
+                progress.fail(email, e)
 
         # Clean up
         if server:
@@ -941,8 +1361,8 @@ Event Management Team
             except:
                 pass
 
-        conn.commit()
-        conn.close()
+        # Update database
+        mark_emails_sent(sent_ids)
 
         return jsonify({
             'success': True,
@@ -954,17 +1374,12 @@ Event Management Team
 
     except Exception as e:
         print(f"Email sending error: {str(e)}")
-        # Make sure to clean up connections
+        # Make sure to clean up the SMTP connection
         if 'server' in locals() and server:
             try:
                 server.quit()
             except:
                 pass
-        if 'conn' in locals():
-            try:
-                conn.close()
-            except:
-                pass
         return jsonify({'error': f'Email sending failed: {str(e)}'}), 500
 
 @app.route('/api/test_email_config', methods=['GET'])
@@ -1142,45 +1557,21 @@ def validate_qr():
         if not qr_hash:
             return jsonify({'error': 'QR hash is required'}), 400
 
-        conn = sqlite3.connect('student_event.db')
-        cursor = conn.cursor()
-
-        # Check if QR code exists and is valid
-        cursor.execute('''
-            SELECT s.id, s.name, s.prn_number, s.email
-            FROM students s
-            WHERE s.qr_hash = ?
-        ''', (qr_hash,))
-
-        student = cursor.fetchone()
+        scanner_info = request.headers.get('User-Agent', 'Unknown')
+        student, first_scan = check_in_student(qr_hash, scanner_info)
 
         if not student:
             return jsonify({'valid': False, 'message': 'Invalid QR code'}), 400
 
         student_id, name, prn_number, email = student
 
-        # Check if already scanned
-        cursor.execute('SELECT id FROM scans WHERE student_id = ?', (student_id,))
-        existing_scan = cursor.fetchone()
-
-        if existing_scan:
+        if not first_scan:
             return jsonify({
                 'valid': False,
                 'message': 'QR code already scanned',
                 'student': {'name': name, 'prn': prn_number}
             }), 400
 
-        # Record the scan with IST time
-        scanner_info = request.headers.get('User-Agent', 'Unknown')
-        ist_time = get_ist_time().strftime('%Y-%m-%d %H:%M:%S IST')
-        cursor.execute('''
-            INSERT INTO scans (student_id, scanner_info, scanned_at)
-            VALUES (?, ?, ?)
-        ''', (student_id, scanner_info, ist_time))
-
-        conn.commit()
-        conn.close()
-
         return jsonify({
             'valid': True,
             'message': 'QR code scanned successfully',
@@ -1194,6 +1585,167 @@ def validate_qr():
     except Exception as e:
         return jsonify({'error': f'Server error: {str(e)}'}), 500
 
+@app.route('/api/validate_qr_batch', methods=['POST'])
+def validate_qr_batch():
+    """Validate many QR codes in one transaction (offline gates, paper-list backlogs)
+
+    Body: {"scans": ["<qr_hash>", {"qr_hash": "...", "scanned_at": <epoch ms or ISO>, "device_id": "..."}]}
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        items = data.get('scans')
+
+        if not isinstance(items, list) or not items:
+            return jsonify({'error': 'A non-empty list of scans is required'}), 400
+        if len(items) > app.config['MAX_BATCH_SCANS']:
+            return jsonify({'error': f"At most {app.config['MAX_BATCH_SCANS']} scans per batch"}), 400
+
+        user_agent = request.headers.get('User-Agent', 'Unknown')
+        results = [None] * len(items)
+        scans = []
+        positions = []
+
+        for position, item in enumerate(items):
+            if isinstance(item, str):
+                item = {'qr_hash': item}
+            qr_hash = item.get('qr_hash') if isinstance(item, dict) else None
+            if not qr_hash or not isinstance(qr_hash, str):
+                results[position] = {'valid': False, 'message': 'QR hash is required'}
+                continue
+            try:
+                scanned_at = scan_time.from_client(item.get('scanned_at'))
+            except (TypeError, ValueError, OverflowError, OSError):
+                results[position] = {'qr_hash': qr_hash, 'valid': False, 'message': 'Invalid scan timestamp'}
+                continue
+            if not scan_time.in_window(scanned_at):
+                results[position] = {'qr_hash': qr_hash, 'valid': False, 'message': 'Scan timestamp out of range'}
+                continue
+
+            scanner_info = item.get('device_id') or user_agent
+            scans.append((qr_hash, str(scanner_info), scanned_at))
+            positions.append(position)
+
+        outcomes = check_in_batch(scans) if scans else []
+        for position, (qr_hash, _, _), (student, first_scan) in zip(positions, scans, outcomes):
+            results[position] = scan_result(qr_hash, student, first_scan)
+
+        return jsonify({
+            'results': results,
+            'summary': summarize_scan_results(results)
+        })
+
+    except Exception as e:
+        return jsonify({'error': f'Server error: {str(e)}'}), 500
+
+@app.route('/api/scans/sync', methods=['POST'])
+def sync_scans():
+    """Upload scans queued by an offline scanner; safe to retry
+
+    Body: {"device_id": "...", "scans": [{"scan_id": "...", "qr_hash": "...", "scanned_at": <epoch ms or ISO>}]}
+    A scan_id always gets back the result it got the first time it was synced.
+    When devices disagree, the earliest scan of a badge is the one recorded.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        items = data.get('scans')
+
+        if not isinstance(items, list) or not items:
+            return jsonify({'error': 'A non-empty list of scans is required'}), 400
+        if len(items) > app.config['MAX_BATCH_SCANS']:
+            return jsonify({'error': f"At most {app.config['MAX_BATCH_SCANS']} scans per batch"}), 400
+
+        scan_ids = []
+        for item in items:
+            scan_id = item.get('scan_id') if isinstance(item, dict) else None
+            if not scan_id or not isinstance(scan_id, str) or len(scan_id) > 64:
+                return jsonify({'error': 'Every scan needs a scan_id of at most 64 characters'}), 400
+            scan_ids.append(scan_id)
+
+        device_id = str(data.get('device_id') or request.headers.get('User-Agent', 'Unknown'))
+        with get_db() as conn:
+            stored = load_sync_results(conn, scan_ids)
+
+        # Only scans this server has never answered go through check-in
+        new_items = {}
+        for scan_id, item in zip(scan_ids, items):
+            if scan_id not in stored and scan_id not in new_items:
+                new_items[scan_id] = item
+
+        if new_items:
+            results = {}
+            scans = []
+            pending_ids = []
+            for scan_id, item in new_items.items():
+                qr_hash = item.get('qr_hash')
+                if not qr_hash or not isinstance(qr_hash, str):
+                    results[scan_id] = {'valid': False, 'message': 'QR hash is required'}
+                    continue
+                try:
+                    scanned_at = scan_time.from_client(item.get('scanned_at'))
+                except (TypeError, ValueError, OverflowError, OSError):
+                    results[scan_id] = {'qr_hash': qr_hash, 'valid': False, 'message': 'Invalid scan timestamp'}
+                    continue
+                if not scan_time.in_window(scanned_at):
+                    results[scan_id] = {'qr_hash': qr_hash, 'valid': False, 'message': 'Scan timestamp out of range'}
+                    continue
+                scans.append((qr_hash, device_id, scanned_at))
+                pending_ids.append(scan_id)
+
+            outcomes = check_in_batch(scans) if scans else []
+
+            # First scan wins across devices: an offline scan taken before the
+            # one already recorded replaces it, and this device is told it admitted
+            earlier = sorted(
+                (scanned_at, position)
+                for position, ((_, _, scanned_at), (student, first_scan)) in enumerate(zip(scans, outcomes))
+                if student and not first_scan
+            )
+            if earlier:
+                if scan_journal:
+                    scan_journal.drain()
+                with get_db() as conn:
+                    for scanned_at, position in earlier:
+                        student = outcomes[position][0]
+                        cursor = conn.execute('''
+                            UPDATE scans SET scanned_at = ?, scanner_info = ?
+                            WHERE student_id = ? AND scanned_at > ?
+                        ''', (scanned_at, device_id, student[0], scanned_at))
+                        if cursor.rowcount:
+                            outcomes[position] = (student, True)
+                    conn.commit()
+
+            for scan_id, (qr_hash, _, _), (student, first_scan) in zip(pending_ids, scans, outcomes):
+                results[scan_id] = scan_result(qr_hash, student, first_scan)
+
+            with get_db() as conn:
+                # OR IGNORE: if a retry raced this request, the first stored answer stands
+                conn.executemany('''
+                    INSERT OR IGNORE INTO scan_sync_log (client_scan_id, device_id, qr_hash, result)
+                    VALUES (?, ?, ?, ?)
+                ''', [(scan_id, device_id, result.get('qr_hash', ''), json.dumps(result))
+                      for scan_id, result in results.items()])
+                conn.commit()
+                stored = load_sync_results(conn, scan_ids)
+
+        results = [dict(stored[scan_id], scan_id=scan_id) for scan_id in scan_ids]
+        return jsonify({
+            'device_id': device_id,
+            'results': results,
+            'summary': summarize_scan_results(results)
+        })
+
+    except Exception as e:
+        return jsonify({'error': f'Server error: {str(e)}'}), 500
+
+def load_sync_results(conn, scan_ids):
+    """Stored sync results keyed by client scan id"""
+    placeholders = ','.join('?' * len(scan_ids))
+    rows = conn.execute(f'''
+        SELECT client_scan_id, result FROM scan_sync_log
+        WHERE client_scan_id IN ({placeholders})
+    ''', scan_ids).fetchall()
+    return {scan_id: json.loads(result) for scan_id, result in rows}
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Simple health check endpoint for Railway"""
@@ -1204,96 +1756,391 @@ def health_check():
         'timestamp': get_ist_time().strftime('%Y-%m-%d %H:%M:%S IST')
     })
 
+@app.route('/api/metrics', methods=['GET'])
+@api_admin_required
+def metrics():
+    """Runtime counters for the database connection layer"""
+    return jsonify({
+        'database': database.pool.stats(),
+        'roster_index': roster_index.stats(),
+        'scan_cache': scan_cache.stats(),
+        'scan_journal': scan_journal.stats() if scan_journal else None,
+        'scan_stream': scan_events.stats(),
+        'conditional_get': dict(conditional_get_stats),
+        'compression': compressor.stats(),
+        'snapshot_cache': snapshot_cache.stats(),
+        'jobs': job_runner.stats(),
+        'qr_render': qr_renderer.stats()
+    })
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+@api_admin_required
+def job_status(job_id):
+    """Progress of a background upload, QR generation or email send"""
+    with get_db() as conn:
+        job = jobs.get_job(conn, job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job)
+
+@app.route('/api/jobs', methods=['GET'])
+@api_admin_required
+def list_jobs():
+    """Recent background jobs, newest first; ?active=1 for only those still running"""
+    active_only = request.args.get('active', '0') == '1'
+    limit = min(request.args.get('limit', 20, type=int), 100)
+    with get_db() as conn:
+        recent = jobs.recent_jobs(conn, limit=limit, active_only=active_only)
+    return jsonify({'jobs': recent})
+
 @app.route('/api/dashboard_stats', methods=['GET'])
 @api_admin_required
+@data_version_etag
 def dashboard_stats():
+    """Counters, cursor and recent scans; include_students=0 leaves out the full
+    roster, which screens page through /api/students instead"""
     try:
-        # Initialize database if it doesn't exist
-        init_db()
-
-        conn = sqlite3.connect('student_event.db')
-        cursor = conn.cursor()
-
-        # Get total students
-        cursor.execute('SELECT COUNT(*) FROM students')
-        total_students = cursor.fetchone()[0]
-
-        # Get scanned count
-        cursor.execute('SELECT COUNT(DISTINCT student_id) FROM scans')
-        scanned_count = cursor.fetchone()[0]
-
-        # Get pending count
-        pending_count = total_students - scanned_count
-
-        # Get recent scans
-        cursor.execute('''
-            SELECT s.name, s.prn_number, sc.scanned_at
-            FROM students s
-            JOIN scans sc ON s.id = sc.student_id
-            ORDER BY sc.id DESC
-            LIMIT 10
-        ''')
-        recent_scans = cursor.fetchall()
-
-        # Get all students with status
-        cursor.execute('''
-            SELECT s.name, s.prn_number, s.email,
-                   CASE WHEN sc.id IS NOT NULL THEN 'Scanned' ELSE 'Pending' END as status,
-                   sc.scanned_at
-            FROM students s
-            LEFT JOIN scans sc ON s.id = sc.student_id
-            ORDER BY s.name
-        ''')
-        all_students = cursor.fetchall()
-
-        conn.close()
-
-        return jsonify({
-            'stats': {
-                'total_students': total_students,
-                'scanned_count': scanned_count,
-                'pending_count': pending_count,
-                'scan_percentage': round((scanned_count / total_students * 100) if total_students > 0 else 0, 2)
-            },
-            'recent_scans': [
-                {
-                    'name': scan[0],
-                    'prn': scan[1],
-                    'scanned_at': scan[2]
-                } for scan in recent_scans
-            ],
-            'all_students': [
+        include_students = request.args.get('include_students', '1').lower() not in ('0', 'false', 'no')
+
+        with get_db() as conn:
+            # One read transaction so the cursor matches the rows returned
+            conn.execute('BEGIN')
+            cursor = conn.cursor()
+            scan_cursor, roster_version = dashboard_cursor(cursor)
+            # The same for every poller at this version, so one worker computes it for all
+            scans_changed = scan_version(cursor)
+            snapshot = snapshot_cache.get('dashboard', (roster_version, scans_changed, scan_cursor),
+                                          lambda: dashboard_snapshot(cursor))
+
+            all_students = None
+            if include_students:
+                # Get all students with status
+                cursor.execute(ROSTER_STATUS_SQL)
+                all_students = cursor.fetchall()
+            conn.rollback()
+
+        payload = {
+            'stats': snapshot['stats'],
+            'cursor': scan_cursor,
+            'roster_version': roster_version,
+            'scan_version': scans_changed,
+            'recent_scans': snapshot['recent_scans']
+        }
+        if all_students is not None:
+            payload['all_students'] = [
                 {
                     'name': student[0],
                     'prn': student[1],
                     'email': student[2],
                     'status': student[3],
-                    'scanned_at': student[4]
+                    'scanned_at': scan_time.format_ist(student[4]),
+                    'scanned_at_ms': student[4]
                 } for student in all_students
             ]
+        return jsonify(payload)
+
+    except Exception as e:
+        return jsonify({'error': f'Server error: {str(e)}'}), 500
+
+@app.route('/api/students', methods=['GET'])
+@api_admin_required
+@data_version_etag
+def list_students():
+    """One page of the roster, sorted and filtered in the database
+
+    Query: sort=name|prn|status|scanned_at&order=asc|desc&status=all|scanned|pending
+           &q=<text in name, PRN or email>&limit=<n>&cursor=<next_cursor from the last page>
+    Pages are keyset-paginated, so check-ins between requests never shift or
+    repeat rows the caller has already seen.
+    """
+    try:
+        sort = request.args.get('sort', 'name')
+        order = request.args.get('order', 'asc').lower()
+        status = request.args.get('status', 'all').lower()
+        q = request.args.get('q', '').strip()
+        limit = request.args.get('limit', roster_pages.DEFAULT_LIMIT, type=int)
+        page_cursor = request.args.get('cursor') or None
+
+        with get_db() as conn:
+            conn.execute('BEGIN')
+            cursor = conn.cursor()
+            try:
+                rows, next_cursor = roster_pages.fetch_page(cursor, sort, order, status, q, limit, page_cursor)
+            except ValueError as e:
+                conn.rollback()
+                return jsonify({'error': str(e)}), 400
+            stats = dashboard_counters(cursor)
+            scan_cursor, roster_version = dashboard_cursor(cursor)
+            if q:
+                total = roster_pages.count_matching(cursor, status, q)
+            else:
+                # Unfiltered totals come straight from the counters
+                total = {'all': stats['total_students'], 'scanned': stats['scanned_count'],
+                         'pending': stats['pending_count']}[status]
+            conn.rollback()
+
+        return jsonify({
+            'students': [
+                {
+                    'name': name,
+                    'prn': prn_number,
+                    'email': email,
+                    'status': 'Scanned' if scanned_at is not None else 'Pending',
+                    'scanned_at': scan_time.format_ist(scanned_at),
+                    'scanned_at_ms': scanned_at
+                } for _, name, prn_number, email, scanned_at in rows
+            ],
+            'next_cursor': next_cursor,
+            'total': total,
+            'total_students': stats['total_students'],
+            'cursor': scan_cursor,
+            'roster_version': roster_version
         })
 
     except Exception as e:
         return jsonify({'error': f'Server error: {str(e)}'}), 500
 
-@app.route('/api/export_data', methods=['GET'])
+@app.route('/api/students/search', methods=['GET'])
 @api_admin_required
-def export_data():
+def search_students():
+    """Best-ranked students whose name, PRN or email contain q
+
+    Query: q=<text>&limit=<n, at most 50>. Used for manual check-in at the
+    gate, so each match carries its qr_hash.
+    """
     try:
-        conn = sqlite3.connect('student_event.db')
+        q = request.args.get('q', '').strip()
+        limit = request.args.get('limit', student_search.DEFAULT_LIMIT, type=int)
 
-        # Get all data
-        query = '''
-            SELECT s.name, s.prn_number, s.email,
-                   CASE WHEN sc.id IS NOT NULL THEN 'Scanned' ELSE 'Pending' END as status,
-                   sc.scanned_at
-            FROM students s
-            LEFT JOIN scans sc ON s.id = sc.student_id
-            ORDER BY s.name
-        '''
+        with get_db() as conn:
+            rows = student_search.search(conn, q, limit)
 
-        df = pd.read_sql_query(query, conn)
-        conn.close()
+        return jsonify({
+            'query': q,
+            'students': [
+                {
+                    'name': name,
+                    'prn': prn_number,
+                    'email': email,
+                    'qr_hash': qr_hash,
+                    'status': 'Scanned' if scanned_at is not None else 'Pending',
+                    'scanned_at': scan_time.format_ist(scanned_at),
+                    'scanned_at_ms': scanned_at
+                } for _, name, prn_number, email, qr_hash, scanned_at in rows
+            ]
+        })
+
+    except Exception as e:
+        return jsonify({'error': f'Server error: {str(e)}'}), 500
+
+@app.route('/api/dashboard_delta', methods=['GET'])
+@api_admin_required
+@data_version_etag
+def dashboard_delta():
+    """Check-ins after a scan id plus fresh counters, for screens that keep their own state
+
+    Query: after=<last seen scan id>&roster_version=<from the last response>
+    &scan_version=<from the last response>&limit=<n>
+    Without after, returns the latest scans. reset=true means students changed,
+    scans were deleted or an offline sync moved a check-in time, so the caller
+    must reload from /api/dashboard_stats.
+    """
+    try:
+        after = request.args.get('after', type=int)
+        known_version = request.args.get('roster_version', type=int)
+        known_scan_version = request.args.get('scan_version', type=int)
+        limit = min(max(request.args.get('limit', 100, type=int), 1), app.config['MAX_DELTA_SCANS'])
+
+        with get_db() as conn:
+            conn.execute('BEGIN')
+            cursor = conn.cursor()
+            stats = dashboard_counters(cursor)
+            scan_cursor, roster_version = dashboard_cursor(cursor)
+            scans_changed = scan_version(cursor)
+
+            if after is None:
+                cursor.execute(LATEST_SCANS_SQL, (limit,))
+            else:
+                cursor.execute(SCANS_AFTER_SQL, (after, limit + 1))
+            new_scans = cursor.fetchall()
+            conn.rollback()
+
+        has_more = after is not None and len(new_scans) > limit
+        new_scans = new_scans[:limit]
+        if has_more:
+            # Resume from the last row sent; the caller asks again straight away
+            scan_cursor = new_scans[-1][0]
+
+        return jsonify({
+            'reset': ((known_version is not None and known_version != roster_version) or
+                      (known_scan_version is not None and known_scan_version != scans_changed)),
+            'cursor': scan_cursor,
+            'roster_version': roster_version,
+            'scan_version': scans_changed,
+            'has_more': has_more,
+            'stats': stats,
+            'new_scans': [
+                {
+                    'id': scan[0],
+                    'name': scan[1],
+                    'prn': scan[2],
+                    'email': scan[3],
+                    'scanned_at': scan_time.format_ist(scan[4]),
+                    'scanned_at_ms': scan[4]
+                } for scan in new_scans
+            ]
+        })
+
+    except Exception as e:
+        return jsonify({'error': f'Server error: {str(e)}'}), 500
+
+ARRIVAL_BUCKETS = {'minute': 60 * 1000, '5min': 5 * 60 * 1000, '15min': 15 * 60 * 1000, 'hour': 60 * 60 * 1000}
+MAX_ARRIVAL_BUCKETS = 1440
+
+@app.route('/api/arrivals', methods=['GET'])
+@api_admin_required
+@data_version_etag
+def arrivals():
+    """Check-ins per time bucket, counted in SQL on the scanned_at index
+
+    Query: bucket=minute|5min|15min|hour&since=<epoch ms>&until=<epoch ms>
+    Buckets line up with IST clock time. Without since/until the window runs
+    from the first scan to the last, so the response only changes with the data.
+    """
+    try:
+        bucket = request.args.get('bucket', 'minute')
+        if bucket not in ARRIVAL_BUCKETS:
+            return jsonify({'error': f"bucket must be one of: {', '.join(ARRIVAL_BUCKETS)}"}), 400
+        size = ARRIVAL_BUCKETS[bucket]
+        offset = scan_time.IST_OFFSET_MS
+        since = request.args.get('since', type=int)
+        until = request.args.get('until', type=int)
+
+        def floor_bucket(ms):
+            return (ms + offset) // size * size - offset
+
+        with get_db() as conn:
+            conn.execute('BEGIN')
+            first, last = conn.execute(ARRIVALS_RANGE_SQL).fetchone()
+            if first is None and (since is None or until is None):
+                conn.rollback()
+                return jsonify({'bucket': bucket, 'bucket_ms': size, 'since': since, 'until': until,
+                                'total': 0, 'truncated': False, 'peak': None, 'buckets': []})
+
+            until = until if until is not None else last + 1
+            since = floor_bucket(since if since is not None else first)
+            truncated = (until - since) > size * MAX_ARRIVAL_BUCKETS
+            if truncated:
+                # Keep the latest buckets
+                since = floor_bucket(until - 1) - size * (MAX_ARRIVAL_BUCKETS - 1)
+
+            rows = conn.execute(ARRIVAL_BUCKETS_SQL, (offset, size, size, offset, since, until)).fetchall()
+            before = conn.execute(ARRIVALS_BEFORE_SQL, (since,)).fetchone()[0]
+            conn.rollback()
+
+        # Fill empty buckets so the curve can be charted as is
+        counts = dict(rows)
+        label_format = '%H:%M' if until - since <= 24 * 60 * 60 * 1000 else '%d %b %H:%M'
+        buckets = []
+        cumulative = before
+        for start in range(since, until, size):
+            count = counts.get(start, 0)
+            cumulative += count
+            buckets.append({
+                'start_ms': start,
+                'label': datetime.fromtimestamp(start / 1000, scan_time.IST).strftime(label_format),
+                'count': count,
+                'cumulative': cumulative
+            })
+
+        peak = max(buckets, key=lambda b: b['count']) if buckets else None
+        return jsonify({
+            'bucket': bucket,
+            'bucket_ms': size,
+            'since': since,
+            'until': until,
+            'total': sum(counts.values()),
+            'truncated': truncated,
+            'peak': peak if peak and peak['count'] else None,
+            'buckets': buckets
+        })
+
+    except Exception as e:
+        return jsonify({'error': f'Server error: {str(e)}'}), 500
+
+@app.route('/api/scans/stream', methods=['GET'])
+@api_admin_required
+def scan_stream():
+    """Server-Sent Events: checkin, stats and reset events as scans are committed
+
+    Reconnecting clients send Last-Event-ID (EventSource does this itself)
+    and receive the check-ins they missed.
+    """
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    frames = scan_events.open(last_event_id)
+    if frames is None:
+        return jsonify({'error': 'Too many live connections, poll /api/dashboard_delta instead'}), 503
+
+    return Response(frames, mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+def dashboard_counters(cursor):
+    """Counter block shared by the dashboard endpoints"""
+    # Single-row read of the trigger-maintained counters
+    stats = attendance_stats.read_stats(cursor)
+    total_students = stats['total_students']
+    scanned_count = stats['scanned']
+
+    # Get pending count
+    pending_count = total_students - scanned_count
+
+    return {
+        'total_students': total_students,
+        'scanned_count': scanned_count,
+        'pending_count': pending_count,
+        'scan_percentage': round((scanned_count / total_students * 100) if total_students > 0 else 0, 2)
+    }
+
+def dashboard_snapshot(cursor):
+    """Counters and the last ten check-ins, as served by dashboard_stats"""
+    stats = dashboard_counters(cursor)
+    cursor.execute(RECENT_SCANS_SQL)
+    return {
+        'stats': stats,
+        'recent_scans': [
+            {
+                'name': scan[0],
+                'prn': scan[1],
+                'scanned_at': scan_time.format_ist(scan[2]),
+                'scanned_at_ms': scan[2]
+            } for scan in cursor.fetchall()
+        ]
+    }
+
+def dashboard_cursor(cursor):
+    """(latest scan id, roster version) identifying what a client has already seen"""
+    cursor.execute('SELECT COALESCE(MAX(id), 0) FROM scans')
+    scan_cursor = cursor.fetchone()[0]
+    cursor.execute('SELECT version FROM roster_version WHERE id = 1')
+    row = cursor.fetchone()
+    return scan_cursor, row[0] if row else 0
+
+def scan_version(cursor):
+    """Counter bumped when an existing scan is rewritten (an earlier offline scan time)"""
+    cursor.execute('SELECT version FROM scan_version WHERE id = 1')
+    row = cursor.fetchone()
+    return row[0] if row else 0
+
+@app.route('/api/export_data', methods=['GET'])
+@api_admin_required
+def export_data():
+    try:
+        with get_db() as conn:
+            # Get all data
+            df = pd.read_sql_query(ROSTER_STATUS_SQL, conn)
+        df['scanned_at'] = df['scanned_at'].map(scan_time.format_ist)
 
         # Create Excel file in memory
         output = BytesIO()
@@ -1302,12 +2149,16 @@ def export_data():
 
         output.seek(0)
 
-        return send_file(
+        response = send_file(
             output,
             mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
             as_attachment=True,
             download_name=f'student_scan_report_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
         )
+        # Already in memory: buffer it so the compressor treats it like any other body
+        response.direct_passthrough = False
+        response.make_sequence()
+        return response
 
     except Exception as e:
         return jsonify({'error': f'Server error: {str(e)}'}), 500
@@ -1323,26 +2174,32 @@ def clear_all_data():
         if confirmation != 'CLEAR_ALL_DATA':
             return jsonify({'error': 'Invalid confirmation. Please type "CLEAR_ALL_DATA" to confirm.'}), 400
 
-        conn = sqlite3.connect('student_event.db')
-        cursor = conn.cursor()
+        # Journaled check-ins are for the students about to be deleted; flushed
+        # later they would land on deleted or reused ids
+        if scan_journal:
+            scan_journal.discard()
 
-        # Get counts before deletion for reporting
-        cursor.execute('SELECT COUNT(*) FROM students')
-        students_count = cursor.fetchone()[0]
+        with get_db() as conn:
+            cursor = conn.cursor()
 
-        cursor.execute('SELECT COUNT(*) FROM scans')
-        scans_count = cursor.fetchone()[0]
+            # Get counts before deletion for reporting
+            stats = attendance_stats.read_stats(cursor)
+            students_count = stats['total_students']
+            scans_count = stats['scanned']
 
-        # Delete all data from tables
-        cursor.execute('DELETE FROM scans')
-        cursor.execute('DELETE FROM students')
-        cursor.execute('DELETE FROM events')
+            # Delete all data from tables
+            cursor.execute('DELETE FROM scans')
+            cursor.execute('DELETE FROM students')
+            cursor.execute('DELETE FROM events')
+            cursor.execute('DELETE FROM scan_sync_log')
+            cursor.execute('DELETE FROM roster_imports')
 
-        # Reset auto-increment counters
-        cursor.execute('DELETE FROM sqlite_sequence WHERE name IN ("students", "scans", "events")')
+            # Reset auto-increment counters
+            cursor.execute('DELETE FROM sqlite_sequence WHERE name IN ("students", "scans", "events")')
 
-        conn.commit()
-        conn.close()
+            conn.commit()
+
+        roster_index.load()
 
         # Clean up QR code files
         qr_dir = app.config['QR_FOLDER']
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Trigger-maintained attendance counters
+Reads are a single-row fetch from attendance_stats; run this file to
+recompute the counters from scratch and check them against live counts
+
+Usage: python attendance_stats.py [--verify] [--db student_event.db]
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+
+COUNTERS = ['total_students', 'with_qr', 'with_hash', 'emailed', 'scanned']
+READ_SQL = f'SELECT {", ".join(COUNTERS)} FROM attendance_stats WHERE id = 1'
+
+# Source of truth for each counter; the triggers in migrations.py keep the
+# stored row equal to these
+RECOUNT_SQL = '''
+    SELECT
+        (SELECT COUNT(*) FROM students),
+        (SELECT COUNT(*) FROM students WHERE qr_code_path IS NOT NULL),
+        (SELECT COUNT(*) FROM students WHERE qr_hash IS NOT NULL),
+        (SELECT COUNT(*) FROM students WHERE COALESCE(email_sent, 0) != 0),
+        (SELECT COUNT(DISTINCT student_id) FROM scans)
+'''
+
+
+def read_stats(conn):
+    """Stored counters as a dict"""
+    row = conn.execute(READ_SQL).fetchone()
+    return dict(zip(COUNTERS, row or [0] * len(COUNTERS)))
+
+
+def recount(conn):
+    """Counters computed from the students and scans tables"""
+    return dict(zip(COUNTERS, conn.execute(RECOUNT_SQL).fetchone()))
+
+
+def rebuild(conn):
+    """Overwrite the stored counters with a fresh recount (caller commits)"""
+    counts = recount(conn)
+    conn.execute(f'''
+        INSERT OR REPLACE INTO attendance_stats (id, {", ".join(COUNTERS)})
+        VALUES (1, {", ".join("?" * len(COUNTERS))})
+    ''', [counts[name] for name in COUNTERS])
+    return counts
+
+
+def verify(conn):
+    """Return {counter: (stored, actual)} for every counter that has drifted"""
+    stored = read_stats(conn)
+    actual = recount(conn)
+    return {name: (stored[name], actual[name]) for name in COUNTERS if stored[name] != actual[name]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--verify', action='store_true', help='only check, do not rewrite the counters')
+    parser.add_argument('--db', default=os.environ.get('DATABASE_PATH', 'student_event.db'))
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db, timeout=30)
+    try:
+        if not args.verify:
+            conn.execute('BEGIN IMMEDIATE')
+            before = verify(conn)
+            counts = rebuild(conn)
+            conn.commit()
+            for name, (stored, actual) in before.items():
+                print(f"🔧 {name}: {stored} -> {actual}")
+            print(f"✅ Counters rebuilt: {counts}")
+
+        drift = verify(conn)
+        if drift:
+            for name, (stored, actual) in drift.items():
+                print(f"❌ {name}: stored {stored}, actual {actual}")
+            return 1
+        print(f"✅ Counters verified: {read_stats(conn)}")
+        return 0
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Benchmark /api/validate_qr_batch against one /api/validate_qr call per code
+Seeds a temporary database and drives both paths in-process with Flask's test client
+
+Usage: python bench_batch_validation.py --students 2000 --batch-size 500
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+TEST_DIR = tempfile.mkdtemp(prefix='depali_bench_')
+os.environ.setdefault('DATABASE_PATH', os.path.join(TEST_DIR, 'student_event.db'))
+
+import database
+from database import get_db
+from app import app, init_db
+from roster_index import roster_index
+
+def seed(students):
+    """Fresh database with the given number of students holding QR hashes"""
+    database.configure(os.path.join(tempfile.mkdtemp(prefix='depali_bench_'), 'student_event.db'))
+    init_db()
+    with get_db() as conn:
+        conn.executemany('''
+            INSERT INTO students (name, prn_number, email, qr_hash)
+            VALUES (?, ?, ?, ?)
+        ''', [(f'Student {i}', f'PRN{i:06d}', f'student{i}@example.com', f'hash-{i:06d}')
+              for i in range(students)])
+        conn.commit()
+    roster_index.load()
+    return [f'hash-{i:06d}' for i in range(students)]
+
+def bench_single(codes):
+    client = app.test_client()
+    started = time.perf_counter()
+    for code in codes:
+        response = client.post('/api/validate_qr', json={'qr_hash': code})
+        assert response.status_code == 200, response.get_json()
+    return time.perf_counter() - started
+
+def bench_batch(codes, batch_size):
+    client = app.test_client()
+    started = time.perf_counter()
+    for start in range(0, len(codes), batch_size):
+        response = client.post('/api/validate_qr_batch', json={'scans': codes[start:start + batch_size]})
+        assert response.get_json()['summary']['admitted'] == len(codes[start:start + batch_size])
+    return time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--students', type=int, default=2000)
+    parser.add_argument('--batch-size', type=int, default=500)
+    args = parser.parse_args()
+
+    single_seconds = bench_single(seed(args.students))
+    batch_seconds = bench_batch(seed(args.students), args.batch_size)
+
+    report = {
+        'students': args.students,
+        'batch_size': args.batch_size,
+        'single': {
+            'seconds': round(single_seconds, 3),
+            'codes_per_second': round(args.students / single_seconds, 1),
+        },
+        'batch': {
+            'seconds': round(batch_seconds, 3),
+            'codes_per_second': round(args.students / batch_seconds, 1),
+        },
+        'speedup': round(single_seconds / batch_seconds, 2),
+    }
+    print(json.dumps(report, indent=2))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Benchmark QR generation: the old one-student-at-a-time loop against the process pool
+Seeds a roster without QR codes in a fresh temporary database for each run,
+then times the legacy loop and generate_missing_qr_codes at each worker count
+
+Usage: python bench_qr_generation.py --students 2000 --workers 1,2,4,8 --chunk-size 50
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+TEST_DIR = tempfile.mkdtemp(prefix='depali_bench_')
+os.environ.setdefault('DATABASE_PATH', os.path.join(TEST_DIR, 'student_event.db'))
+
+import qrcode
+
+import database
+from database import get_db
+from app import app, generate_missing_qr_codes, init_db
+import qr_render
+from qr_render import qr_renderer
+
+def fresh_db(students):
+    """New database holding students that still need QR codes, and an empty QR folder"""
+    database.configure(os.path.join(tempfile.mkdtemp(prefix='depali_bench_'), 'student_event.db'))
+    init_db()
+    with get_db() as conn:
+        conn.executemany('INSERT INTO students (name, prn_number, email) VALUES (?, ?, ?)',
+                         [(f'Student {i}', f'PRN{20250000 + i}', f'student{i}@example.com')
+                          for i in range(students)])
+        conn.commit()
+    app.config['QR_FOLDER'] = tempfile.mkdtemp(prefix='depali_bench_')
+
+def legacy_generate(conn):
+    """generate_qr_codes before the pool: render, save and UPDATE each student in turn"""
+    cursor = conn.cursor()
+    students = cursor.execute('SELECT id, prn_number FROM students WHERE qr_code_path IS NULL').fetchall()
+    for student_id, prn_number in students:
+        qr_data = f"{prn_number}:{app.config['SECRET_KEY']}:{datetime.now().isoformat()}"
+        qr_hash = hashlib.sha256(qr_data.encode()).hexdigest()
+        qr = qrcode.QRCode(version=1, box_size=10, border=5)
+        qr.add_data(f"http://localhost:5000/validate/{qr_hash}")
+        qr.make(fit=True)
+        qr_path = os.path.join(app.config['QR_FOLDER'], f"qr_{prn_number}_{student_id}.png")
+        qr.make_image(fill_color="black", back_color="white").save(qr_path)
+        cursor.execute('UPDATE students SET qr_code_path = ?, qr_hash = ? WHERE id = ?',
+                       (qr_path, qr_hash, student_id))
+    conn.commit()
+    return len(students)
+
+def run(generate, students):
+    fresh_db(students)
+    with get_db() as conn:
+        started = time.perf_counter()
+        generate(conn)
+        seconds = time.perf_counter() - started
+        missing = conn.execute('SELECT COUNT(*) FROM students WHERE qr_hash IS NULL').fetchone()[0]
+    assert missing == 0, f'{missing} students left without a QR code'
+    return {'seconds': round(seconds, 2), 'images_per_second': round(students / seconds, 1)}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--students', type=int, default=2000)
+    parser.add_argument('--workers', default=','.join(str(n) for n in sorted({1, 2, qr_render.CPUS})))
+    parser.add_argument('--chunk-size', type=int, default=qr_renderer.chunk_size)
+    args = parser.parse_args()
+
+    os.environ.setdefault('EXTERNAL_URL', 'localhost:5000')
+    legacy = run(legacy_generate, args.students)
+
+    pooled = {}
+    qr_renderer.chunk_size = args.chunk_size
+    for workers in [int(n) for n in args.workers.split(',')]:
+        qr_renderer.workers = workers
+        with app.app_context():
+            pooled[workers] = run(lambda conn: generate_missing_qr_codes(), args.students)
+        pooled[workers]['speedup'] = round(legacy['seconds'] / pooled[workers]['seconds'], 1)
+
+    print(json.dumps({
+        'students': args.students,
+        'cpus': qr_render.CPUS,
+        'chunk_size': args.chunk_size,
+        'legacy_loop': legacy,
+        'pool_by_workers': pooled,
+    }, indent=2))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Benchmark the bulk roster import against the old one-INSERT-per-row loop
+Builds a sheet with repeated PRNs and PRNs already registered, and imports
+it into a fresh temporary database with each approach; then compares peak
+Python memory for a CSV loaded whole against the chunked CSV reader
+
+Usage: python bench_roster_import.py --rows 10000 --repeat-rate 0.05 --existing-rate 0.1 --chunk-rows 5000
+"""
+
+import argparse
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+
+TEST_DIR = tempfile.mkdtemp(prefix='depali_bench_')
+os.environ.setdefault('DATABASE_PATH', os.path.join(TEST_DIR, 'student_event.db'))
+
+import pandas as pd
+
+import database
+from database import get_db
+from app import init_db
+import roster_import
+
+def build_sheet(rows, repeat_rate, rng):
+    """Sheet as read from an upload, with some PRNs appearing twice"""
+    prns = [f'PRN{20250000 + i}' for i in range(rows)]
+    for i in rng.sample(range(1, rows), int(rows * repeat_rate)):
+        prns[i] = prns[rng.randrange(i)]
+    return pd.DataFrame({
+        'Student Name': [f'Student {i}' for i in range(rows)],
+        'PRN Number': prns,
+        'Email Address': [f'student{i}@example.com' for i in range(rows)],
+    })
+
+def fresh_db(existing):
+    """New database already holding the given PRNs"""
+    database.configure(os.path.join(tempfile.mkdtemp(prefix='depali_bench_'), 'student_event.db'))
+    init_db()
+    with get_db() as conn:
+        conn.executemany('INSERT INTO students (name, prn_number, email) VALUES (?, ?, ?)',
+                         [(f'Registered {prn}', prn, f'{prn}@example.com') for prn in existing])
+        conn.commit()
+
+def legacy_import(conn, df):
+    """upload_students before the bulk import: iterrows and one INSERT per row"""
+    inserted_count = 0
+    duplicate_count = 0
+    cursor = conn.cursor()
+    for _, row in df.iterrows():
+        try:
+            cursor.execute('''
+                INSERT INTO students (name, prn_number, email)
+                VALUES (?, ?, ?)
+            ''', (row['Student Name'], row['PRN Number'], row['Email Address']))
+            inserted_count += 1
+        except sqlite3.IntegrityError:
+            duplicate_count += 1
+    conn.commit()
+    return {'inserted': inserted_count, 'duplicates': duplicate_count}
+
+def run(importer, df, existing):
+    fresh_db(existing)
+    with get_db() as conn:
+        started = time.perf_counter()
+        counts = importer(conn, df)
+        seconds = time.perf_counter() - started
+    return seconds, counts
+
+def measure_csv(importer, df, existing):
+    """Seconds and peak traced memory for importing the sheet written out as CSV"""
+    path = os.path.join(tempfile.mkdtemp(prefix='depali_bench_'), 'roster.csv')
+    df.to_csv(path, index=False)
+    fresh_db(existing)
+    with get_db() as conn:
+        tracemalloc.start()
+        started = time.perf_counter()
+        importer(conn, path)
+        seconds = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return {'seconds': round(seconds, 3), 'peak_mb': round(peak / 1024 / 1024, 1)}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat-rate', type=float, default=0.05)
+    parser.add_argument('--existing-rate', type=float, default=0.1)
+    parser.add_argument('--chunk-rows', type=int, default=roster_import.IMPORT_CHUNK_ROWS)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    df = build_sheet(args.rows, args.repeat_rate, rng)
+    existing = rng.sample(sorted(set(df['PRN Number'])), int(args.rows * args.existing_rate))
+
+    legacy_seconds, legacy_counts = run(legacy_import, df, existing)
+    bulk_seconds, bulk_counts = run(roster_import.import_students, df, existing)
+    assert bulk_counts['inserted'] == legacy_counts['inserted'], (bulk_counts, legacy_counts)
+    assert bulk_counts['duplicates'] == legacy_counts['duplicates'], (bulk_counts, legacy_counts)
+
+    whole_csv = measure_csv(lambda conn, path: roster_import.import_students(
+        conn, roster_import.read_sheet(path), chunk_rows=args.rows), df, existing)
+    chunked_csv = measure_csv(lambda conn, path: roster_import.import_file(
+        conn, path, chunk_rows=args.chunk_rows), df, existing)
+
+    print(json.dumps({
+        'rows': args.rows,
+        'counts': bulk_counts,
+        'legacy_loop': {
+            'seconds': round(legacy_seconds, 3),
+            'rows_per_second': round(args.rows / legacy_seconds),
+        },
+        'bulk_import': {
+            'seconds': round(bulk_seconds, 3),
+            'rows_per_second': round(args.rows / bulk_seconds),
+        },
+        'speedup': round(legacy_seconds / bulk_seconds, 1),
+        'csv_loaded_whole': whole_csv,
+        'csv_chunked': dict(chunked_csv, chunk_rows=args.chunk_rows),
+    }, indent=2))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Benchmark student search and filtered roster pages on a large roster
+Seeds a temporary database and times student_search.search and
+roster_pages.fetch_page directly, without HTTP overhead
+
+Usage: python bench_student_search.py --students 50000 --queries 200
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+TEST_DIR = tempfile.mkdtemp(prefix='depali_bench_')
+os.environ.setdefault('DATABASE_PATH', os.path.join(TEST_DIR, 'student_event.db'))
+
+import database
+from database import get_db
+from app import init_db
+import roster_pages
+import student_search
+
+FIRST = ['Asha', 'Rohan', 'Meera', 'Kiran', 'Zoya', 'Aditya', 'Sneha', 'Vikram', 'Pooja', 'Rahul',
+         'Anjali', 'Siddharth', 'Neha', 'Arjun', 'Priya', 'Omkar', 'Tanvi', 'Nikhil', 'Shreya', 'Yash']
+LAST = ['Patil', 'Desai', 'Joshi', 'More', 'Khan', 'Kulkarni', 'Deshmukh', 'Shinde', 'Pawar', 'Jadhav',
+        'Gaikwad', 'Chavan', 'Bhosale', 'Kale', 'Sawant', 'Naik', 'Mane', 'Salunkhe', 'Rane', 'Thorat']
+
+def seed(students, rng):
+    """Fresh database with a synthetic roster"""
+    database.configure(os.path.join(tempfile.mkdtemp(prefix='depali_bench_'), 'student_event.db'))
+    init_db()
+    rows = []
+    for i in range(students):
+        first, last = rng.choice(FIRST), rng.choice(LAST)
+        rows.append((f'{first} {last}', f'PRN{20250000 + i}', f'{first}.{last}{i}@example.com'.lower(),
+                     f'hash-{i:06d}'))
+    with get_db() as conn:
+        conn.executemany('INSERT INTO students (name, prn_number, email, qr_hash) VALUES (?, ?, ?, ?)', rows)
+        conn.commit()
+    return rows
+
+def build_queries(rows, count, rng):
+    """Mix of partial names, last PRN digits, email fragments and short prefixes"""
+    kinds = {
+        'partial_name': lambda row: row[0].split()[rng.randrange(2)][:rng.randint(3, 5)],
+        'prn_last4': lambda row: row[1][-4:],
+        'email_fragment': lambda row: row[2].split('@')[0][-6:],
+        'short_prefix': lambda row: row[0][:2],
+    }
+    return {kind: [make(rng.choice(rows)) for _ in range(count)] for kind, make in kinds.items()}
+
+def time_calls(call, queries):
+    timings = []
+    for q in queries:
+        started = time.perf_counter()
+        call(q)
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {
+        'p50_ms': round(timings[len(timings) // 2], 3),
+        'p95_ms': round(timings[int(len(timings) * 0.95) - 1], 3),
+        'max_ms': round(timings[-1], 3),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--students', type=int, default=50000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    rows = seed(args.students, rng)
+    queries = build_queries(rows, args.queries, rng)
+
+    report = {'students': args.students, 'queries_per_kind': args.queries, 'search': {}, 'roster_page': {}}
+    with get_db() as conn:
+        for kind, kind_queries in queries.items():
+            report['search'][kind] = time_calls(lambda q: student_search.search(conn, q), kind_queries)
+            report['roster_page'][kind] = time_calls(
+                lambda q: roster_pages.fetch_page(conn, q=q, limit=50), kind_queries)
+
+    print(json.dumps(report, indent=2))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
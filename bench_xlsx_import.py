@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Benchmark .xlsx roster imports: pandas read_excel against the streamed reader
+Writes a workbook with the three required columns among a few others, then
+imports it into a fresh temporary database in a separate process per path,
+so each one's peak RSS is its own
+
+Usage: python bench_xlsx_import.py --rows 50000 --extra-columns 5
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+def build_workbook(path, rows, extra_columns):
+    """Roster as a placement cell sends it: numeric PRNs and columns nobody imports"""
+    from openpyxl import Workbook
+    # Not write_only: that writes inline strings and no <dimension>, unlike Excel
+    workbook = Workbook()
+    sheet = workbook.active
+    extras = [f'Extra {i}' for i in range(extra_columns)]
+    sheet.append(['Sr No', 'Student Name', 'PRN Number', 'Branch', 'Email Address'] + extras)
+    for i in range(rows):
+        sheet.append([i + 1, f'Student {i}', 1102310000 + i, 'IT', f'student{i}@example.com']
+                     + [f'value {i}-{j}' for j in range(extra_columns)])
+    workbook.save(path)
+
+def peak_rss_mb():
+    # VmHWM starts afresh at exec; ru_maxrss can carry over the parent's peak
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def child(method, path, chunk_rows):
+    """Import the workbook one way and print seconds, counts and RSS as JSON"""
+    os.environ['DATABASE_PATH'] = os.path.join(tempfile.mkdtemp(prefix='depali_bench_'), 'student_event.db')
+    import database
+    from database import get_db
+    from app import init_db
+    import roster_import
+
+    database.configure(os.environ['DATABASE_PATH'])
+    init_db()
+    baseline = peak_rss_mb()
+    with get_db() as conn:
+        started = time.perf_counter()
+        if method == 'read_excel':
+            counts = roster_import.import_students(conn, roster_import.read_sheet(path), chunk_rows=chunk_rows)
+        else:
+            counts = roster_import.import_file(conn, path, chunk_rows=chunk_rows)
+        seconds = time.perf_counter() - started
+    print(json.dumps({
+        'seconds': round(seconds, 2),
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+        'rss_growth_mb': round(peak_rss_mb() - baseline, 1),
+        'inserted': counts['inserted'],
+    }))
+
+def run(method, path, chunk_rows):
+    output = subprocess.run([sys.executable, __file__, '--child', method, '--path', path,
+                             '--chunk-rows', str(chunk_rows)],
+                            check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--extra-columns', type=int, default=5)
+    parser.add_argument('--chunk-rows', type=int, default=5000)
+    parser.add_argument('--child', choices=['read_excel', 'streamed'])
+    parser.add_argument('--path')
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.path, args.chunk_rows)
+        return 0
+
+    path = os.path.join(tempfile.mkdtemp(prefix='depali_bench_'), 'roster.xlsx')
+    build_workbook(path, args.rows, args.extra_columns)
+
+    read_excel = run('read_excel', path, args.chunk_rows)
+    streamed = run('streamed', path, args.chunk_rows)
+    assert read_excel['inserted'] == streamed['inserted'] == args.rows, (read_excel, streamed)
+
+    print(json.dumps({
+        'rows': args.rows,
+        'workbook_mb': round(os.path.getsize(path) / 1024 / 1024, 1),
+        'read_excel': read_excel,
+        'streamed': dict(streamed, chunk_rows=args.chunk_rows),
+        'speedup': round(read_excel['seconds'] / streamed['seconds'], 1),
+    }, indent=2))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
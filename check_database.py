@@ -6,6 +6,8 @@ Check database state and diagnose issues
 import sqlite3
 import os
 
+import attendance_stats
+
 def check_database():
     """Check the current state of the database"""
     print("🔍 Checking Database State...")
@@ -15,24 +17,26 @@ def check_database():
         conn = sqlite3.connect('student_event.db')
         cursor = conn.cursor()
         
-        # Check students table
-        cursor.execute('SELECT COUNT(*) FROM students')
-        total_students = cursor.fetchone()[0]
-        
-        cursor.execute('SELECT COUNT(*) FROM students WHERE qr_code_path IS NOT NULL')
-        students_with_qr = cursor.fetchone()[0]
-        
-        cursor.execute('SELECT COUNT(*) FROM students WHERE email_sent = FALSE')
-        students_pending_email = cursor.fetchone()[0]
-        
-        cursor.execute('SELECT COUNT(*) FROM students WHERE qr_hash IS NOT NULL')
-        students_with_hash = cursor.fetchone()[0]
+        # Check students table (counters kept by triggers)
+        stats = attendance_stats.read_stats(conn)
+        total_students = stats['total_students']
+        students_with_qr = stats['with_qr']
+        students_with_hash = stats['with_hash']
+        students_pending_email = total_students - stats['emailed']
         
         print(f"📊 Database Statistics:")
         print(f"   Total Students: {total_students}")
         print(f"   Students with QR Codes: {students_with_qr}")
         print(f"   Students with QR Hash: {students_with_hash}")
         print(f"   Students Pending Email: {students_pending_email}")
+        print(f"   Students Scanned: {stats['scanned']}")
+        
+        # Recount once to make sure the counters have not drifted
+        drift = attendance_stats.verify(conn)
+        for name, (stored, actual) in drift.items():
+            print(f"   ⚠️ Counter {name} is {stored}, actual {actual}")
+        if drift:
+            print("   🔧 Run: python attendance_stats.py")
         print()
         
         # Check sample students
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Negotiated gzip/brotli response compression
+JSON, HTML and Excel export responses are compressed in an after_request
+hook; static JS and CSS are served from .br/.gz files written ahead of time
+by running this module (python compression.py), so they cost no CPU per
+request.
+"""
+
+import gzip
+import mimetypes
+import os
+import sys
+import threading
+
+from flask import request, send_from_directory
+
+# Try to import Brotli (optional; gzip is always available)
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 1024))
+COMPRESS_LEVEL = int(os.environ.get('COMPRESS_LEVEL', 6))                    # gzip 1-9, 0 turns compression off
+COMPRESS_BROTLI_QUALITY = int(os.environ.get('COMPRESS_BROTLI_QUALITY', 5))  # 0-11; above ~6 is slow per request
+
+# Text, plus xlsx: openpyxl deflates the sheet XML lightly enough that gzip
+# still takes a roster export to about a third. PNGs are left alone.
+COMPRESSIBLE_TYPES = {
+    'application/json', 'application/javascript', 'text/javascript', 'text/html',
+    'text/css', 'text/plain', 'text/csv', 'image/svg+xml',
+    'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+PRECOMPRESSED_SUFFIXES = ('.js', '.css')
+ENCODING_SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+
+def compress(data, encoding, level=COMPRESS_LEVEL, brotli_quality=COMPRESS_BROTLI_QUALITY):
+    if encoding == 'br':
+        return brotli.compress(data, quality=brotli_quality)
+    # mtime=0 keeps the output, and so any ETag over it, stable
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def precompress_static(static_folder, level=9, brotli_quality=11):
+    """Write .gz (and .br) next to every JS/CSS file whose variants are missing
+    or older than the file; returns the paths written"""
+    written = []
+    for root, _, files in os.walk(static_folder):
+        for name in files:
+            if not name.endswith(PRECOMPRESSED_SUFFIXES):
+                continue
+            path = os.path.join(root, name)
+            with open(path, 'rb') as f:
+                data = None
+                for encoding, suffix in ENCODING_SUFFIXES.items():
+                    if encoding == 'br' and not BROTLI_AVAILABLE:
+                        continue
+                    target = path + suffix
+                    if os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(path):
+                        continue
+                    if data is None:
+                        data = f.read()
+                    # Write then rename so a worker never serves a half-written file
+                    temp = f'{target}.{os.getpid()}.tmp'
+                    with open(temp, 'wb') as out:
+                        out.write(compress(data, encoding, level, brotli_quality))
+                    os.replace(temp, target)
+                    written.append(target)
+    return written
+
+
+class ResponseCompressor:
+    """Compresses responses per Accept-Encoding and counts bytes before and after"""
+
+    def __init__(self, min_size=COMPRESS_MIN_SIZE, level=COMPRESS_LEVEL, brotli_quality=COMPRESS_BROTLI_QUALITY):
+        self.min_size = min_size
+        self.level = level
+        self.brotli_quality = brotli_quality
+        self.static_folder = None
+        self._lock = threading.Lock()
+        self._counters = {
+            'responses': 0,
+            'compressed': 0,
+            'static_precompressed': 0,
+            'skipped_small': 0,
+            'skipped_not_accepted': 0,
+            'bytes_before': 0,
+            'bytes_after': 0,
+        }
+        self._encodings = {}
+        self._endpoints = {}   # endpoint -> [responses, bytes_before, bytes_after]
+
+    @property
+    def enabled(self):
+        return self.level > 0
+
+    def init_app(self, app):
+        self.static_folder = app.static_folder
+        app.view_functions['static'] = self.send_static
+        app.after_request(self.after_request)
+
+    def negotiate(self, available=('br', 'gzip')):
+        """Best encoding the client accepts, preferring brotli on a tie"""
+        best, best_quality = None, 0
+        for encoding in available:
+            if encoding == 'br' and not BROTLI_AVAILABLE:
+                continue
+            quality = request.accept_encodings[encoding]
+            if quality > best_quality:
+                best, best_quality = encoding, quality
+        return best
+
+    def send_static(self, filename):
+        """Static view: a fresh precompressed variant when the client takes one"""
+        encoding = None
+        if self.enabled and filename.endswith(PRECOMPRESSED_SUFFIXES):
+            path = os.path.join(self.static_folder, filename)
+            fresh = [name for name, suffix in ENCODING_SUFFIXES.items()
+                     if os.path.isfile(path + suffix) and os.path.isfile(path)
+                     and os.path.getmtime(path + suffix) >= os.path.getmtime(path)]
+            encoding = self.negotiate(fresh) if fresh else None
+
+        if encoding is None:
+            response = send_from_directory(self.static_folder, filename)
+        else:
+            # send_from_directory still guards against paths outside static/
+            response = send_from_directory(self.static_folder, filename + ENCODING_SUFFIXES[encoding],
+                                           mimetype=mimetypes.guess_type(filename)[0])
+            response.headers['Content-Encoding'] = encoding
+            self._count('static_precompressed')
+        if filename.endswith(PRECOMPRESSED_SUFFIXES):
+            response.vary.add('Accept-Encoding')
+        return response
+
+    def after_request(self, response):
+        if (not self.enabled or response.direct_passthrough or response.is_streamed
+                or response.mimetype not in COMPRESSIBLE_TYPES
+                or response.status_code < 200 or response.status_code in (204, 206, 304)
+                or 'Content-Encoding' in response.headers):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        data = response.get_data()
+        encoding = None
+        if len(data) < self.min_size:
+            self._count('skipped_small')
+        else:
+            encoding = self.negotiate()
+            if encoding is None:
+                self._count('skipped_not_accepted')
+
+        if encoding is not None:
+            compressed = compress(data, encoding, self.level, self.brotli_quality)
+            if len(compressed) < len(data):
+                response.set_data(compressed)
+                response.headers['Content-Encoding'] = encoding
+                # A strong ETag names exact bytes, so each encoding needs its own;
+                # weak ones (the data-version tags) hold across encodings
+                etag, weak = response.get_etag()
+                if etag and not weak:
+                    response.set_etag(f'{etag}-{encoding}')
+            else:
+                encoding = None
+
+        self._record(request.endpoint, encoding, len(data), response.content_length or 0)
+        return response
+
+    def _count(self, counter):
+        with self._lock:
+            self._counters[counter] += 1
+
+    def _record(self, endpoint, encoding, before, after):
+        with self._lock:
+            self._counters['responses'] += 1
+            self._counters['bytes_before'] += before
+            self._counters['bytes_after'] += after
+            if encoding:
+                self._counters['compressed'] += 1
+                self._encodings[encoding] = self._encodings.get(encoding, 0) + 1
+            sizes = self._endpoints.setdefault(endpoint or 'unknown', [0, 0, 0])
+            sizes[0] += 1
+            sizes[1] += before
+            sizes[2] += after
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats['encodings'] = dict(self._encodings)
+            stats['endpoints'] = {
+                endpoint: {'responses': count, 'bytes_before': before, 'bytes_after': after}
+                for endpoint, (count, before, after) in self._endpoints.items()
+            }
+        stats['ratio'] = round(stats['bytes_after'] / stats['bytes_before'], 3) if stats['bytes_before'] else 1.0
+        stats['brotli_available'] = BROTLI_AVAILABLE
+        stats['min_size'] = self.min_size
+        stats['level'] = self.level
+        stats['brotli_quality'] = self.brotli_quality
+        return stats
+
+
+compressor = ResponseCompressor()
+
+
+if __name__ == '__main__':
+    folder = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+    written = precompress_static(folder)
+    for path in written:
+        print(f"🗜️  {os.path.relpath(path, folder)} ({os.path.getsize(path)} bytes)")
+    print(f"✅ {len(written)} precompressed file(s) written"
+          + ('' if BROTLI_AVAILABLE else ' (brotli not installed, gzip only)'))
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Shared SQLite connection layer for Student Event Management System
+Reuses one connection per thread, tuned for concurrent scanners and dashboards
+"""
+
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+DATABASE_PATH = os.environ.get('DATABASE_PATH', 'student_event.db')
+BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+STATEMENT_CACHE_SIZE = int(os.environ.get('SQLITE_STATEMENT_CACHE', 256))
+MAX_IDLE_CONNECTIONS = int(os.environ.get('SQLITE_MAX_IDLE_CONNECTIONS', 8))
+
+
+class ConnectionPool:
+    """Hands out one SQLite connection per thread and recycles it on release"""
+
+    def __init__(self, path, busy_timeout_ms=BUSY_TIMEOUT_MS,
+                 cached_statements=STATEMENT_CACHE_SIZE, max_idle=MAX_IDLE_CONNECTIONS):
+        self.path = path
+        self.busy_timeout_ms = busy_timeout_ms
+        self.cached_statements = cached_statements
+        self.max_idle = max_idle
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._idle = []
+        self._checked_out = {}  # thread ident -> connection
+        self._counters = {
+            'opened': 0,
+            'closed': 0,
+            'checkouts': 0,
+            'releases': 0,
+            'reused': 0,
+            'rolled_back_on_release': 0,
+        }
+
+    def _open(self):
+        """Open a new connection with WAL mode and tuned pragmas"""
+        conn = sqlite3.connect(
+            self.path,
+            timeout=self.busy_timeout_ms / 1000,
+            cached_statements=self.cached_statements,
+            check_same_thread=False,
+        )
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(f'PRAGMA busy_timeout={int(self.busy_timeout_ms)}')
+        conn.execute('PRAGMA temp_store=MEMORY')
+        with self._lock:
+            self._counters['opened'] += 1
+        return conn
+
+    def checkout(self):
+        """Get the calling thread's connection, opening or reusing one as needed"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            # Nested checkout on the same thread shares the connection
+            self._local.depth += 1
+            with self._lock:
+                self._counters['checkouts'] += 1
+            return conn
+
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+            if conn is not None:
+                self._counters['reused'] += 1
+
+        if conn is None:
+            conn = self._open()
+
+        self._local.conn = conn
+        self._local.depth = 1
+        with self._lock:
+            self._counters['checkouts'] += 1
+            self._checked_out[threading.get_ident()] = conn
+        return conn
+
+    def release(self, conn):
+        """Return a connection; the outermost release puts it back in the pool"""
+        if getattr(self._local, 'conn', None) is not conn:
+            raise RuntimeError('Connection released by a thread that does not own it')
+
+        with self._lock:
+            self._counters['releases'] += 1
+
+        self._local.depth -= 1
+        if self._local.depth > 0:
+            return
+
+        self._local.conn = None
+        if conn.in_transaction:
+            # Never hand a half-finished transaction to the next request
+            conn.rollback()
+            with self._lock:
+                self._counters['rolled_back_on_release'] += 1
+
+        with self._lock:
+            self._checked_out.pop(threading.get_ident(), None)
+            if len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                return
+            self._counters['closed'] += 1
+        conn.close()
+
+    def close_all(self):
+        """Close idle connections (used on shutdown and when the path changes)"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+            self._counters['closed'] += len(idle)
+        for conn in idle:
+            conn.close()
+
+    def stats(self):
+        """Connection counters, including checkouts held by threads that have exited"""
+        alive = {thread.ident for thread in threading.enumerate()}
+        with self._lock:
+            stats = dict(self._counters)
+            stats['in_use'] = len(self._checked_out)
+            stats['idle'] = len(self._idle)
+            stats['leaked'] = sum(1 for ident in self._checked_out if ident not in alive)
+        stats['path'] = self.path
+        return stats
+
+
+pool = ConnectionPool(DATABASE_PATH)
+
+
+def configure(path):
+    """Point the shared pool at a different database file"""
+    global pool
+    pool.close_all()
+    pool = ConnectionPool(path)
+    return pool
+
+
+@contextmanager
+def get_db():
+    """Check out the thread's connection and always release it"""
+    active_pool = pool
+    conn = active_pool.checkout()
+    try:
+        yield conn
+    except Exception:
+        if conn.in_transaction:
+            conn.rollback()
+        raise
+    finally:
+        active_pool.release(conn)
@@ -0,0 +1,8 @@
+# Gunicorn settings picked up automatically from the working directory.
+# Command-line flags in start.sh / Procfile / railway.json still take precedence.
+import os
+
+# Threaded workers: a long-lived /api/scans/stream connection holds one
+# thread, not a whole worker, so dashboards and scanners can stay subscribed
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.environ.get('GUNICORN_THREADS', 64))
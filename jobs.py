@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""
+Background jobs for work too long for one HTTP request
+Roster uploads, QR generation and email sends run in a small thread pool;
+their progress is written to the jobs table so whichever worker answers
+/api/jobs/<id> can report it
+"""
+
+import json
+import os
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import scan_time
+from database import get_db
+
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 2))
+JOB_QUEUE_LIMIT = int(os.environ.get('JOB_QUEUE_LIMIT', 8))           # queued + running, per worker process
+JOB_PROGRESS_INTERVAL_MS = int(os.environ.get('JOB_PROGRESS_INTERVAL_MS', 500))
+JOB_HEARTBEAT_MS = int(os.environ.get('JOB_HEARTBEAT_MS', 15000))
+JOB_STALE_MS = int(os.environ.get('JOB_STALE_MS', 60000))             # no heartbeat this long: worker is gone
+JOB_MAX_FAILURES = int(os.environ.get('JOB_MAX_FAILURES', 200))        # per-item failures kept for the report
+JOB_HISTORY = int(os.environ.get('JOB_HISTORY', 100))
+
+class JobBusy(Exception):
+    """A job of the same kind is already queued or running"""
+
+    def __init__(self, job_id):
+        super().__init__(f'Job {job_id} is already in progress')
+        self.job_id = job_id
+
+
+class JobQueueFull(Exception):
+    """This worker already has JOB_QUEUE_LIMIT jobs waiting or running"""
+
+
+class JobFailed(Exception):
+    """Raised by a job to fail with a message and a partial result"""
+
+    def __init__(self, message, result=None):
+        super().__init__(message)
+        self.result = result
+
+
+class JobProgress:
+    """Counters a job updates as it goes; written to the jobs table at most
+    every JOB_PROGRESS_INTERVAL_MS, and never in the middle of the job's own
+    transaction on the shared connection"""
+
+    def __init__(self, job_id=None, interval_ms=JOB_PROGRESS_INTERVAL_MS):
+        self.job_id = job_id
+        self.interval = interval_ms / 1000
+        self.unit = 'items'
+        self.total = None
+        self.done = 0
+        self.failed = 0
+        self.failures = []
+        self._flushed_at = 0.0
+
+    def set_total(self, total, unit='items'):
+        self.total = total
+        self.unit = unit
+        self.flush(force=True)
+
+    def advance(self, count=1):
+        self.done += count
+        self.flush()
+
+    def update(self, done):
+        """Set how far along the job is, for work measured in something other than items"""
+        self.done = done
+        self.flush()
+
+    def fail(self, item, error):
+        """Record one item that could not be processed; it still counts as done"""
+        self.done += 1
+        self.failed += 1
+        if len(self.failures) < JOB_MAX_FAILURES:
+            self.failures.append({'item': str(item), 'error': str(error)})
+        self.flush()
+
+    def flush(self, force=False, **fields):
+        if self.job_id is None:
+            return
+        now = time.monotonic()
+        if not force and now - self._flushed_at < self.interval:
+            return
+        with get_db() as conn:
+            if conn.in_transaction:
+                return
+            columns = {
+                'unit': self.unit,
+                'total': self.total,
+                'done': self.done,
+                'failed': self.failed,
+                'failures': json.dumps(self.failures),
+                'updated_at': scan_time.now_ms(),
+            }
+            columns.update(fields)
+            assignments = ', '.join(f'{column} = ?' for column in columns)
+            conn.execute(f'UPDATE jobs SET {assignments} WHERE id = ?', (*columns.values(), self.job_id))
+            conn.commit()
+        self._flushed_at = now
+
+
+class NullProgress(JobProgress):
+    """Progress for work run directly rather than as a job"""
+
+    def set_total(self, total, unit='items'):
+        pass
+
+    def advance(self, count=1):
+        pass
+
+    def update(self, done):
+        pass
+
+    def fail(self, item, error):
+        pass
+
+
+NO_PROGRESS = NullProgress()
+
+
+class JobRunner:
+    """Bounded per-process pool; one job of each kind at a time across workers"""
+
+    def __init__(self, workers=JOB_WORKERS, queue_limit=JOB_QUEUE_LIMIT):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self._lock = threading.Lock()
+        self._executor = None
+        self._heartbeat = None
+        self._stop = threading.Event()
+        self._owned = set()   # ids of this process's queued and running jobs
+        self._counters = {
+            'submitted': 0,
+            'succeeded': 0,
+            'failed': 0,
+            'rejected_busy': 0,
+            'rejected_full': 0,
+        }
+
+    def _start(self):
+        # Threads start with the first job, so importing the app starts none
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='job')
+            self._heartbeat = threading.Thread(target=self._beat, name='job-heartbeat', daemon=True)
+            self._heartbeat.start()
+
+    def _beat(self):
+        # Long items (one slow SMTP send) must not make a live job look abandoned
+        while not self._stop.wait(JOB_HEARTBEAT_MS / 1000):
+            with self._lock:
+                owned = list(self._owned)
+            if not owned:
+                continue
+            try:
+                with get_db() as conn:
+                    conn.execute('UPDATE jobs SET updated_at = ? WHERE id IN (SELECT value FROM json_each(?))',
+                                 (scan_time.now_ms(), json.dumps(owned)))
+                    conn.commit()
+            except Exception as e:
+                print(f"⚠️ Job heartbeat failed: {e}")
+
+    def submit(self, kind, work):
+        """Queue work(progress) -> result dict; returns the new job id
+
+        Raises JobBusy if a job of this kind is already active on any worker,
+        or JobQueueFull if this worker has no room.
+        """
+        with self._lock:
+            if len(self._owned) >= self.queue_limit:
+                self._counters['rejected_full'] += 1
+                raise JobQueueFull(f'{len(self._owned)} jobs already queued or running')
+
+            job_id = uuid.uuid4().hex
+            now = scan_time.now_ms()
+            with get_db() as conn:
+                conn.execute('BEGIN IMMEDIATE')
+                try:
+                    # Jobs whose worker stopped heartbeating are not coming back
+                    conn.execute('''
+                        UPDATE jobs SET status = 'interrupted', finished_at = ?,
+                               error = 'Stopped reporting progress (the worker running it exited)'
+                        WHERE status IN ('queued', 'running') AND updated_at < ?
+                    ''', (now, now - JOB_STALE_MS))
+                    active = conn.execute('''
+                        SELECT id FROM jobs WHERE kind = ? AND status IN ('queued', 'running')
+                    ''', (kind,)).fetchone()
+                    if active:
+                        conn.rollback()
+                        self._counters['rejected_busy'] += 1
+                        raise JobBusy(active[0])
+                    conn.execute('''
+                        INSERT INTO jobs (id, kind, status, created_at, updated_at)
+                        VALUES (?, ?, 'queued', ?, ?)
+                    ''', (job_id, kind, now, now))
+                    conn.execute('''
+                        DELETE FROM jobs WHERE id IN (
+                            SELECT id FROM jobs WHERE status NOT IN ('queued', 'running')
+                            ORDER BY created_at DESC LIMIT -1 OFFSET ?
+                        )
+                    ''', (JOB_HISTORY,))
+                    conn.commit()
+                except Exception:
+                    if conn.in_transaction:
+                        conn.rollback()
+                    raise
+
+            self._owned.add(job_id)
+            self._counters['submitted'] += 1
+            self._start()
+        self._executor.submit(self._run, job_id, work)
+        return job_id
+
+    def _run(self, job_id, work):
+        progress = JobProgress(job_id)
+        status, result, error = 'failed', None, None
+        try:
+            progress.flush(force=True, status='running', started_at=scan_time.now_ms())
+            result = work(progress)
+            status = 'succeeded'
+        except JobFailed as e:
+            result, error = e.result, str(e)
+        except Exception as e:
+            traceback.print_exc()
+            error = f'{type(e).__name__}: {e}'
+        finally:
+            try:
+                with get_db() as conn:
+                    if conn.in_transaction:
+                        conn.rollback()
+                    progress.flush(force=True, status=status, error=error, finished_at=scan_time.now_ms(),
+                                   result=json.dumps(result) if result is not None else None)
+            except Exception as e:
+                print(f"⚠️ Could not record the end of job {job_id}: {e}")
+            with self._lock:
+                self._owned.discard(job_id)
+                self._counters['succeeded' if status == 'succeeded' else 'failed'] += 1
+
+    def wait(self, timeout=None):
+        """Block until this process has no queued or running jobs (tests, shutdown)"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                if not self._owned:
+                    return True
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.02)
+
+    def stop(self):
+        self._stop.set()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats['active'] = len(self._owned)
+        stats['workers'] = self.workers
+        stats['queue_limit'] = self.queue_limit
+        return stats
+
+
+def describe(row):
+    """Status dict for a jobs row, with throughput and an ETA while it runs"""
+    (job_id, kind, status, unit, total, done, failed, failures, result, error,
+     created_at, started_at, updated_at, finished_at) = row
+    now = scan_time.now_ms()
+    elapsed_ms = ((finished_at or now) - started_at) if started_at else 0
+    rate = done / (elapsed_ms / 1000) if elapsed_ms > 0 and done else 0.0
+    eta = None
+    if status == 'running' and total is not None and rate > 0:
+        eta = round(max(total - done, 0) / rate, 1)
+
+    return {
+        'id': job_id,
+        'kind': kind,
+        'status': status,
+        'unit': unit,
+        'total': total,
+        'done': done,
+        'failed': failed,
+        'percent': round(done * 100 / total, 1) if total else (100.0 if status == 'succeeded' else 0.0),
+        'created_at': scan_time.format_ist(created_at),
+        'started_at': scan_time.format_ist(started_at),
+        'finished_at': scan_time.format_ist(finished_at),
+        'elapsed_seconds': round(elapsed_ms / 1000, 1),
+        'rate_per_second': round(rate, 2),
+        'eta_seconds': eta,
+        'failures': json.loads(failures),
+        'result': json.loads(result) if result else None,
+        'error': error,
+    }
+
+
+JOB_COLUMNS = '''id, kind, status, unit, total, done, failed, failures, result, error,
+                 created_at, started_at, updated_at, finished_at'''
+
+
+def get_job(conn, job_id):
+    row = conn.execute(f'SELECT {JOB_COLUMNS} FROM jobs WHERE id = ?', (job_id,)).fetchone()
+    return describe(row) if row else None
+
+
+def recent_jobs(conn, limit=20, active_only=False):
+    where = "WHERE status IN ('queued', 'running')" if active_only else ''
+    rows = conn.execute(f'''
+        SELECT {JOB_COLUMNS} FROM jobs {where}
+        ORDER BY created_at DESC
+        LIMIT ?
+    ''', (limit,)).fetchall()
+    return [describe(row) for row in rows]
+
+
+job_runner = JobRunner()
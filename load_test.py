@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+Concurrent gate load test for the QR validation endpoints
+Seeds a synthetic roster, replays a reproducible arrival schedule across N
+gates against /api/validate_qr and /validate/<qr_hash>, and prints JSON
+
+Usage:
+    python load_test.py --gates 8 --rate 200 --scans 4000
+    python load_test.py --url http://localhost:5000 --db student_event.db --gates 8 --rate 200
+    python load_test.py --output baseline.json
+    python load_test.py --baseline baseline.json
+"""
+
+import argparse
+import contextlib
+import hashlib
+import json
+import math
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+LOAD_PRN_PREFIX = 'LOAD'
+OUTCOMES = ['admitted', 'already_scanned', 'invalid', 'locked', 'error']
+
+def parse_mix(value):
+    """'valid=0.7,duplicate=0.2,invalid=0.1' -> normalised weights"""
+    mix = {'valid': 0.0, 'duplicate': 0.0, 'invalid': 0.0}
+    for part in value.split(','):
+        kind, _, weight = part.partition('=')
+        if kind.strip() not in mix:
+            raise argparse.ArgumentTypeError(f'Unknown code kind: {kind}')
+        mix[kind.strip()] = float(weight)
+    total = sum(mix.values())
+    if total <= 0:
+        raise argparse.ArgumentTypeError('Mix weights must add up to more than 0')
+    return {kind: weight / total for kind, weight in mix.items()}
+
+def badge_hash(seed, number):
+    return hashlib.sha256(f'load-{seed}-{number}'.encode()).hexdigest()[:16]
+
+def seed_roster(db_path, students, seed):
+    """Replace the synthetic LOAD* roster (and its scans) with a fresh one"""
+    from migrations import run_migrations
+
+    conn = sqlite3.connect(db_path, timeout=30)
+    try:
+        run_migrations(conn)
+        conn.execute("DELETE FROM scans WHERE student_id IN "
+                     "(SELECT id FROM students WHERE prn_number LIKE ?)", (f'{LOAD_PRN_PREFIX}%',))
+        conn.execute('DELETE FROM students WHERE prn_number LIKE ?', (f'{LOAD_PRN_PREFIX}%',))
+        conn.executemany('''
+            INSERT INTO students (name, prn_number, email, qr_hash)
+            VALUES (?, ?, ?, ?)
+        ''', [(f'Load Student {i}', f'{LOAD_PRN_PREFIX}{i:06d}', f'load{i}@example.com', badge_hash(seed, i))
+              for i in range(students)])
+        conn.commit()
+    finally:
+        conn.close()
+    return [badge_hash(seed, i) for i in range(students)]
+
+def build_schedule(args, badges):
+    """Poisson arrivals at the total rate, each assigned a gate, code and endpoint"""
+    rng = random.Random(args.seed)
+    kinds = list(args.mix)
+    weights = [args.mix[kind] for kind in kinds]
+
+    schedule = []
+    issued = []
+    fresh = iter(badges)
+    at = 0.0
+    for _ in range(args.scans):
+        at += rng.expovariate(args.rate)
+        kind = rng.choices(kinds, weights)[0]
+        code = None
+        if kind == 'valid' or (kind == 'duplicate' and not issued):
+            code = next(fresh, None)
+            kind = 'valid' if code else 'duplicate'
+            if code:
+                issued.append(code)
+        if kind == 'duplicate':
+            code = rng.choice(issued) if issued else f'bogus-{rng.getrandbits(64):016x}'
+        elif kind == 'invalid':
+            code = f'bogus-{rng.getrandbits(64):016x}'
+        endpoint = 'url' if rng.random() < args.url_share else 'api'
+        schedule.append((at, rng.randrange(args.gates), kind, code, endpoint))
+    return schedule, len(issued)
+
+def classify(status, body):
+    """Map a response to one of OUTCOMES from its status and body text"""
+    if 'database is locked' in body:
+        return 'locked'
+    if 'QR code scanned successfully' in body:
+        return 'admitted'
+    if 'QR code already scanned' in body:
+        return 'already_scanned'
+    if 'Invalid QR code' in body:
+        return 'invalid'
+    return 'error' if status >= 500 or 'rror' in body else 'invalid'
+
+def make_sender(args):
+    """Return a factory of per-gate send(endpoint, code) -> (status, body)"""
+    if args.url:
+        import requests
+
+        def factory():
+            session = requests.Session()
+
+            def send(endpoint, code):
+                if endpoint == 'url':
+                    response = session.get(f'{args.url}/validate/{code}', timeout=30)
+                else:
+                    response = session.post(f'{args.url}/api/validate_qr', json={'qr_hash': code}, timeout=30)
+                return response.status_code, response.text
+            return send
+        return factory
+
+    with contextlib.redirect_stdout(sys.stderr):  # keep startup messages out of the JSON
+        from app import app
+
+    def factory():
+        client = app.test_client()
+
+        def send(endpoint, code):
+            if endpoint == 'url':
+                response = client.get(f'/validate/{code}')
+            else:
+                response = client.post('/api/validate_qr', json={'qr_hash': code})
+            return response.status_code, response.get_data(as_text=True)
+        return send
+    return factory
+
+def run_gates(args, schedule, sender_factory):
+    """One thread per gate; each gate works through its own arrivals in order"""
+    per_gate = [[] for _ in range(args.gates)]
+    for arrival in schedule:
+        per_gate[arrival[1]].append(arrival)
+
+    samples = []
+    samples_lock = threading.Lock()
+    start_barrier = threading.Barrier(args.gates + 1)
+    started = [0.0]
+
+    def gate(arrivals):
+        send = sender_factory()
+        gate_samples = []
+        start_barrier.wait()
+        for at, _, kind, code, endpoint in arrivals:
+            due = started[0] + at
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            sent = time.perf_counter()
+            try:
+                status, body = send(endpoint, code)
+                outcome = classify(status, body)
+            except Exception as e:
+                outcome = 'locked' if 'locked' in str(e) else 'error'
+            done = time.perf_counter()
+            # Latency counts from the scheduled arrival so a backed-up gate shows
+            # its queueing delay instead of hiding it (no coordinated omission)
+            gate_samples.append((endpoint, kind, outcome, done - due, done - sent))
+        with samples_lock:
+            samples.extend(gate_samples)
+
+    threads = [threading.Thread(target=gate, args=(arrivals,)) for arrivals in per_gate]
+    for thread in threads:
+        thread.start()
+    started[0] = time.perf_counter()
+    start_barrier.wait()
+    for thread in threads:
+        thread.join()
+    return samples, time.perf_counter() - started[0]
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    # Nearest-rank percentile
+    index = min(len(sorted_values) - 1, max(0, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+def latency_summary(latencies):
+    values = sorted(latencies)
+    return {
+        'p50_ms': round(percentile(values, 0.50) * 1000, 2),
+        'p95_ms': round(percentile(values, 0.95) * 1000, 2),
+        'p99_ms': round(percentile(values, 0.99) * 1000, 2),
+        'max_ms': round(values[-1] * 1000, 2) if values else 0.0,
+    }
+
+def build_report(args, samples, elapsed, expected_admitted):
+    outcomes = Counter(sample[2] for sample in samples)
+    report = {
+        'config': {
+            'target': args.url or 'in-process',
+            'gates': args.gates,
+            'rate': args.rate,
+            'scans': args.scans,
+            'students': args.students,
+            'mix': {kind: round(weight, 4) for kind, weight in args.mix.items()},
+            'url_share': args.url_share,
+            'seed': args.seed,
+        },
+        'elapsed_seconds': round(elapsed, 3),
+        'throughput_rps': round(len(samples) / elapsed, 1) if elapsed else 0.0,
+        'latency': latency_summary([sample[3] for sample in samples]),
+        'service_latency': latency_summary([sample[4] for sample in samples]),
+        'endpoints': {
+            endpoint: latency_summary([sample[3] for sample in samples if sample[0] == endpoint])
+            for endpoint in sorted({sample[0] for sample in samples})
+        },
+        'outcomes': {outcome: outcomes.get(outcome, 0) for outcome in OUTCOMES},
+        'errors': outcomes.get('error', 0),
+        'locks': outcomes.get('locked', 0),
+        # Every distinct valid badge must be admitted exactly once
+        'admitted_expected': expected_admitted,
+        'admitted_mismatch': outcomes.get('admitted', 0) - expected_admitted,
+    }
+    return report
+
+def compare(report, baseline):
+    """Relative change against a saved report (positive throughput = faster)"""
+    def change(new, old):
+        return round((new - old) / old * 100, 1) if old else None
+
+    return {
+        'throughput_rps_pct': change(report['throughput_rps'], baseline['throughput_rps']),
+        'p50_ms_pct': change(report['latency']['p50_ms'], baseline['latency']['p50_ms']),
+        'p95_ms_pct': change(report['latency']['p95_ms'], baseline['latency']['p95_ms']),
+        'p99_ms_pct': change(report['latency']['p99_ms'], baseline['latency']['p99_ms']),
+        'errors': report['errors'] - baseline['errors'],
+        'locks': report['locks'] - baseline['locks'],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--gates', type=int, default=8, help='concurrent scanning gates')
+    parser.add_argument('--rate', type=float, default=200.0, help='total arrivals per second')
+    parser.add_argument('--scans', type=int, default=2000, help='total scans to send')
+    parser.add_argument('--students', type=int, default=2000, help='synthetic roster size')
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix('valid=0.7,duplicate=0.2,invalid=0.1'),
+                        help='share of valid, duplicate and invalid codes')
+    parser.add_argument('--url-share', type=float, default=0.2,
+                        help='share of scans sent to /validate/<qr_hash> instead of /api/validate_qr')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--url', help='base URL of a running server (default: in-process test client)')
+    parser.add_argument('--db', help="database to seed; with --url it must be the server's DATABASE_PATH")
+    parser.add_argument('--output', help='also write the JSON report to this file')
+    parser.add_argument('--baseline', help='earlier report to compare against')
+    args = parser.parse_args()
+
+    if args.url:
+        if not args.db:
+            parser.error('--url needs --db pointing at the server database')
+        args.url = args.url.rstrip('/')
+        db_path = args.db
+    else:
+        db_path = args.db or os.path.join(tempfile.mkdtemp(prefix='depali_load_'), 'student_event.db')
+        os.environ['DATABASE_PATH'] = db_path
+
+    with contextlib.redirect_stdout(sys.stderr):
+        badges = seed_roster(db_path, args.students, args.seed)
+    schedule, expected_admitted = build_schedule(args, badges)
+    samples, elapsed = run_gates(args, schedule, make_sender(args))
+
+    report = build_report(args, samples, elapsed, expected_admitted)
+    if args.baseline:
+        with open(args.baseline) as f:
+            report['vs_baseline'] = compare(report, json.load(f))
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    return 1 if report['errors'] or report['admitted_mismatch'] else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
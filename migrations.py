@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+Versioned schema migrations for Student Event Management System
+Each step runs once, in order, and is recorded in the schema_version table
+"""
+
+import time
+
+import attendance_stats
+import scan_time
+import student_search
+
+
+def column_exists(conn, table, column):
+    """Check whether a column is already present (for ALTER TABLE steps)"""
+    return any(row[1] == column for row in conn.execute(f'PRAGMA table_info({table})'))
+
+
+def add_column(conn, table, column, definition):
+    """Add a column unless an earlier, unversioned build already added it"""
+    if not column_exists(conn, table, column):
+        conn.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+
+
+def migration_001_base_tables(conn):
+    # Students table
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS students (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            prn_number TEXT UNIQUE NOT NULL,
+            email TEXT NOT NULL,
+            qr_code_path TEXT,
+            qr_hash TEXT UNIQUE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            email_sent BOOLEAN DEFAULT FALSE
+        )
+    ''')
+
+    # Scans table
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS scans (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            student_id INTEGER,
+            scanned_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            scanner_info TEXT,
+            FOREIGN KEY (student_id) REFERENCES students (id)
+        )
+    ''')
+
+    # Events table for future extensibility
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            description TEXT,
+            event_date DATE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            is_active BOOLEAN DEFAULT TRUE
+        )
+    ''')
+
+
+def migration_002_unique_scan_per_student(conn):
+    # Drop duplicate rows left by older versions, keeping the earliest scan,
+    # then let a unique index enforce one scan per student for every check-in
+    cursor = conn.execute('''
+        DELETE FROM scans
+        WHERE student_id IS NOT NULL
+          AND id NOT IN (SELECT MIN(id) FROM scans GROUP BY student_id)
+    ''')
+    if cursor.rowcount > 0:
+        print(f"🧹 Removed {cursor.rowcount} duplicate scan rows")
+    conn.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_scans_student_unique ON scans (student_id)')
+
+
+def migration_003_roster_version(conn):
+    # Bumped by triggers whenever students change or scans are deleted, so
+    # every worker can tell when its in-memory roster index is stale
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS roster_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL
+        )
+    ''')
+    conn.execute('INSERT OR IGNORE INTO roster_version (id, version) VALUES (1, 0)')
+    for trigger_name, trigger_event in [
+        ('trg_roster_version_insert', 'AFTER INSERT ON students'),
+        ('trg_roster_version_update', 'AFTER UPDATE OF name, prn_number, email, qr_hash ON students'),
+        ('trg_roster_version_delete', 'AFTER DELETE ON students'),
+        ('trg_roster_version_scans_delete', 'AFTER DELETE ON scans'),
+    ]:
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {trigger_name} {trigger_event}
+            BEGIN
+                UPDATE roster_version SET version = version + 1 WHERE id = 1;
+            END
+        ''')
+
+
+def migration_004_hot_path_indexes(conn):
+    # Dashboard roster is ordered by name
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_students_name ON students (name)')
+    # send_emails_* queue: equality on email_sent first, then the range on qr_code_path
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_students_email_queue ON students (email_sent, qr_code_path)')
+    # generate_qr_codes picks up students whose qr_code_path IS NULL
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_students_qr_code_path ON students (qr_code_path)')
+
+
+def migration_005_scan_sync_log(conn):
+    # Offline scanners retry a sync until they see a response; the stored
+    # result per client scan id lets a retry get the original answer back
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS scan_sync_log (
+            client_scan_id TEXT PRIMARY KEY,
+            device_id TEXT,
+            qr_hash TEXT NOT NULL,
+            result TEXT NOT NULL,
+            synced_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+
+def migration_006_attendance_stats(conn):
+    # Single-row counters kept exact by triggers, so dashboard reads are one
+    # row instead of COUNT(*) over students and scans on every poll
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS attendance_stats (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            total_students INTEGER NOT NULL DEFAULT 0,
+            with_qr INTEGER NOT NULL DEFAULT 0,
+            with_hash INTEGER NOT NULL DEFAULT 0,
+            emailed INTEGER NOT NULL DEFAULT 0,
+            scanned INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    attendance_stats.rebuild(conn)
+
+    student_delta = '''
+        total_students = total_students + {sign},
+        with_qr = with_qr + {sign} * ({row}.qr_code_path IS NOT NULL),
+        with_hash = with_hash + {sign} * ({row}.qr_hash IS NOT NULL),
+        emailed = emailed + {sign} * (COALESCE({row}.email_sent, 0) != 0)
+    '''
+    for trigger_name, trigger_event, body in [
+        ('trg_stats_students_insert', 'AFTER INSERT ON students',
+         'UPDATE attendance_stats SET ' + student_delta.format(sign=1, row='NEW') + ' WHERE id = 1;'),
+        ('trg_stats_students_delete', 'AFTER DELETE ON students',
+         'UPDATE attendance_stats SET ' + student_delta.format(sign=-1, row='OLD') + ' WHERE id = 1;'),
+        ('trg_stats_students_update', 'AFTER UPDATE OF qr_code_path, qr_hash, email_sent ON students', '''
+            UPDATE attendance_stats SET
+                with_qr = with_qr + (NEW.qr_code_path IS NOT NULL) - (OLD.qr_code_path IS NOT NULL),
+                with_hash = with_hash + (NEW.qr_hash IS NOT NULL) - (OLD.qr_hash IS NOT NULL),
+                emailed = emailed + (COALESCE(NEW.email_sent, 0) != 0) - (COALESCE(OLD.email_sent, 0) != 0)
+            WHERE id = 1;
+        '''),
+        # scans.student_id is unique (migration 2), so one row is one scanned student
+        ('trg_stats_scans_insert', 'AFTER INSERT ON scans',
+         'UPDATE attendance_stats SET scanned = scanned + (NEW.student_id IS NOT NULL) WHERE id = 1;'),
+        ('trg_stats_scans_delete', 'AFTER DELETE ON scans',
+         'UPDATE attendance_stats SET scanned = scanned - (OLD.student_id IS NOT NULL) WHERE id = 1;'),
+        ('trg_stats_scans_update', 'AFTER UPDATE OF student_id ON scans', '''
+            UPDATE attendance_stats SET
+                scanned = scanned + (NEW.student_id IS NOT NULL) - (OLD.student_id IS NOT NULL)
+            WHERE id = 1;
+        '''),
+    ]:
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {trigger_name} {trigger_event}
+            BEGIN
+                {body}
+            END
+        ''')
+
+
+def migration_007_roster_page_indexes(conn):
+    # /api/students sorted by scan time walks scans in scanned_at order
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_scans_scanned_at ON scans (scanned_at)')
+
+
+def migration_008_scan_version(conn):
+    # A synced offline scan can move an existing scanned_at earlier. That
+    # leaves the roster index and scan cache valid, so it bumps its own
+    # counter rather than roster_version, which reloads every index; the
+    # dashboards, streams and ETags watch both
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS scan_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL
+        )
+    ''')
+    conn.execute('INSERT OR IGNORE INTO scan_version (id, version) VALUES (1, 0)')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_scan_version_update AFTER UPDATE ON scans
+        BEGIN
+            UPDATE scan_version SET version = version + 1 WHERE id = 1;
+        END
+    ''')
+
+
+def migration_009_student_search(conn):
+    # Trigram index over name, PRN and email for substring search; it reads
+    # column values from students and the triggers keep it in step
+    conn.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS students_fts USING fts5(
+            name, prn_number, email,
+            content='students', content_rowid='id', tokenize='trigram'
+        )
+    ''')
+    student_search.rebuild(conn)
+    # One- and two-character searches are name prefixes; LIKE is
+    # case-insensitive, so only a NOCASE index can serve them
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_students_name_nocase ON students (name COLLATE NOCASE)')
+    for trigger_name, trigger_event, body in [
+        ('trg_students_fts_insert', 'AFTER INSERT ON students', '''
+            INSERT INTO students_fts (rowid, name, prn_number, email)
+            VALUES (new.id, new.name, new.prn_number, new.email);'''),
+        ('trg_students_fts_delete', 'AFTER DELETE ON students', '''
+            INSERT INTO students_fts (students_fts, rowid, name, prn_number, email)
+            VALUES ('delete', old.id, old.name, old.prn_number, old.email);'''),
+        ('trg_students_fts_update', 'AFTER UPDATE OF name, prn_number, email ON students', '''
+            INSERT INTO students_fts (students_fts, rowid, name, prn_number, email)
+            VALUES ('delete', old.id, old.name, old.prn_number, old.email);
+            INSERT INTO students_fts (rowid, name, prn_number, email)
+            VALUES (new.id, new.name, new.prn_number, new.email);'''),
+    ]:
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {trigger_name} {trigger_event}
+            BEGIN{body}
+            END
+        ''')
+
+
+def migration_010_scan_time_epoch_ms(conn):
+    # scanned_at becomes integer epoch milliseconds. Old rows hold either
+    # 'YYYY-MM-DD HH:MM:SS IST' or the UTC CURRENT_TIMESTAMP default, which
+    # do not even sort together; SQLite cannot change a column's type, so
+    # the table is rebuilt and its indexes and triggers recreated
+    conn.create_function('legacy_scan_ms', 1, scan_time.from_legacy, deterministic=True)
+    dependents = [row[0] for row in conn.execute('''
+        SELECT sql FROM sqlite_master
+        WHERE tbl_name = 'scans' AND type IN ('index', 'trigger') AND sql IS NOT NULL
+    ''')]
+    sequence = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'scans'").fetchone()
+    unparsed = conn.execute('''
+        SELECT COUNT(*) FROM scans WHERE scanned_at IS NOT NULL AND legacy_scan_ms(scanned_at) IS NULL
+    ''').fetchone()[0]
+    if unparsed:
+        print(f"⚠️ {unparsed} scan time(s) could not be read and are set to the migration time")
+
+    conn.execute(f'''
+        CREATE TABLE scans_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            student_id INTEGER,
+            scanned_at INTEGER NOT NULL DEFAULT ({scan_time.NOW_MS_SQL}),
+            scanner_info TEXT,
+            FOREIGN KEY (student_id) REFERENCES students (id)
+        )
+    ''')
+    conn.execute(f'''
+        INSERT INTO scans_new (id, student_id, scanned_at, scanner_info)
+        SELECT id, student_id, COALESCE(legacy_scan_ms(scanned_at), {scan_time.NOW_MS_SQL}), scanner_info
+        FROM scans
+    ''')
+    conn.execute('DROP TABLE scans')
+    conn.execute('ALTER TABLE scans_new RENAME TO scans')
+    if sequence:
+        # Keep ids of deleted scans from being handed out again
+        conn.execute("UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = 'scans'", sequence)
+    for sql in dependents:
+        conn.execute(sql)
+
+
+def migration_011_jobs(conn):
+    # Background jobs (uploads, QR generation, email sends). Progress lives
+    # in the database so any worker can answer /api/jobs/<id>
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS jobs (
+            id TEXT PRIMARY KEY,
+            kind TEXT NOT NULL,
+            status TEXT NOT NULL,
+            unit TEXT NOT NULL DEFAULT 'items',
+            total INTEGER,
+            done INTEGER NOT NULL DEFAULT 0,
+            failed INTEGER NOT NULL DEFAULT 0,
+            failures TEXT NOT NULL DEFAULT '[]',
+            result TEXT,
+            error TEXT,
+            created_at INTEGER NOT NULL,
+            started_at INTEGER,
+            updated_at INTEGER NOT NULL,
+            finished_at INTEGER
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_kind_status ON jobs (kind, status)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_created_at ON jobs (created_at)')
+
+
+def migration_012_roster_imports(conn):
+    # One row per roster file applied, so re-uploading the last file is a no-op
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS roster_imports (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            content_hash TEXT NOT NULL,
+            filename TEXT NOT NULL,
+            mode TEXT NOT NULL,
+            counts TEXT NOT NULL,
+            imported_at INTEGER NOT NULL
+        )
+    ''')
+
+
+# Ordered list of (version, description, step). Append new steps at the end;
+# never edit or renumber a step that has shipped.
+MIGRATIONS = [
+    (1, 'base tables', migration_001_base_tables),
+    (2, 'unique scan per student', migration_002_unique_scan_per_student),
+    (3, 'roster version triggers', migration_003_roster_version),
+    (4, 'hot path indexes', migration_004_hot_path_indexes),
+    (5, 'scan sync log', migration_005_scan_sync_log),
+    (6, 'attendance stats counters', migration_006_attendance_stats),
+    (7, 'roster page indexes', migration_007_roster_page_indexes),
+    (8, 'scan version on scan time corrections', migration_008_scan_version),
+    (9, 'student search index', migration_009_student_search),
+    (10, 'scan times as epoch milliseconds', migration_010_scan_time_epoch_ms),
+    (11, 'background jobs', migration_011_jobs),
+    (12, 'roster import history', migration_012_roster_imports),
+]
+
+
+def current_version(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    return conn.execute('SELECT COALESCE(MAX(version), 0) FROM schema_version').fetchone()[0]
+
+
+def run_migrations(conn):
+    """Apply pending migrations; returns the list of versions applied"""
+    applied = []
+    if current_version(conn) >= MIGRATIONS[-1][0]:
+        return applied
+
+    for version, description, step in MIGRATIONS:
+        # BEGIN IMMEDIATE serialises workers that start at the same time;
+        # re-check the version once we hold the write lock
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            if current_version(conn) >= version:
+                conn.rollback()
+                continue
+
+            started = time.perf_counter()
+            step(conn)
+            conn.execute('INSERT INTO schema_version (version, description) VALUES (?, ?)',
+                         (version, description))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+        applied.append(version)
+        print(f"📦 Applied migration {version}: {description} "
+              f"({(time.perf_counter() - started) * 1000:.1f} ms)")
+
+    return applied
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+QR code images rendered on every core
+generate_qr_codes makes the tokens and writes the database itself; only the
+(url, path) pairs are handed to a process pool here, in chunks, so the
+secret key never leaves the app and SQLite is only written from one place
+"""
+
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import qrcode
+
+# CPUs this process may run on, which in a container can be fewer than os.cpu_count()
+CPUS = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count() or 1
+
+QR_WORKERS = int(os.environ.get('QR_WORKERS', CPUS))                   # 1 renders in the job's own thread
+QR_RENDER_CHUNK = int(os.environ.get('QR_RENDER_CHUNK', 50))          # images per task sent to a worker
+
+
+def render_qr(url, path):
+    """Write url as a QR code PNG at path"""
+    qr = qrcode.QRCode(version=1, box_size=10, border=5)
+    qr.add_data(url)
+    qr.make(fit=True)
+    qr.make_image(fill_color="black", back_color="white").save(path)
+
+
+def render_chunk(items):
+    """Render (url, path) pairs; returns (position, error) for each one that failed"""
+    failed = []
+    for position, (url, path) in enumerate(items):
+        try:
+            render_qr(url, path)
+        except Exception as e:
+            failed.append((position, str(e)))
+    return failed
+
+
+def pool_context():
+    # Workers come from a fork server that has only imported this module, so
+    # they never inherit the app's threads, locks or database connections
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('forkserver')
+        context.set_forkserver_preload([__name__])
+        return context
+    return multiprocessing.get_context('spawn')
+
+
+class QrRenderer:
+    """Renders a list of QR codes across up to `workers` processes
+
+    A pool is started for each call and shut down after it, so no idle
+    processes are left behind in every web worker between runs.
+    """
+
+    def __init__(self, workers=QR_WORKERS, chunk_size=QR_RENDER_CHUNK):
+        self.workers = workers
+        self.chunk_size = max(chunk_size, 1)
+        self._lock = threading.Lock()
+        self._counters = {
+            'runs': 0,
+            'rendered': 0,
+            'failed': 0,
+            'seconds': 0.0,
+        }
+        self._last_rate = None
+
+    def render(self, items, done=None):
+        """Render every (url, path) in items; returns {index: error} for the failures
+
+        done(count, failures) is called as each chunk finishes, in order, with
+        the chunk's size and its {index: error} failures.
+        """
+        chunks = [items[start:start + self.chunk_size] for start in range(0, len(items), self.chunk_size)]
+        workers = min(self.workers, len(chunks))
+        started = time.perf_counter()
+        failures = {}
+
+        pool = None
+        if workers > 1:
+            pool = ProcessPoolExecutor(workers, mp_context=pool_context())
+            results = pool.map(render_chunk, chunks)
+        else:
+            results = map(render_chunk, chunks)
+        try:
+            for number, failed in enumerate(results):
+                start = number * self.chunk_size
+                chunk_failures = {start + position: error for position, error in failed}
+                failures.update(chunk_failures)
+                if done:
+                    done(len(chunks[number]), chunk_failures)
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+
+        seconds = time.perf_counter() - started
+        with self._lock:
+            self._counters['runs'] += 1
+            self._counters['rendered'] += len(items) - len(failures)
+            self._counters['failed'] += len(failures)
+            self._counters['seconds'] += seconds
+            if items and seconds > 0:
+                self._last_rate = round(len(items) / seconds, 1)
+        return failures
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats['seconds'] = round(stats['seconds'], 2)
+            stats['last_images_per_second'] = self._last_rate
+        stats['workers'] = self.workers
+        stats['chunk_size'] = self.chunk_size
+        return stats
+
+
+qr_renderer = QrRenderer()
@@ -0,0 +1,643 @@
+#!/usr/bin/env python3
+"""
+Roster import from uploaded CSV/Excel sheets
+Sheets are read and written in fixed-size chunks: each chunk is normalised
+and de-duplicated with pandas, then inserted with one executemany in its own
+short transaction, so memory stays flat and check-ins are never locked out
+for long. PRNs already registered are skipped by ON CONFLICT DO NOTHING.
+
+A re-import compares a whole updated sheet with the students table instead:
+new PRNs, changed names or emails and PRNs no longer listed are previewed,
+then applied together in one transaction.
+"""
+
+import csv
+import hashlib
+import json
+import os
+import re
+import xml.etree.ElementTree as ET
+import zipfile
+
+import pandas as pd
+
+import scan_time
+
+# Sheet heading -> students column
+REQUIRED_COLUMNS = {
+    'Student Name': 'name',
+    'PRN Number': 'prn_number',
+    'Email Address': 'email',
+}
+
+IMPORT_CHUNK_ROWS = int(os.environ.get('IMPORT_CHUNK_ROWS', 5000))
+DIFF_SAMPLE_ROWS = 50    # rows of each kind of change listed in a preview
+REJECTED_REPORT_ROWS = int(os.environ.get('REJECTED_REPORT_ROWS', 200))   # rejected rows listed in a response
+
+# Letters, digits and - / . _ or inner spaces, with at least one digit:
+# rules out placeholders such as 'N/A', '-' or '#VALUE!'. Neither pattern
+# may match a line break: matches() checks a whole column joined by them
+PRN_PATTERN = re.compile(r'(?=[^0-9\n]*[0-9])[A-Za-z0-9][A-Za-z0-9 /._-]{0,63}')
+EMAIL_PATTERN = re.compile(
+    r"[A-Za-z0-9!#$%&'*+/=?^_`{|}~-]+(?:\.[A-Za-z0-9!#$%&'*+/=?^_`{|}~-]+)*"
+    r'@(?:[A-Za-z0-9](?:[A-Za-z0-9-]{0,61}[A-Za-z0-9])?\.)+[A-Za-z]{2,63}'
+)
+# What str.strip() and \s treat as whitespace in ASCII text, besides '\n'
+ASCII_SPACE = ' \t\r\x0b\x0c\x1c\x1d\x1e\x1f'
+# Whole numbers as a spreadsheet may write them: 1102310789.0, 1.2e11, 1.2E+11
+FLOAT_PRN = re.compile(r'[0-9]+\.0+|[0-9]+(?:\.[0-9]+)?[eE]\+?[0-9]+')
+
+
+class RosterChangedError(ValueError):
+    """The students table changed between a re-import preview and its apply"""
+
+
+class RosterSchemaError(ValueError):
+    """The sheet is not a readable roster; row is the sheet row (the header is row 1)
+
+    counts holds what was imported from the chunks before the error.
+    """
+
+    def __init__(self, row, message):
+        super().__init__(f'Row {row}: {message}')
+        self.row = row
+        self.counts = None
+
+
+def check_columns(columns):
+    missing = [column for column in REQUIRED_COLUMNS if column not in columns]
+    if missing:
+        raise RosterSchemaError(1, f'Missing required columns: {missing}')
+    repeated = [column for column in REQUIRED_COLUMNS if list(columns).count(column) > 1]
+    if repeated:
+        raise RosterSchemaError(1, f'Columns appear more than once: {repeated}')
+
+
+def read_sheet(path):
+    """Every cell as text, so PRNs keep leading zeros and never turn into floats
+
+    Only used for legacy .xls files; .xlsx and CSV are streamed in chunks.
+    """
+    if path.endswith('.csv'):
+        return pd.read_csv(path, dtype=str, keep_default_na=False)
+    return pd.read_excel(path, dtype=str, keep_default_na=False)
+
+
+def iter_csv_chunks(path, chunk_rows=IMPORT_CHUNK_ROWS):
+    """(DataFrame of up to chunk_rows rows, bytes read so far) for a CSV file
+
+    Parsed with the csv module a row at a time, so only one chunk is ever in
+    memory and a malformed row raises RosterSchemaError as soon as it is
+    reached, with its line number. Chunks are indexed by line number too,
+    the header being line 1.
+    """
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        reader = csv.reader(f)
+        try:
+            header = next(reader, None)
+            if header is None:
+                raise RosterSchemaError(1, 'The file is empty')
+            header = [column.strip() for column in header]
+            check_columns(header)
+            width = len(header)
+
+            rows = []
+            numbers = []
+            for record in reader:
+                if not record:
+                    continue
+                if len(record) > width:
+                    raise RosterSchemaError(reader.line_num,
+                                            f'{len(record)} fields, but the header has {width}')
+                # Short rows are padded, as pandas does; the blanks are counted later
+                rows.append(record + [''] * (width - len(record)))
+                numbers.append(reader.line_num)
+                if len(rows) == chunk_rows:
+                    yield pd.DataFrame(rows, columns=header, index=numbers), f.buffer.tell()
+                    rows = []
+                    numbers = []
+            if rows:
+                yield pd.DataFrame(rows, columns=header, index=numbers), f.buffer.tell()
+        except (csv.Error, UnicodeDecodeError) as e:
+            raise RosterSchemaError(reader.line_num + 1, f'Unreadable row ({e})') from e
+
+
+def cell_text(value):
+    """An .xlsx cell as read_sheet would give it: whole numbers without '.0', blanks as ''"""
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def column_index(reference):
+    """Zero-based column of a cell reference such as 'AB12'"""
+    index = 0
+    for char in reference:
+        if char.isdigit():
+            break
+        index = index * 26 + ord(char.upper()) - 64
+    return index - 1
+
+
+def xlsx_parts(archive):
+    """Paths of the first worksheet and the shared strings inside an .xlsx archive"""
+    workbook = ET.fromstring(archive.read('xl/workbook.xml'))
+    sheet = next(element for element in workbook.iter() if element.tag.endswith('}sheet'))
+    relation = next(value for key, value in sheet.attrib.items() if key.endswith('}id'))
+
+    targets = {}
+    for element in ET.fromstring(archive.read('xl/_rels/workbook.xml.rels')):
+        target = element.get('Target')
+        target = target.lstrip('/') if target.startswith('/') else f'xl/{target}'
+        targets[element.get('Id')] = target
+        if element.get('Type', '').endswith('/sharedStrings'):
+            targets['sharedStrings'] = target
+    return targets[relation], targets.get('sharedStrings')
+
+
+def read_shared_strings(archive, path):
+    """Every shared string, in order; rich text runs are joined and phonetic hints left out"""
+    if path is None or path not in archive.namelist():
+        return []
+    strings = []
+    with archive.open(path) as f:
+        for _, element in ET.iterparse(f):
+            if element.tag.endswith('}si'):
+                strings.append(''.join(text.text or '' for text in element.iter()
+                                       if text.tag.endswith('}t') and not _in_phonetic(element, text)))
+                element.clear()
+    return strings
+
+
+def _in_phonetic(item, text):
+    # <rPh> runs carry furigana for the text beside them, not part of the value
+    return any(run.tag.endswith('}rPh') and text in run.iter() for run in item)
+
+
+def iter_xlsx_chunks(path, chunk_rows=IMPORT_CHUNK_ROWS):
+    """(DataFrame of up to chunk_rows rows, bytes of sheet XML read so far) for an .xlsx file
+
+    The first worksheet's XML is streamed straight out of the archive and only
+    cells in the three required columns are turned into values, so memory
+    holds the shared strings and one chunk, and unused columns cost almost
+    nothing. Chunks are indexed by sheet row. Cells read as read_sheet gives
+    them, except that dates stay Excel serial numbers (rosters hold none).
+    """
+    try:
+        archive = zipfile.ZipFile(path)
+        sheet_path, strings_path = xlsx_parts(archive)
+        shared = read_shared_strings(archive, strings_path)
+    except (zipfile.BadZipFile, KeyError, StopIteration, ET.ParseError) as e:
+        raise RosterSchemaError(1, f'Not a readable .xlsx file ({e})') from e
+
+    row_number = 1
+    with archive, archive.open(sheet_path) as f:
+        namespace = None
+        wanted = None      # column index -> position among REQUIRED_COLUMNS, once the header is read
+        columns = {}       # column letters -> index
+        sheet_data = None
+        record = {}
+        filled = False     # any cell in the row holds a value, wanted or not
+        next_column = 0
+        value = None
+        inline = []
+        rows = []
+        numbers = []
+        try:
+            for event, element in ET.iterparse(f, events=('start', 'end')):
+                if namespace is None:
+                    namespace = element.tag[:element.tag.index('}') + 1] if element.tag.startswith('{') else ''
+                    tags = {name: namespace + name for name in ('sheetData', 'row', 'c', 'v', 't', 'is')}
+                tag = element.tag
+
+                if event == 'start':
+                    if tag == tags['sheetData']:
+                        sheet_data = element
+                    elif tag == tags['row']:
+                        record = {}
+                        filled = False
+                        next_column = 0
+                        row_number = int(element.get('r', row_number + 1))
+                    continue
+
+                if tag == tags['v']:
+                    value = element.text
+                elif tag == tags['t']:
+                    inline.append(element.text or '')
+                elif tag == tags['c']:
+                    reference = element.get('r')
+                    if reference:
+                        letters = reference.rstrip('0123456789')
+                        column = columns.get(letters)
+                        if column is None:
+                            column = columns[letters] = column_index(letters)
+                    else:
+                        column = next_column
+                    next_column = column + 1
+                    filled = filled or bool(value) or any(inline)
+                    if wanted is None or column in wanted:
+                        kind = element.get('t')
+                        if kind == 's' and value is not None:
+                            text = shared[int(value)]
+                        elif kind == 'inlineStr':
+                            text = ''.join(inline)
+                        elif kind == 'b':
+                            text = 'True' if value == '1' else 'False'
+                        elif kind in (None, 'n') and value is not None:
+                            text = cell_text(float(value)) if any(c in value for c in '.Ee') else value
+                        else:
+                            text = value or ''
+                        record[column] = text
+                    value = None
+                    inline = []
+                elif tag == tags['row']:
+                    if wanted is None:
+                        header = [record.get(column, '').strip() for column in range(max(record, default=-1) + 1)]
+                        check_columns(header)
+                        wanted = {header.index(column): i for i, column in enumerate(REQUIRED_COLUMNS)}
+                    elif filled:
+                        # A row with data only outside the required columns is
+                        # still a roster row; validate() reports its blanks
+                        cells = [''] * len(REQUIRED_COLUMNS)
+                        for column, text in record.items():
+                            cells[wanted[column]] = text
+                        rows.append(cells)
+                        numbers.append(row_number)
+                        if len(rows) == chunk_rows:
+                            yield pd.DataFrame(rows, columns=list(REQUIRED_COLUMNS), index=numbers), f.tell()
+                            rows = []
+                            numbers = []
+                    # Rows already read are dropped so memory stays flat
+                    if sheet_data is not None:
+                        sheet_data.clear()
+        except RosterSchemaError:
+            raise
+        except (ET.ParseError, ValueError, IndexError) as e:
+            raise RosterSchemaError(row_number, f'Unreadable row ({e})') from e
+
+        if wanted is None:
+            raise RosterSchemaError(1, 'The file is empty')
+        if rows:
+            yield pd.DataFrame(rows, columns=list(REQUIRED_COLUMNS), index=numbers), f.tell()
+
+
+def iter_frame_chunks(df, chunk_rows=IMPORT_CHUNK_ROWS):
+    """An already loaded sheet, in the same (chunk, position) form, indexed by sheet row"""
+    check_columns(df.columns)
+    for start in range(0, len(df), chunk_rows):
+        chunk = df.iloc[start:start + chunk_rows]
+        yield chunk.set_axis(range(start + 2, start + 2 + len(chunk))), None
+
+
+def normalise(df):
+    """The three required columns renamed to students columns, as tidy text
+
+    Unicode compatibility forms are folded (full-width digits, non-breaking
+    spaces), every value is trimmed and runs of whitespace in names become
+    one space. Raises RosterSchemaError (a ValueError) naming any missing column.
+    """
+    check_columns(df.columns)
+    rows = df[list(REQUIRED_COLUMNS)].rename(columns=REQUIRED_COLUMNS)
+    rows = rows.apply(lambda column: column.fillna('').astype(str))
+    for column in rows:
+        # Each pass costs a Python call per cell, so it only runs on columns that need it
+        # and a cell holding a line break makes every check below run
+        text = '\n'.join(rows[column].tolist())
+        plain = (text.isascii() and text.count('\n') == len(rows) - 1
+                 and not set(text).intersection(ASCII_SPACE[1:]))
+        if not text.isascii():
+            rows[column] = rows[column].str.normalize('NFKC')
+        if not plain or text[:1] == ' ' or text[-1:] == ' ' or ' \n' in text or '\n ' in text:
+            rows[column] = rows[column].str.strip()
+        if column == 'name' and (not plain or '  ' in text):
+            rows[column] = rows[column].str.replace(r'\s+', ' ', regex=True)
+    return rows
+
+
+def matches(values, pattern):
+    """values.str.fullmatch(pattern), checked in one regex pass when every value matches"""
+    cells = values.tolist()
+    text = '\n'.join(cells)
+    if text.count('\n') == len(cells) - 1:
+        whole = f'(?:{pattern.pattern})(?:\n(?:{pattern.pattern}))*'
+        if re.fullmatch(whole, text):
+            return pd.Series(True, index=values.index)
+    return values.str.fullmatch(pattern).astype(bool)
+
+
+def validate(df):
+    """Split a chunk into importable rows and rejected rows, a column at a time
+
+    PRNs that spreadsheets turned into floats (1102310789.0, 1.2e11) are
+    coerced back to their digits. Rows missing a value, or whose PRN or email
+    does not match PRN_PATTERN or EMAIL_PATTERN, are rejected with the reasons.
+    Returns (rows, rejected, counts); both frames are indexed by sheet row.
+    """
+    rows = normalise(df)
+    prns = rows['prn_number']
+    coerced = 0
+    floats = prns.str.fullmatch(FLOAT_PRN) if re.search(r'[.eE]', ''.join(prns.tolist())) else None
+    if floats is not None and floats.any():
+        values = pd.to_numeric(prns[floats], errors='coerce')
+        whole = values[values.notna() & (values % 1 == 0) & (values.abs() < 2 ** 53)]
+        rows.loc[whole.index, 'prn_number'] = whole.astype('int64').astype(str)
+        coerced = len(whole)
+
+    missing = rows == ''
+    problems = pd.DataFrame({
+        'missing name': missing['name'],
+        'missing PRN': missing['prn_number'],
+        'missing email': missing['email'],
+        'invalid PRN': ~missing['prn_number'] & ~matches(rows['prn_number'], PRN_PATTERN),
+        'invalid email': ~missing['email'] & ~matches(rows['email'], EMAIL_PATTERN),
+    })
+    bad = problems.any(axis=1)
+    reasons = pd.Series('', index=rows.index[bad], dtype=str)
+    for label, flagged in problems[bad].items():
+        reasons = reasons.mask(flagged, reasons + label + ', ')
+
+    rejected = rows[bad].assign(reason=reasons.str[:-2])
+    counts = {
+        'rejected': int(bad.sum()),
+        'missing_values': int(missing.any(axis=1).sum()),
+        'invalid_prn': int(problems['invalid PRN'].sum()),
+        'invalid_email': int(problems['invalid email'].sum()),
+        'prns_coerced': coerced,
+    }
+    return rows[~bad], rejected, counts
+
+
+def rejected_report(rejected):
+    """Rejected rows as the response lists them"""
+    return [dict(row=int(row), **values) for row, values in
+            zip(rejected.index, rejected.to_dict('records'))]
+
+
+def import_chunks(conn, chunks, progress=None):
+    """Insert the new students from each (chunk, position) and return the counts
+
+    Rows validate() rejects are skipped and listed in rejected_rows (the
+    first REJECTED_REPORT_ROWS of them), as are repeats of a PRN earlier in
+    the sheet (first one wins) and PRNs already in the database. Every chunk is committed on its own; if reading fails part way, the error
+    carries the counts so far. The caller reloads the roster index.
+    """
+    counts = {
+        'rows': 0,
+        'inserted': 0,
+        'duplicates': 0,
+        'duplicates_in_file': 0,
+        'duplicates_in_db': 0,
+        'rejected': 0,
+        'missing_values': 0,
+        'invalid_prn': 0,
+        'invalid_email': 0,
+        'prns_coerced': 0,
+        'rejected_rows': [],
+        'chunks': 0,
+    }
+    # id ranges this import inserted; a later chunk repeating one of those
+    # PRNs is a repeat in the file, not a student who was already registered
+    own_ids = []
+    cursor = conn.cursor()
+
+    try:
+        for chunk, position in chunks:
+            rows, rejected, checks = validate(chunk)
+            repeated = rows.duplicated('prn_number', keep='first')
+            rows = rows[~repeated]
+
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                first_id = cursor.execute('SELECT COALESCE(MAX(id), 0) FROM students').fetchone()[0]
+                existing = cursor.execute('''
+                    SELECT id FROM students
+                    WHERE prn_number IN (SELECT value FROM json_each(?))
+                ''', (json.dumps(rows['prn_number'].tolist()),)).fetchall()
+                cursor.executemany('''
+                    INSERT INTO students (name, prn_number, email)
+                    VALUES (?, ?, ?)
+                    ON CONFLICT (prn_number) DO NOTHING
+                ''', rows.itertuples(index=False, name=None))
+                # Conflicting rows change nothing, so rowcount is exactly the rows inserted
+                inserted = max(cursor.rowcount, 0)
+                last_id = cursor.execute('SELECT COALESCE(MAX(id), 0) FROM students').fetchone()[0]
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            if last_id > first_id:
+                own_ids.append((first_id, last_id))
+
+            earlier = sum(1 for (student_id,) in existing
+                          if any(low < student_id <= high for low, high in own_ids))
+            counts['rows'] += len(chunk)
+            counts['inserted'] += inserted
+            counts['duplicates_in_file'] += int(repeated.sum()) + earlier
+            counts['duplicates_in_db'] += len(existing) - earlier
+            for key, value in checks.items():
+                counts[key] += value
+            room = REJECTED_REPORT_ROWS - len(counts['rejected_rows'])
+            if room > 0:
+                counts['rejected_rows'] += rejected_report(rejected.head(room))
+            counts['chunks'] += 1
+            if progress:
+                progress(counts, position)
+    except RosterSchemaError as e:
+        counts['duplicates'] = counts['duplicates_in_file'] + counts['duplicates_in_db']
+        e.counts = counts
+        raise
+
+    counts['duplicates'] = counts['duplicates_in_file'] + counts['duplicates_in_db']
+    return counts
+
+
+def progress_total(path):
+    """What the positions from iter_file_chunks count up to, or None if they are not given"""
+    if path.endswith('.csv'):
+        return os.path.getsize(path)
+    if path.endswith('.xlsx'):
+        try:
+            with zipfile.ZipFile(path) as archive:
+                return archive.getinfo(xlsx_parts(archive)[0]).file_size
+        except Exception:
+            return None
+    return None
+
+
+def iter_file_chunks(path, chunk_rows=IMPORT_CHUNK_ROWS):
+    """Chunks of a saved upload; CSV and .xlsx are streamed, .xls is loaded then chunked"""
+    if path.endswith('.csv'):
+        return iter_csv_chunks(path, chunk_rows)
+    if path.endswith('.xlsx'):
+        return iter_xlsx_chunks(path, chunk_rows)
+    return iter_frame_chunks(read_sheet(path), chunk_rows)
+
+
+def import_file(conn, path, progress=None, chunk_rows=IMPORT_CHUNK_ROWS):
+    """Import a saved upload"""
+    return import_chunks(conn, iter_file_chunks(path, chunk_rows), progress)
+
+
+def import_students(conn, df, progress=None, chunk_rows=IMPORT_CHUNK_ROWS):
+    """Import a sheet that is already a DataFrame"""
+    return import_chunks(conn, iter_frame_chunks(df, chunk_rows), progress)
+
+
+def file_hash(path):
+    """SHA-256 of the file's bytes"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def last_import(conn):
+    """The most recently applied roster file, or None"""
+    row = conn.execute('''
+        SELECT content_hash, filename, mode, imported_at FROM roster_imports
+        ORDER BY id DESC LIMIT 1
+    ''').fetchone()
+    if row is None:
+        return None
+    content_hash, filename, mode, imported_at = row
+    return {
+        'content_hash': content_hash,
+        'filename': filename,
+        'mode': mode,
+        'imported_at': scan_time.format_ist(imported_at),
+    }
+
+
+def record_import(conn, content_hash, filename, mode, counts):
+    """Remember an applied file; committed with the caller's transaction"""
+    summary = {key: value for key, value in counts.items() if key != 'rejected_rows'}
+    conn.execute('''
+        INSERT INTO roster_imports (content_hash, filename, mode, counts, imported_at)
+        VALUES (?, ?, ?, ?, ?)
+    ''', (content_hash, filename, mode, json.dumps(summary), scan_time.now_ms()))
+
+
+def read_roster(path, chunk_rows=IMPORT_CHUNK_ROWS):
+    """The whole sheet as validated rows, one per PRN (first wins), and its counts
+
+    Rows validate() rejects are left out and reported, as in an import.
+    """
+    counts = {'rows': 0, 'rejected': 0, 'missing_values': 0, 'invalid_prn': 0,
+              'invalid_email': 0, 'prns_coerced': 0, 'rejected_rows': []}
+    frames = []
+    for chunk, _ in iter_file_chunks(path, chunk_rows):
+        rows, rejected, checks = validate(chunk)
+        frames.append(rows)
+        counts['rows'] += len(chunk)
+        for key, value in checks.items():
+            counts[key] += value
+        room = REJECTED_REPORT_ROWS - len(counts['rejected_rows'])
+        if room > 0:
+            counts['rejected_rows'] += rejected_report(rejected.head(room))
+    if frames:
+        rows = pd.concat(frames)
+    else:
+        rows = pd.DataFrame(columns=list(REQUIRED_COLUMNS.values()), dtype=str)
+
+    repeated = rows.duplicated('prn_number', keep='first')
+    counts['duplicates_in_file'] = int(repeated.sum())
+    return rows[~repeated], counts
+
+
+def diff_roster(conn, rows):
+    """Compare sheet rows with the students table, matched on PRN
+
+    Returns DataFrames of new rows, changed rows (with the current name and
+    email alongside) and students missing from the sheet, plus how many
+    students are unchanged. Missing students who have checked in are kept
+    by an apply, so their attendance stays on record.
+    """
+    current = pd.read_sql_query('''
+        SELECT s.id, s.prn_number, s.name AS current_name, s.email AS current_email, s.qr_code_path,
+               EXISTS (SELECT 1 FROM scans WHERE scans.student_id = s.id) AS checked_in
+        FROM students s
+    ''', conn)
+    merged = rows.merge(current, on='prn_number', how='outer', indicator=True)
+    both = merged[merged['_merge'] == 'both']
+    differs = (both['name'] != both['current_name']) | (both['email'] != both['current_email'])
+
+    missing = merged[merged['_merge'] == 'right_only']
+    return {
+        'new': merged.loc[merged['_merge'] == 'left_only', ['name', 'prn_number', 'email']],
+        'changed': both.loc[differs, ['id', 'prn_number', 'name', 'email', 'current_name', 'current_email']]
+                       .astype({'id': 'int64'}),
+        'missing': missing[['id', 'prn_number', 'current_name', 'current_email', 'qr_code_path', 'checked_in']]
+                       .astype({'id': 'int64', 'checked_in': 'bool'}),
+        'unchanged': int((~differs).sum()),
+    }
+
+
+def diff_counts(diff):
+    return {
+        'new': len(diff['new']),
+        'changed': len(diff['changed']),
+        'missing': len(diff['missing']),
+        'kept_checked_in': int(diff['missing']['checked_in'].sum()),
+        'unchanged': diff['unchanged'],
+    }
+
+
+def diff_sample(diff, limit=DIFF_SAMPLE_ROWS):
+    """The first few rows of each kind of change, for a preview"""
+    missing = diff['missing'].rename(columns={'current_name': 'name', 'current_email': 'email'})
+    return {
+        'new': diff['new'].head(limit).to_dict('records'),
+        'changed': diff['changed'].drop(columns='id').head(limit).to_dict('records'),
+        'missing': missing[['prn_number', 'name', 'email', 'checked_in']].head(limit).to_dict('records'),
+    }
+
+
+def apply_reimport(conn, rows, content_hash, filename, expected=None, remove_missing=True):
+    """Apply the sheet's diff in one transaction and return the counts
+
+    The diff is worked out again inside the transaction; if it no longer
+    matches the expected counts from the preview, nothing is written and
+    RosterChangedError is raised. Unchanged students keep their QR hash,
+    email status and scans; a changed email is marked as not yet emailed.
+    The counts include 'removed_qr_paths', the QR images of removed students.
+    """
+    cursor = conn.cursor()
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        diff = diff_roster(conn, rows)
+        counts = diff_counts(diff)
+        if expected is not None:
+            previewed = {key: expected.get(key) for key in ('new', 'changed', 'missing')}
+            current = {key: counts[key] for key in previewed}
+            if previewed != current:
+                raise RosterChangedError(f'The roster changed since the preview (now {current}); preview the file again')
+
+        cursor.executemany('''
+            INSERT INTO students (name, prn_number, email)
+            VALUES (?, ?, ?)
+        ''', diff['new'].itertuples(index=False, name=None))
+        cursor.executemany('''
+            UPDATE students
+            SET name = ?, email_sent = CASE WHEN email = ? THEN email_sent ELSE FALSE END, email = ?
+            WHERE id = ?
+        ''', diff['changed'][['name', 'email', 'email', 'id']].itertuples(index=False, name=None))
+
+        removed = diff['missing'][~diff['missing']['checked_in']] if remove_missing else diff['missing'].iloc[0:0]
+        cursor.executemany('DELETE FROM students WHERE id = ?', [(int(i),) for i in removed['id']])
+
+        counts.update({
+            'inserted': len(diff['new']),
+            'updated': len(diff['changed']),
+            'removed': len(removed),
+        })
+        record_import(conn, content_hash, filename, 'reimport', counts)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    counts['removed_qr_paths'] = [path for path in removed['qr_code_path'] if isinstance(path, str)]
+    return counts
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+In-memory qr_hash -> student index for the QR validation hot path
+Answers invalid and already-scanned codes without querying SQLite
+"""
+
+import sqlite3
+import threading
+
+import database
+
+
+class RosterIndex:
+    """Process-local roster snapshot plus a checked-in bitmap
+
+    Each gunicorn worker keeps its own copy. Roster changes made by any
+    worker bump roster_version (maintained by triggers); a cheap
+    PRAGMA data_version check tells us when another connection committed,
+    and only then do we read the version row and reload if it moved.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._by_hash = {}        # qr_hash -> slot
+        self._students = []       # slot -> (id, name, prn_number, email)
+        self._checked_in = bytearray()
+        self._version = None
+        self._path = None
+        self._watch_conn = None
+        self._data_version = None
+        self._counters = {
+            'loads': 0,
+            'hits': 0,
+            'misses': 0,
+            'invalid': 0,
+            'already_scanned': 0,
+        }
+
+    @property
+    def loaded(self):
+        return self._version is not None
+
+    @property
+    def loads(self):
+        return self._counters['loads']
+
+    def _watch(self):
+        """Dedicated connection used only to watch for commits by others"""
+        path = database.pool.path
+        if self._watch_conn is None or self._path != path:
+            if self._watch_conn is not None:
+                self._watch_conn.close()
+            self._watch_conn = sqlite3.connect(path, check_same_thread=False)
+            self._path = path
+            self._data_version = None
+            self._version = None
+        return self._watch_conn
+
+    def _read_version(self, conn):
+        row = conn.execute('SELECT version FROM roster_version WHERE id = 1').fetchone()
+        return row[0] if row else 0
+
+    def load(self):
+        """(Re)build the index from the students and scans tables"""
+        with self._lock:
+            watch = self._watch()
+            self._data_version = watch.execute('PRAGMA data_version').fetchone()[0]
+
+            with database.get_db() as conn:
+                version = self._read_version(conn)
+                rows = conn.execute('''
+                    SELECT s.id, s.name, s.prn_number, s.email, s.qr_hash,
+                           EXISTS (SELECT 1 FROM scans sc WHERE sc.student_id = s.id)
+                    FROM students s
+                    WHERE s.qr_hash IS NOT NULL
+                ''').fetchall()
+
+            by_hash = {}
+            students = []
+            checked_in = bytearray(len(rows))
+            for slot, (student_id, name, prn_number, email, qr_hash, scanned) in enumerate(rows):
+                by_hash[qr_hash] = slot
+                students.append((student_id, name, prn_number, email))
+                checked_in[slot] = 1 if scanned else 0
+
+            self._by_hash = by_hash
+            self._students = students
+            self._checked_in = checked_in
+            self._version = version
+            self._counters['loads'] += 1
+            return len(students)
+
+    def ensure_fresh(self):
+        """Reload if another connection changed the roster since the last load"""
+        with self._lock:
+            watch = self._watch()
+            data_version = watch.execute('PRAGMA data_version').fetchone()[0]
+            if self.loaded and data_version == self._data_version:
+                return False
+
+            self._data_version = data_version
+            if self.loaded and self._read_version(watch) == self._version:
+                # Only scans were committed; the bitmap catches up lazily
+                return False
+
+        self.load()
+        return True
+
+    def lookup(self, qr_hash):
+        """Return (student, checked_in) for a known code, or None if unknown"""
+        with self._lock:
+            slot = self._by_hash.get(qr_hash)
+            if slot is None:
+                self._counters['misses'] += 1
+                return None
+            self._counters['hits'] += 1
+            return self._students[slot], bool(self._checked_in[slot])
+
+    def mark_checked_in(self, qr_hash):
+        with self._lock:
+            slot = self._by_hash.get(qr_hash)
+            if slot is not None:
+                self._checked_in[slot] = 1
+
+    def count(self, outcome):
+        """Record an answer served from memory ('invalid' or 'already_scanned')"""
+        with self._lock:
+            self._counters[outcome] += 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats['students'] = len(self._students)
+            stats['checked_in'] = sum(self._checked_in)
+            stats['version'] = self._version
+        return stats
+
+
+roster_index = RosterIndex()
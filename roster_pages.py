@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Keyset-paginated student roster for the dashboard
+Sorting by name, PRN, status or scan time walks an index instead of
+sorting the whole roster, and a page costs the same wherever it starts
+"""
+
+import base64
+import json
+
+from student_search import match_clause
+
+SORTS = ('name', 'prn', 'status', 'scanned_at')
+STATUSES = ('all', 'scanned', 'pending')
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+COLUMNS = 's.id, s.name, s.prn_number, s.email, sc.scanned_at'
+
+# Each listing is a run of segments read one after another. A segment is a
+# single indexed walk: (status it covers, FROM/WHERE clause, ordering key)
+# where the key columns end in a unique column, so (key) > (cursor) is exact
+_ALL_BY_NAME = ('all', 'students s LEFT JOIN scans sc ON sc.student_id = s.id', ('s.name', 's.id'))
+_ALL_BY_PRN = ('all', 'students s LEFT JOIN scans sc ON sc.student_id = s.id', ('s.prn_number',))
+_PENDING_BY_NAME = ('pending', '''students s LEFT JOIN scans sc ON sc.student_id = s.id
+        WHERE sc.id IS NULL''', ('s.name', 's.id'))
+_PENDING_BY_PRN = ('pending', '''students s LEFT JOIN scans sc ON sc.student_id = s.id
+        WHERE sc.id IS NULL''', ('s.prn_number',))
+_SCANNED_BY_NAME = ('scanned', 'students s JOIN scans sc ON sc.student_id = s.id', ('s.name', 's.id'))
+_SCANNED_BY_PRN = ('scanned', 'students s JOIN scans sc ON sc.student_id = s.id', ('s.prn_number',))
+_SCANNED_BY_TIME = ('scanned', 'scans sc JOIN students s ON s.id = sc.student_id', ('sc.scanned_at', 'sc.id'))
+
+# Ascending order; descending reads the segments (and each key) in reverse.
+# 'Pending' sorts before 'Scanned', and unscanned rows (NULL scanned_at)
+# come first, as SQLite orders them
+LISTINGS = {
+    'name': {'all': [_ALL_BY_NAME], 'pending': [_PENDING_BY_NAME], 'scanned': [_SCANNED_BY_NAME]},
+    'prn': {'all': [_ALL_BY_PRN], 'pending': [_PENDING_BY_PRN], 'scanned': [_SCANNED_BY_PRN]},
+    'status': {'all': [_PENDING_BY_NAME, _SCANNED_BY_NAME]},
+    'scanned_at': {'all': [_PENDING_BY_NAME, _SCANNED_BY_TIME]},
+}
+
+
+def encode_cursor(segment, key):
+    raw = json.dumps([segment, list(key)], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        segment, key = json.loads(raw)
+        if type(segment) is not int or not isinstance(key, list):
+            raise ValueError
+        # Key values are bound as SQL parameters: only what encode_cursor writes
+        if not all(type(value) in (str, int, float) for value in key):
+            raise ValueError
+        return segment, key
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+
+
+def _segments(sort, status):
+    if sort not in SORTS:
+        raise ValueError(f"sort must be one of: {', '.join(SORTS)}")
+    if status not in STATUSES:
+        raise ValueError(f"status must be one of: {', '.join(STATUSES)}")
+    listing = LISTINGS[sort]
+    if status in listing:
+        return listing[status]
+    return [segment for segment in listing['all'] if segment[0] == status]
+
+
+def count_matching(conn, status='all', q=''):
+    """Rows a text-filtered listing covers (unfiltered totals come from attendance_stats)"""
+    if status not in STATUSES:
+        raise ValueError(f"status must be one of: {', '.join(STATUSES)}")
+    clause, params = match_clause(q)
+    if status == 'scanned':
+        clause += ' AND sc.id IS NOT NULL'
+    elif status == 'pending':
+        clause += ' AND sc.id IS NULL'
+    return conn.execute(f'''
+        SELECT COUNT(*)
+        FROM students s LEFT JOIN scans sc ON sc.student_id = s.id
+        WHERE {clause}
+    ''', params).fetchone()[0]
+
+
+def segment_query(segment, order='asc', q='', after=None, limit=DEFAULT_LIMIT):
+    """(SQL, params) reading up to limit rows of one segment, after the key
+    `after` when given; rows are COLUMNS followed by the segment's key"""
+    _, source, key = segment
+    conditions = []
+    params = []
+    if q:
+        clause, clause_params = match_clause(q)
+        conditions.append(clause)
+        params.extend(clause_params)
+    if after:
+        if len(after) != len(key):
+            raise ValueError('Invalid cursor')
+        comparison = '>' if order == 'asc' else '<'
+        conditions.append(f"({', '.join(key)}) {comparison} ({', '.join('?' * len(key))})")
+        params.extend(after)
+
+    where = ' AND '.join(conditions)
+    if where:
+        where = (' AND ' if 'WHERE' in source else ' WHERE ') + where
+    direction = ' DESC' if order == 'desc' else ''
+    order_by = ', '.join(column + direction for column in key)
+    sql = f'''
+        SELECT {COLUMNS}, {', '.join(key)}
+        FROM {source}{where}
+        ORDER BY {order_by}
+        LIMIT ?
+    '''
+    return sql, params + [limit]
+
+
+def fetch_page(conn, sort='name', order='asc', status='all', q='', limit=DEFAULT_LIMIT, cursor=None):
+    """Return (rows, next_cursor) where rows are (id, name, prn, email, scanned_at)"""
+    if order not in ('asc', 'desc'):
+        raise ValueError('order must be asc or desc')
+    limit = min(max(int(limit), 1), MAX_LIMIT)
+    segments = _segments(sort, status)
+    if order == 'desc':
+        segments = segments[::-1]
+
+    start, after = decode_cursor(cursor) if cursor else (0, None)
+    if not 0 <= start < max(len(segments), 1):
+        raise ValueError('Invalid cursor')
+
+    rows = []
+    next_cursor = None
+    for index in range(start, len(segments)):
+        wanted = limit - len(rows)
+        fetched = conn.execute(*segment_query(segments[index], order, q, after if index == start else None,
+                                              wanted + 1)).fetchall()
+
+        rows.extend(row[:5] for row in fetched[:wanted])
+        if len(fetched) > wanted:
+            last = fetched[wanted - 1]
+            next_cursor = encode_cursor(index, last[5:])
+            break
+        if len(rows) == limit:
+            # Page filled exactly at the end of this segment; the next page
+            # starts at the top of the following one
+            if index + 1 < len(segments):
+                next_cursor = encode_cursor(index + 1, [])
+            break
+
+    return rows, next_cursor
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Short-TTL cache of recent check-in outcomes keyed by qr_hash
+Absorbs the same badge arriving several times within a second or two
+(camera frames, retries, the manual form) without touching SQLite
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import database
+from roster_index import roster_index
+
+SCAN_CACHE_TTL_MS = int(os.environ.get('SCAN_CACHE_TTL_MS', 2000))
+SCAN_CACHE_SIZE = int(os.environ.get('SCAN_CACHE_SIZE', 4096))
+
+
+class ScanResultCache:
+    """Bounded LRU of qr_hash -> checked-in student with a per-entry expiry
+
+    Only checked-in students are cached: once a badge is admitted, every
+    repeat is "already scanned", so the answer cannot go stale except by
+    the roster being reloaded (entries are dropped when it is) or by scans
+    being cleared in another worker, which the TTL bounds.
+    """
+
+    def __init__(self, ttl_ms=SCAN_CACHE_TTL_MS, max_entries=SCAN_CACHE_SIZE):
+        self.ttl = ttl_ms / 1000
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # qr_hash -> (student, expires_at)
+        self._generation = None
+        self._counters = {
+            'hits': 0,
+            'misses': 0,
+            'expired': 0,
+            'evictions': 0,
+        }
+
+    @property
+    def enabled(self):
+        return self.ttl > 0 and self.max_entries > 0
+
+    def _check_roster(self):
+        # A reload means students or scans were replaced, and a new pool means
+        # a different database file; nothing cached survives either
+        generation = (roster_index.loads, database.pool)
+        if self._generation != generation:
+            self._entries.clear()
+            self._generation = generation
+
+    def get(self, qr_hash):
+        """Return the cached checked-in student for qr_hash, or None"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            self._check_roster()
+            entry = self._entries.get(qr_hash)
+            if entry is None:
+                self._counters['misses'] += 1
+                return None
+            student, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[qr_hash]
+                self._counters['expired'] += 1
+                self._counters['misses'] += 1
+                return None
+            self._entries.move_to_end(qr_hash)
+            self._counters['hits'] += 1
+            return student
+
+    def put(self, qr_hash, student):
+        """Remember that the student behind qr_hash is checked in"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._check_roster()
+            self._entries[qr_hash] = (student, time.monotonic() + self.ttl)
+            self._entries.move_to_end(qr_hash)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counters['evictions'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats['entries'] = len(self._entries)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 3) if lookups else 0.0
+        stats['ttl_ms'] = int(self.ttl * 1000)
+        stats['max_entries'] = self.max_entries
+        return stats
+
+
+scan_cache = ScanResultCache()
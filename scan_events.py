@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Server-Sent Events fan-out for live check-ins
+One poller thread per worker watches the scans table and wakes every
+subscribed stream, so the database cost does not grow with subscribers
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from collections import deque
+
+import database
+import scan_time
+
+SCAN_STREAM_POLL_MS = int(os.environ.get('SCAN_STREAM_POLL_MS', 250))
+SCAN_STREAM_HEARTBEAT_S = int(os.environ.get('SCAN_STREAM_HEARTBEAT_S', 15))
+SCAN_STREAM_BUFFER = int(os.environ.get('SCAN_STREAM_BUFFER', 1000))
+SCAN_STREAM_MAX_SUBSCRIBERS = int(os.environ.get('SCAN_STREAM_MAX_SUBSCRIBERS', 48))
+
+NEW_SCANS_SQL = '''
+    SELECT sc.id, s.name, s.prn_number, s.email, sc.scanned_at
+    FROM scans sc
+    JOIN students s ON s.id = sc.student_id
+    WHERE sc.id > ?
+    ORDER BY sc.id
+    LIMIT ?
+'''
+
+
+def parse_event_id(value):
+    """'<roster_version>.<scan_version>-<scan_id>' -> ((roster_version, scan_version), scan_id), or None"""
+    try:
+        version, scan_id = str(value).split('-', 1)
+        return tuple(int(part) for part in version.split('.')), int(scan_id)
+    except (TypeError, ValueError):
+        return None
+
+
+def _event_id(version, scan_id):
+    return f'{version[0]}.{version[1]}-{scan_id}'
+
+
+def _reset_data(version):
+    return {'roster_version': version[0], 'scan_version': version[1]}
+
+
+def _frame(event, data, event_id=None):
+    lines = []
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f'event: {event}')
+    lines.append(f'data: {json.dumps(data)}')
+    return '\n'.join(lines) + '\n\n'
+
+
+def _scan_dict(row):
+    scan_id, name, prn_number, email, scanned_at = row
+    return {'id': scan_id, 'name': name, 'prn': prn_number, 'email': email,
+            'scanned_at': scan_time.format_ist(scanned_at), 'scanned_at_ms': scanned_at}
+
+
+class ScanBroadcaster:
+    """Publishes new scans and counters to every open /api/scans/stream
+
+    Event ids are '<roster_version>.<scan_version>-<scan_id>'. A client
+    reconnecting with Last-Event-ID gets the check-ins it missed from the
+    in-memory buffer or, if they have already left it, from the database;
+    when the roster has changed since (students edited, scans cleared) or a
+    synced offline scan moved an earlier check-in time, it gets a reset
+    event and reloads instead.
+    """
+
+    def __init__(self, counters, poll_interval_ms=SCAN_STREAM_POLL_MS,
+                 heartbeat_s=SCAN_STREAM_HEARTBEAT_S, buffer_size=SCAN_STREAM_BUFFER,
+                 max_subscribers=SCAN_STREAM_MAX_SUBSCRIBERS):
+        self._read_counters = counters
+        self.poll_interval = poll_interval_ms / 1000
+        self.heartbeat = heartbeat_s
+        self.buffer_size = buffer_size
+        self.max_subscribers = max_subscribers
+
+        self._cond = threading.Condition()
+        self._poll_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+        self._events = deque()    # scan dicts, oldest first
+        self._evicted_upto = 0    # highest scan id that fell out of the buffer
+        self._last_id = None
+        self._version = None      # (roster_version, scan_version)
+        self._stats = None
+        self._seq = 0             # bumped on every publish; streams wait on it
+
+        self._conn = None
+        self._path = None
+        self._data_version = None
+        self._subscribers = 0
+        self._counters = {
+            'polls': 0,
+            'published': 0,
+            'resets': 0,
+            'rejected': 0,
+            'peak_subscribers': 0,
+        }
+
+    def _connect(self):
+        """Dedicated connection; a new database file starts the stream over"""
+        path = database.pool.path
+        if self._conn is None or self._path != path:
+            if self._conn is not None:
+                self._conn.close()
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._path = path
+            self._data_version = None
+            with self._cond:
+                self._last_id = None
+                self._version = None
+        return self._conn
+
+    def poll(self):
+        """Publish scans committed since the last poll; returns how many"""
+        with self._poll_lock:
+            conn = self._connect()
+            data_version = conn.execute('PRAGMA data_version').fetchone()[0]
+            if data_version == self._data_version and self._last_id is not None:
+                return 0
+            self._data_version = data_version
+
+            # One read transaction so rows, counters and version agree
+            conn.execute('BEGIN')
+            try:
+                row = conn.execute('SELECT version FROM roster_version WHERE id = 1').fetchone()
+                corrected = conn.execute('SELECT version FROM scan_version WHERE id = 1').fetchone()
+                version = (row[0] if row else 0, corrected[0] if corrected else 0)
+                max_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM scans').fetchone()[0]
+                reset = self._last_id is None or version != self._version
+                rows = []
+                if not reset:
+                    while True:
+                        batch = conn.execute(NEW_SCANS_SQL, (rows[-1][0] if rows else self._last_id, 500)).fetchall()
+                        rows.extend(batch)
+                        if len(batch) < 500:
+                            break
+                stats = self._read_counters(conn.cursor())
+            finally:
+                conn.rollback()
+
+            with self._cond:
+                self._counters['polls'] += 1
+                if reset:
+                    if self._version is not None:
+                        self._counters['resets'] += 1
+                    self._events.clear()
+                    self._evicted_upto = max_id
+                    self._last_id = max_id
+                    self._version = version
+                else:
+                    for scan in map(_scan_dict, rows):
+                        self._events.append(scan)
+                        self._last_id = scan['id']
+                    while len(self._events) > self.buffer_size:
+                        self._evicted_upto = self._events.popleft()['id']
+                    self._counters['published'] += len(rows)
+                self._stats = stats
+                self._seq += 1
+                self._cond.notify_all()
+            return len(rows)
+
+    def notify(self):
+        """Called after a local commit so streams do not wait for the next poll"""
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            try:
+                self.poll()
+            except sqlite3.Error as e:
+                print(f"⚠️ Scan stream poll failed: {str(e)}")
+
+    def start(self):
+        with self._cond:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='scan-stream', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def _since(self, scan_id):
+        """Buffered scans after scan_id, or None if some were already evicted"""
+        if scan_id < self._evicted_upto:
+            return None
+        return [scan for scan in self._events if scan['id'] > scan_id]
+
+    def _backfill(self, scan_id):
+        """Missed scans from the database, or None if there are too many to replay"""
+        with database.get_db() as conn:
+            rows = conn.execute(NEW_SCANS_SQL, (scan_id, self.buffer_size + 1)).fetchall()
+        if len(rows) > self.buffer_size:
+            return None
+        return [_scan_dict(row) for row in rows]
+
+    def open(self, last_event_id=None):
+        """Return a generator of SSE frames, or None when this worker is at capacity"""
+        with self._cond:
+            if self._subscribers >= self.max_subscribers:
+                self._counters['rejected'] += 1
+                return None
+            self._subscribers += 1
+            self._counters['peak_subscribers'] = max(self._counters['peak_subscribers'], self._subscribers)
+        self.start()
+        return self._frames(parse_event_id(last_event_id) if last_event_id else None)
+
+    def _frames(self, resume):
+        try:
+            yield f'retry: {int(self.poll_interval * 1000) + 2000}\n\n'
+
+            with self._cond:
+                if self._stats is None:
+                    self._wake.set()
+                    self._cond.wait_for(lambda: self._stats is not None, timeout=5)
+                version = self._version
+                cursor = self._last_id or 0
+                seq = self._seq
+                stats = self._stats
+                missed = []
+                if resume is not None:
+                    resume_version, resume_id = resume
+                    missed = self._since(resume_id) if resume_version == version else None
+                    cursor = max(cursor, resume_id) if missed is not None else cursor
+
+            if resume is not None and missed is None and resume[0] == version:
+                # Fell out of the buffer (e.g. reconnecting to another worker)
+                missed = self._backfill(resume[1])
+                if missed:
+                    cursor = max(cursor, missed[-1]['id'])
+
+            if missed is None:
+                yield _frame('reset', _reset_data(version))
+            else:
+                for scan in missed:
+                    yield _frame('checkin', scan, _event_id(version, scan['id']))
+            if stats is not None:
+                yield _frame('stats', stats)
+
+            while not self._stop.is_set():
+                with self._cond:
+                    self._cond.wait_for(lambda: self._seq != seq, timeout=self.heartbeat)
+                    if self._seq == seq:
+                        frames = [': keepalive\n\n']
+                    else:
+                        seq = self._seq
+                        if self._version != version:
+                            version = self._version
+                            cursor = self._last_id
+                            frames = [_frame('reset', _reset_data(version))]
+                        else:
+                            scans = self._since(cursor)
+                            if scans is None:
+                                # This stream fell too far behind the buffer
+                                cursor = self._last_id
+                                frames = [_frame('reset', _reset_data(version))]
+                            else:
+                                frames = [_frame('checkin', scan, _event_id(version, scan['id'])) for scan in scans]
+                                if scans:
+                                    cursor = scans[-1]['id']
+                        frames.append(_frame('stats', self._stats))
+                for frame in frames:
+                    yield frame
+        finally:
+            with self._cond:
+                self._subscribers -= 1
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self._counters)
+            stats['subscribers'] = self._subscribers
+            stats['buffered'] = len(self._events)
+            stats['last_scan_id'] = self._last_id
+            stats['roster_version'], stats['scan_version'] = self._version or (None, None)
+        return stats
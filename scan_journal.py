@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+Write-behind scan journal with group commit
+Check-ins are acknowledged once appended to a local journal file; a
+background writer flushes the journal into the scans table in batches
+"""
+
+import json
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows development machines run a single process
+    fcntl = None
+
+import database
+import scan_time
+from roster_index import roster_index
+
+SCAN_WRITE_MODE = os.environ.get('SCAN_WRITE_MODE', 'direct')
+SCAN_JOURNAL_PATH = os.environ.get('SCAN_JOURNAL_PATH', 'scan_journal.log')
+SCAN_JOURNAL_BATCH_SIZE = int(os.environ.get('SCAN_JOURNAL_BATCH_SIZE', 500))
+SCAN_JOURNAL_FLUSH_INTERVAL_MS = int(os.environ.get('SCAN_JOURNAL_FLUSH_INTERVAL_MS', 200))
+SCAN_JOURNAL_FSYNC = os.environ.get('SCAN_JOURNAL_FSYNC', 'true').lower() != 'false'
+
+# A batch read just before clear_all_data discarded the journal can commit
+# after its DELETE; the EXISTS keeps it off the deleted student ids
+INSERT_SCAN_SQL = '''
+    INSERT INTO scans (student_id, scanner_info, scanned_at)
+    SELECT ?1, ?2, ?3 WHERE EXISTS (SELECT 1 FROM students WHERE id = ?1)
+    ON CONFLICT (student_id) DO NOTHING
+'''
+
+SCANNED_SQL = 'SELECT 1 FROM scans WHERE student_id = ?'
+
+
+class ScanJournal:
+    """Shared append-only journal of accepted check-ins
+
+    All workers append to the same file under an exclusive flock. Before
+    deciding whether a scan is the first one, a worker reads the entries
+    other workers appended since its last look, so first-scan-wins holds
+    across processes. Flushing rewrites the file with a new generation
+    header; readers that see a new generation start again from the top.
+    """
+
+    def __init__(self, path, batch_size=SCAN_JOURNAL_BATCH_SIZE,
+                 flush_interval_ms=SCAN_JOURNAL_FLUSH_INTERVAL_MS, fsync=SCAN_JOURNAL_FSYNC,
+                 on_flush=None):
+        self.path = path
+        self.on_flush = on_flush    # called after a flush writes new scans
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.fsync = fsync
+
+        self._lock = threading.Lock()
+        self._file = open(path, 'a+b')
+        self._generation = None
+        self._index_loads = None
+        self._offset = 0
+        self._depth = 0
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+        self._counters = {
+            'appended': 0,
+            'flushed': 0,
+            'conflicts': 0,
+            'batches': 0,
+            'replayed': 0,
+            'discarded': 0,
+            'last_flush_ms': 0.0,
+            'max_flush_ms': 0.0,
+            'total_flush_ms': 0.0,
+        }
+
+    # -- file helpers (call with self._lock held) --------------------------
+
+    def _flock(self, exclusive=True):
+        if fcntl:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_UN)
+
+    def _header(self):
+        self._file.seek(0)
+        line = self._file.readline()
+        if line.startswith(b'#gen ') and line.endswith(b'\n'):
+            return int(line[5:]), len(line)
+        return 0, 0
+
+    def _read_records(self, start):
+        """Parse complete lines from start; returns (records, bytes consumed)"""
+        self._file.seek(start)
+        data = self._file.read()
+        end = data.rfind(b'\n') + 1
+        records = []
+        for line in data[:end].splitlines():
+            if not line or line.startswith(b'#'):
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                print(f"⚠️ Skipping corrupt scan journal line: {line[:80]!r}")
+        return records, end
+
+    def _tail(self):
+        """Apply entries appended (by any worker) since our last read"""
+        generation, header_len = self._header()
+        if generation != self._generation or roster_index.loads != self._index_loads:
+            # New generation, or the index was rebuilt from the database and
+            # lost our marks: re-read the whole (small) journal
+            self._generation = generation
+            self._index_loads = roster_index.loads
+            self._offset = header_len
+            self._depth = 0
+        records, consumed = self._read_records(self._offset)
+        self._offset += consumed
+        self._depth += len(records)
+        for record in records:
+            roster_index.mark_checked_in(record['qr_hash'])
+        return records
+
+    def _sync(self):
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+    # -- check-in ----------------------------------------------------------
+
+    def record(self, student, qr_hash, scanner_info, scanned_at):
+        """Journal a check-in; returns True if this was the student's first scan"""
+        return self.record_many([(student, qr_hash, scanner_info, scanned_at)])[0]
+
+    def record_many(self, scans):
+        """Journal (student, qr_hash, scanner_info, scanned_at) check-ins with one append
+
+        Returns a first-scan flag per entry. A batch shares a single write and
+        fsync, so it costs about the same as one check-in.
+        """
+        first_scans = []
+        with self._lock:
+            self._flock()
+            try:
+                self._tail()
+                lines = []
+                journaled = set()
+                with database.get_db() as conn:
+                    for student, qr_hash, scanner_info, scanned_at in scans:
+                        entry = roster_index.lookup(qr_hash)
+                        if (entry and entry[1]) or qr_hash in journaled:
+                            first_scans.append(False)
+                            continue
+
+                        # Scans flushed (and trimmed from the journal) before we looked
+                        scanned = conn.execute(SCANNED_SQL, (student[0],)).fetchone()
+                        if scanned:
+                            roster_index.mark_checked_in(qr_hash)
+                            first_scans.append(False)
+                            continue
+
+                        journaled.add(qr_hash)
+                        lines.append(json.dumps({
+                            'student_id': student[0],
+                            'qr_hash': qr_hash,
+                            'scanner_info': scanner_info,
+                            'scanned_at': scanned_at,
+                        }).encode() + b'\n')
+                        first_scans.append(True)
+
+                if lines:
+                    data = b''.join(lines)
+                    self._file.seek(0, os.SEEK_END)
+                    self._file.write(data)
+                    self._sync()
+
+                    self._offset += len(data)
+                    self._depth += len(lines)
+                    self._counters['appended'] += len(lines)
+                    for qr_hash in journaled:
+                        roster_index.mark_checked_in(qr_hash)
+            finally:
+                self._flock(False)
+
+        if self._depth >= self.batch_size:
+            self._wake.set()
+        return first_scans
+
+    # -- flushing ----------------------------------------------------------
+
+    def flush(self):
+        """Move up to one batch of journal entries into the scans table"""
+        started = time.perf_counter()
+
+        with self._lock:
+            self._flock()
+            try:
+                generation, header_len = self._header()
+                records, consumed = self._read_records(header_len)
+            finally:
+                self._flock(False)
+
+        if not records:
+            return 0
+
+        batch = records[:self.batch_size]
+        # Records journaled before the epoch-ms migration carry IST strings
+        rows = [(r['student_id'], r['scanner_info'], scan_time.from_legacy(r['scanned_at']) or scan_time.now_ms())
+                for r in batch]
+
+        # One transaction per batch; replays are harmless thanks to ON CONFLICT
+        with database.get_db() as conn:
+            # rowcount, unlike total_changes, leaves out rows written by triggers
+            inserted = conn.executemany(INSERT_SCAN_SQL, rows).rowcount
+            conn.commit()
+
+        with self._lock:
+            self._flock()
+            try:
+                # Keep everything after the flushed batch, including new appends
+                current_generation, header_len = self._header()
+                remaining, _ = self._read_records(header_len)
+                if current_generation == generation:
+                    remaining = remaining[len(batch):]
+                else:
+                    # Another worker flushed meanwhile; our rows were idempotent
+                    remaining = [r for r in remaining if r not in batch]
+
+                self._file.truncate(0)
+                self._file.write(f'#gen {current_generation + 1}\n'.encode())
+                for record in remaining:
+                    self._file.write(json.dumps(record).encode() + b'\n')
+                self._sync()
+                self._tail()
+            finally:
+                self._flock(False)
+
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self._counters['flushed'] += inserted
+            self._counters['conflicts'] += len(batch) - inserted
+            self._counters['batches'] += 1
+            self._counters['last_flush_ms'] = round(elapsed_ms, 3)
+            self._counters['max_flush_ms'] = round(max(self._counters['max_flush_ms'], elapsed_ms), 3)
+            self._counters['total_flush_ms'] += elapsed_ms
+
+        if inserted and self.on_flush:
+            self.on_flush()
+        return len(batch)
+
+    def drain(self):
+        """Flush until the journal is empty"""
+        total = 0
+        while True:
+            flushed = self.flush()
+            if not flushed:
+                return total
+            total += flushed
+
+    def discard(self):
+        """Drop every pending entry without writing it; returns how many there were
+
+        For when all students and scans are deleted: entries flushed after
+        that would land on deleted (or reused) student ids.
+        """
+        with self._lock:
+            self._flock()
+            try:
+                generation, header_len = self._header()
+                records, _ = self._read_records(header_len)
+                self._file.truncate(0)
+                self._file.write(f'#gen {generation + 1}\n'.encode())
+                self._sync()
+                self._tail()
+            finally:
+                self._flock(False)
+            self._counters['discarded'] += len(records)
+        return len(records)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                while self.flush() >= self.batch_size:
+                    pass
+            except Exception as e:
+                print(f"⚠️ Scan journal flush failed, will retry: {str(e)}")
+
+    def start(self):
+        """Replay anything left by a previous run, then start the writer"""
+        replayed = self.drain()
+        with self._lock:
+            self._counters['replayed'] += replayed
+        if replayed:
+            print(f"📒 Replayed {replayed} journaled scans")
+
+        self._thread = threading.Thread(target=self._run, name='scan-journal-writer', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the writer and drain what is left"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=10)
+        self.drain()
+        self._file.close()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats['queue_depth'] = self._depth
+        batches = stats['batches']
+        stats['avg_flush_ms'] = round(stats.pop('total_flush_ms') / batches, 3) if batches else 0.0
+        stats['path'] = self.path
+        return stats
+
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Scan timestamps
+scans.scanned_at holds integer epoch milliseconds (UTC) so it can be range
+queried and bucketed in SQL; IST is only applied when a time is displayed
+"""
+
+import os
+import time
+from datetime import datetime, timezone
+
+import pytz
+
+IST = pytz.timezone('Asia/Kolkata')
+IST_OFFSET_MS = 330 * 60 * 1000    # IST has no daylight saving
+DISPLAY_FORMAT = '%Y-%m-%d %H:%M:%S IST'
+
+# Client scan times outside [now - SCAN_MAX_AGE_MS, now + SCAN_MAX_SKEW_MS] are
+# refused: a stale or wrong device clock must not back-date a first scan
+SCAN_MAX_AGE_MS = int(os.environ.get('SCAN_MAX_AGE_MS', 24 * 60 * 60 * 1000))   # one event day
+SCAN_MAX_SKEW_MS = int(os.environ.get('SCAN_MAX_SKEW_MS', 5 * 60 * 1000))       # scanner clock running ahead
+
+# Current time in epoch ms as a SQL expression (unixepoch('subsec') needs 3.42)
+NOW_MS_SQL = "CAST((julianday('now') - 2440587.5) * 86400000 AS INTEGER)"
+
+
+def now_ms():
+    return int(time.time() * 1000)
+
+
+def from_client(value):
+    """Epoch ms or ISO 8601 from a scanner (missing means now) -> epoch ms"""
+    if value is None or value == '':
+        return now_ms()
+    if isinstance(value, bool):
+        raise ValueError('Invalid scan timestamp')
+    if isinstance(value, (int, float)):
+        # Range check the same way the old datetime conversion did
+        datetime.fromtimestamp(value / 1000, timezone.utc)
+        return int(value)
+    scanned = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    if scanned.tzinfo is None:
+        scanned = IST.localize(scanned)
+    return int(scanned.timestamp() * 1000)
+
+
+def in_window(ms, now=None):
+    """Whether a client scan time is recent enough and not in the future"""
+    now = now_ms() if now is None else now
+    return now - SCAN_MAX_AGE_MS <= ms <= now + SCAN_MAX_SKEW_MS
+
+
+def from_legacy(value):
+    """Epoch ms for a scanned_at written before the switch to integers:
+    'YYYY-MM-DD HH:MM:SS IST' from the app, or the UTC CURRENT_TIMESTAMP
+    default. Returns None for anything unrecognised"""
+    if value is None or isinstance(value, int):
+        return value
+    text = str(value).strip()
+    try:
+        if text.endswith(' IST'):
+            scanned = IST.localize(datetime.strptime(text, DISPLAY_FORMAT))
+        else:
+            scanned = datetime.fromisoformat(text.replace('Z', '+00:00'))
+            if scanned.tzinfo is None:
+                scanned = scanned.replace(tzinfo=timezone.utc)
+    except ValueError:
+        return None
+    return int(scanned.timestamp() * 1000)
+
+
+def format_ist(ms):
+    """'YYYY-MM-DD HH:MM:SS IST' for display, or None for a missing time"""
+    if ms is None or ms != ms:    # NULL, or NaN from a pandas column
+        return None
+    return datetime.fromtimestamp(int(ms) / 1000, IST).strftime(DISPLAY_FORMAT)
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Cross-worker cache of computed dashboard snapshots
+Gunicorn workers share one small SQLite file next to the database. A
+snapshot is stored with the data version it was computed from; the first
+worker to see a new version computes it and the others read it back.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import database
+
+SNAPSHOT_CACHE_MAX_AGE_MS = int(os.environ.get('SNAPSHOT_CACHE_MAX_AGE_MS', 10000))
+SNAPSHOT_CACHE_PATH = os.environ.get('SNAPSHOT_CACHE_PATH')  # default: <database>.snapshots
+
+
+class ComputeError(Exception):
+    """Carries an exception from the compute callback past the cache's own error handling"""
+
+
+class SnapshotCache:
+    """name -> (version, payload) shared by every worker on the host
+
+    Versions only grow (scan ids and the roster version never go back), so
+    a matching version means the snapshot is exact. The age limit is a
+    backstop for anything the version does not capture, such as the
+    database file being replaced underneath a running server.
+    """
+
+    def __init__(self, max_age_ms=SNAPSHOT_CACHE_MAX_AGE_MS, path=SNAPSHOT_CACHE_PATH):
+        self.max_age = max_age_ms / 1000
+        self.path = path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._counters = {
+            'hits': 0,
+            'hits_after_wait': 0,
+            'recomputes': 0,
+            'expired': 0,
+            'errors': 0,
+        }
+
+    @property
+    def enabled(self):
+        return self.max_age > 0
+
+    def _cache_path(self):
+        return self.path or f'{database.pool.path}.snapshots'
+
+    def _connection(self):
+        # One connection per thread, reopened when tests or configure() move the database
+        path = self._cache_path()
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.path == path:
+            return conn
+        if conn is not None:
+            conn.close()
+        conn = sqlite3.connect(path, timeout=database.BUSY_TIMEOUT_MS / 1000, isolation_level=None,
+                               check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=OFF')   # a lost snapshot is just recomputed
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS snapshots (
+                name TEXT PRIMARY KEY,
+                version TEXT NOT NULL,
+                computed_at REAL NOT NULL,
+                payload TEXT NOT NULL,
+                recomputes INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        self._local.conn, self._local.path = conn, path
+        return conn
+
+    def _count(self, counter):
+        with self._lock:
+            self._counters[counter] += 1
+
+    def _usable(self, row, version, count_expired=True):
+        if row is None or row[0] != version:
+            return False
+        if time.time() - row[1] > self.max_age:
+            if count_expired:
+                self._count('expired')
+            return False
+        return True
+
+    def get(self, name, version, compute):
+        """Snapshot for version (a tuple of ints), computing it at most once across workers"""
+        if not self.enabled:
+            return compute()
+        key = json.dumps(version)
+        try:
+            conn = self._connection()
+            select = 'SELECT version, computed_at, payload FROM snapshots WHERE name = ?'
+            row = conn.execute(select, (name,)).fetchone()
+            if self._usable(row, key):
+                self._count('hits')
+                return json.loads(row[2])
+
+            # Whoever takes the write lock computes; the others wait on it and
+            # then find the snapshot already stored
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = conn.execute(select, (name,)).fetchone()
+                if self._usable(row, key, count_expired=False):
+                    conn.rollback()
+                    self._count('hits_after_wait')
+                    return json.loads(row[2])
+
+                try:
+                    value = compute()
+                except Exception as e:
+                    raise ComputeError(e) from e
+                self._count('recomputes')
+                # A request still reading an older version must not replace a newer snapshot
+                if row is None or json.loads(row[0]) <= list(version) or time.time() - row[1] > self.max_age:
+                    conn.execute('''
+                        INSERT INTO snapshots (name, version, computed_at, payload, recomputes)
+                        VALUES (?, ?, ?, ?, 1)
+                        ON CONFLICT (name) DO UPDATE SET
+                            version = excluded.version,
+                            computed_at = excluded.computed_at,
+                            payload = excluded.payload,
+                            recomputes = recomputes + 1
+                    ''', (name, key, time.time(), json.dumps(value)))
+                conn.execute('COMMIT')
+                return value
+            except Exception:
+                conn.rollback()
+                raise
+        except ComputeError as e:
+            raise e.__cause__
+        except sqlite3.Error:
+            # The cache is an optimisation; never fail a request over it
+            self._count('errors')
+            self._drop_connection()
+            return compute()
+
+    def _drop_connection(self):
+        conn, self._local.conn = getattr(self._local, 'conn', None), None
+        if conn is not None:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+        lookups = stats['hits'] + stats['hits_after_wait'] + stats['recomputes']
+        stats['hit_rate'] = round((stats['hits'] + stats['hits_after_wait']) / lookups, 3) if lookups else 0.0
+        stats['max_age_ms'] = int(self.max_age * 1000)
+        stats['path'] = self._cache_path()
+        try:
+            # Shared across workers, unlike the counters above
+            stats['recomputes_all_workers'] = {
+                name: count for name, count in
+                self._connection().execute('SELECT name, recomputes FROM snapshots')
+            }
+        except sqlite3.Error:
+            stats['recomputes_all_workers'] = None
+        return stats
+
+
+snapshot_cache = SnapshotCache()
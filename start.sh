@@ -15,6 +15,10 @@ if not init_db():
 print('✅ Database ready')
 "
 
+# Precompress static assets (skips files that are already up to date)
+echo "🗜️  Precompressing static files..."
+python compression.py
+
 # Create necessary directories
 echo "📁 Creating directories..."
 mkdir -p uploads qr_codes
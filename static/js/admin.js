@@ -5,11 +5,37 @@ document.addEventListener('DOMContentLoaded', function() {
     initializeAdminPanel();
     loadSystemStatus();
     
-    // Set up auto-refresh for system status
+    // Live system status, with polling whenever the stream is down
     const statusRefresh = new EventManager.AutoRefresh(loadSystemStatus, 30000);
-    statusRefresh.start();
+    const liveUpdates = new EventManager.LiveUpdates({
+        checkin: scan => {
+            if (systemStatus) {
+                systemStatus.recent_scans = [scan].concat(systemStatus.recent_scans).slice(0, 10);
+            }
+        },
+        stats: stats => {
+            if (systemStatus) {
+                systemStatus.stats = stats;
+                updateSystemStatus(systemStatus);
+            }
+        },
+        reset: loadSystemStatus
+    }, statusRefresh);
+    liveUpdates.start();
+    resumeActiveJobs();
 });
 
+let systemStatus = null;
+
+const JOB_POLL_MS = 1000;
+
+// Background jobs started from this page: the button and progress bar each one drives
+const JOB_CONTROLS = {
+    upload_students: { button: 'uploadBtn', progress: 'uploadProgress', label: '<i class="fas fa-upload me-1"></i>Upload Students' },
+    generate_qr_codes: { button: 'generateQRBtn', progress: 'qrProgress', label: '<i class="fas fa-qrcode me-1"></i>Generate QR Codes' },
+    send_emails: { button: 'sendEmailsBtn', progress: 'emailProgress', label: '<i class="fas fa-envelope me-1"></i>Send Emails' }
+};
+
 function initializeAdminPanel() {
     // File upload form
     const uploadForm = document.getElementById('uploadForm');
@@ -36,13 +62,18 @@ function initializeAdminPanel() {
             EventManager.setLoadingState(uploadBtn, true);
             uploadProgress.style.display = 'block';
             
-            const response = await EventManager.uploadFile('/api/upload_students', fileInput, (progress) => {
+            const syncRoster = document.getElementById('syncRoster').checked;
+            const url = syncRoster ? '/api/roster/reimport' : '/api/upload_students';
+            const response = await EventManager.uploadFile(url, fileInput, (progress) => {
                 console.log(`Upload progress: ${progress}%`);
             });
             
-            EventManager.showToast(response.message, 'success');
             uploadForm.reset();
-            loadSystemStatus(); // Refresh status
+            if (syncRoster) {
+                await reimportRoster(response, uploadProgress);
+            } else {
+                await followJob(response, uploadProgress);
+            }
             
         } catch (error) {
             EventManager.showToast(error.message, 'error');
@@ -66,8 +97,7 @@ function initializeAdminPanel() {
                 method: 'POST'
             });
             
-            EventManager.showToast(response.message, 'success');
-            loadSystemStatus(); // Refresh status
+            await followJob(response, qrProgress);
             
         } catch (error) {
             EventManager.showToast(error.message, 'error');
@@ -120,8 +150,7 @@ function initializeAdminPanel() {
                 method: 'POST'
             });
             
-            EventManager.showToast(response.message, 'success');
-            loadSystemStatus(); // Refresh status
+            await followJob(response, emailProgress);
             
         } catch (error) {
             EventManager.showToast(error.message, 'error');
@@ -149,9 +178,140 @@ function initializeAdminPanel() {
     setupClearDataFunctionality();
 }
 
+function describeJob(job) {
+    if (job.status === 'queued') {
+        return 'Waiting to start...';
+    }
+    const done = job.unit === 'bytes'
+        ? `${(job.done / 1048576).toFixed(1)} of ${(job.total / 1048576).toFixed(1)} MB`
+        : `${EventManager.formatNumber(job.done)}${job.total !== null ? ` of ${EventManager.formatNumber(job.total)}` : ''} ${job.unit}`;
+    const parts = [job.total ? `${job.percent}% · ${done}` : done];
+    if (job.failed) {
+        parts.push(`${job.failed} failed`);
+    }
+    if (job.eta_seconds !== null) {
+        parts.push(job.eta_seconds < 60 ? `about ${Math.ceil(job.eta_seconds)}s left` : `about ${Math.ceil(job.eta_seconds / 60)} min left`);
+    }
+    return parts.join(' · ');
+}
+
+async function pollJob(jobId, progressElement) {
+    // Poll until the job finishes, moving the bar as it goes
+    const bar = progressElement.querySelector('.progress-bar');
+    const status = progressElement.querySelector('.job-status');
+    progressElement.style.display = 'block';
+    try {
+        while (true) {
+            const job = await EventManager.apiRequest(`/api/jobs/${jobId}`);
+            if (job.status !== 'queued' && job.status !== 'running') {
+                return job;
+            }
+            bar.style.width = job.total ? `${job.percent}%` : '100%';
+            status.textContent = describeJob(job);
+            await new Promise(resolve => setTimeout(resolve, JOB_POLL_MS));
+        }
+    } finally {
+        bar.style.width = '100%';
+        status.textContent = '';
+    }
+}
+
+async function followJob(response, progressElement) {
+    // Started a background job: wait for it and report its result
+    if (!response.job_id) {
+        EventManager.showToast(response.message, 'success');
+        return;
+    }
+    const job = await pollJob(response.job_id, progressElement);
+    loadSystemStatus(); // Refresh status
+    if (job.status !== 'succeeded') {
+        throw new Error(job.error || `Job ${job.status}`);
+    }
+    if (job.failed) {
+        console.warn('Failed items:', job.failures);
+        EventManager.showToast(`${job.result.message} (${job.failed} failed, see console)`, 'warning');
+    } else if (job.result.rejected) {
+        console.table(job.result.rejected_rows);
+        EventManager.showToast(`${job.result.message} (first rows listed in the console)`, 'warning');
+    } else {
+        EventManager.showToast(job.result.message, 'success');
+    }
+}
+
+function describeRosterChanges(preview) {
+    const lines = [preview.message, ''];
+    const examples = (rows, format) => rows.slice(0, 5).map(row => `  ${format(row)}`);
+    if (preview.new) {
+        lines.push(`New (${preview.new}):`, ...examples(preview.changes.new, row => `${row.prn_number} ${row.name}`));
+    }
+    if (preview.changed) {
+        lines.push(`Changed (${preview.changed}):`, ...examples(preview.changes.changed, row =>
+            `${row.prn_number} ${row.current_name} <${row.current_email}> → ${row.name} <${row.email}>`));
+    }
+    if (preview.missing) {
+        lines.push(`No longer listed (${preview.missing}):`, ...examples(preview.changes.missing, row =>
+            `${row.prn_number} ${row.name}${row.checked_in ? ' (checked in, kept)' : ''}`));
+    }
+    lines.push('', 'Apply these changes?');
+    return lines.join('\n');
+}
+
+async function reimportRoster(response, progressElement) {
+    // Preview the diff, confirm it, then apply exactly what was previewed
+    const job = await pollJob(response.job_id, progressElement);
+    if (job.status !== 'succeeded') {
+        throw new Error(job.error || `Job ${job.status}`);
+    }
+    const preview = job.result;
+    if (preview.skipped || (!preview.new && !preview.changed && preview.missing === preview.kept_checked_in)) {
+        EventManager.showToast(preview.skipped ? preview.message : 'The roster already matches this file', 'info');
+        return;
+    }
+    if (!confirm(describeRosterChanges(preview))) {
+        EventManager.showToast('Roster left unchanged', 'info');
+        return;
+    }
+    const applied = await EventManager.apiRequest('/api/roster/reimport/apply', {
+        method: 'POST',
+        body: JSON.stringify({
+            upload_id: preview.upload_id,
+            expected: { new: preview.new, changed: preview.changed, missing: preview.missing }
+        })
+    });
+    await followJob(applied, progressElement);
+}
+
+async function resumeActiveJobs() {
+    // Jobs keep running if the page is reloaded; pick their progress back up
+    let active;
+    try {
+        active = (await EventManager.apiRequest('/api/jobs?active=1')).jobs;
+    } catch (error) {
+        console.error('Failed to load background jobs:', error);
+        return;
+    }
+    for (const job of active) {
+        const controls = JOB_CONTROLS[job.kind];
+        if (!controls) {
+            continue;
+        }
+        const button = document.getElementById(controls.button);
+        const progressElement = document.getElementById(controls.progress);
+        EventManager.setLoadingState(button, true);
+        followJob({ job_id: job.id }, progressElement)
+            .catch(error => EventManager.showToast(error.message, 'error'))
+            .finally(() => {
+                EventManager.setLoadingState(button, false);
+                button.innerHTML = controls.label;
+                progressElement.style.display = 'none';
+            });
+    }
+}
+
 async function loadSystemStatus() {
     try {
-        const response = await EventManager.apiRequest('/api/dashboard_stats');
+        const response = await EventManager.apiRequest('/api/dashboard_stats?include_students=0');
+        systemStatus = response;
         updateSystemStatus(response);
     } catch (error) {
         console.error('Failed to load system status:', error);
@@ -57,16 +57,29 @@ function setLoadingState(element, loading = true) {
 }
 
 // API request helper
+// Last body and ETag per GET url, so unchanged polls can be answered with 304
+const etagCache = new Map();
+const ETAG_CACHE_SIZE = 50;
+
 async function apiRequest(url, options = {}) {
     try {
+        const method = (options.method || 'GET').toUpperCase();
+        const cached = method === 'GET' ? etagCache.get(url) : null;
+
         const response = await fetch(url, {
+            ...options,
             headers: {
                 'Content-Type': 'application/json',
+                ...(cached ? { 'If-None-Match': cached.etag } : {}),
                 ...options.headers
-            },
-            ...options
+            }
         });
 
+        if (response.status === 304 && cached) {
+            // Callers may modify what they get back, so hand out a copy
+            return structuredClone(cached.data);
+        }
+
         // Check if response is JSON
         const contentType = response.headers.get('content-type');
         if (!contentType || !contentType.includes('application/json')) {
@@ -90,6 +103,15 @@ async function apiRequest(url, options = {}) {
             throw new Error(data.error || 'Request failed');
         }
 
+        const etag = response.headers.get('ETag');
+        if (method === 'GET' && etag) {
+            etagCache.delete(url);
+            etagCache.set(url, { etag, data: structuredClone(data) });
+            if (etagCache.size > ETAG_CACHE_SIZE) {
+                etagCache.delete(etagCache.keys().next().value);
+            }
+        }
+
         return data;
     } catch (error) {
         console.error('API Request Error:', error);
@@ -113,7 +135,7 @@ async function uploadFile(url, fileInput, progressCallback = null) {
         });
         
         xhr.addEventListener('load', () => {
-            if (xhr.status === 200) {
+            if (xhr.status >= 200 && xhr.status < 300) {
                 try {
                     const response = JSON.parse(xhr.responseText);
                     resolve(response);
@@ -184,6 +206,13 @@ function formatNumber(num) {
     return num.toString().replace(/\B(?=(\d{3})+(?!\d))/g, ',');
 }
 
+// Escape text (student names, PRNs) before it goes into an HTML template
+function escapeHtml(value) {
+    const div = document.createElement('div');
+    div.textContent = value == null ? '' : String(value);
+    return div.innerHTML.replace(/"/g, '&quot;');
+}
+
 // Validate email format
 function isValidEmail(email) {
     const emailRegex = /^[^\s@]+@[^\s@]+\.[^\s@]+$/;
@@ -245,6 +274,45 @@ class AutoRefresh {
     }
 }
 
+// Live check-ins over Server-Sent Events, falling back to polling
+class LiveUpdates {
+    constructor(handlers, fallback, url = '/api/scans/stream') {
+        this.handlers = handlers;
+        this.fallback = fallback;
+        this.url = url;
+        this.source = null;
+    }
+    
+    start() {
+        if (typeof(EventSource) === 'undefined') {
+            this.fallback.start();
+            return;
+        }
+        
+        this.source = new EventSource(this.url);
+        Object.entries(this.handlers).forEach(([event, handler]) => {
+            this.source.addEventListener(event, e => handler(JSON.parse(e.data)));
+        });
+        
+        // While connected the stream replaces the timer
+        this.source.onopen = () => this.fallback.stop();
+        
+        // EventSource reconnects on its own and resumes with Last-Event-ID;
+        // poll in the meantime, and for good if the server refused the stream
+        this.source.onerror = () => this.fallback.start();
+        
+        window.addEventListener('beforeunload', () => this.stop());
+    }
+    
+    stop() {
+        if (this.source) {
+            this.source.close();
+            this.source = null;
+        }
+        this.fallback.stop();
+    }
+}
+
 // Initialize common functionality when DOM is loaded
 document.addEventListener('DOMContentLoaded', function() {
     // Initialize tooltips
@@ -277,8 +345,10 @@ window.EventManager = {
     uploadFile,
     formatDate,
     formatNumber,
+    escapeHtml,
     isValidEmail,
     copyToClipboard,
     downloadFile,
-    AutoRefresh
+    AutoRefresh,
+    LiveUpdates
 };
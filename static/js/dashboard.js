@@ -1,16 +1,32 @@
 // Dashboard JavaScript functionality
 
 let attendanceChart = null;
+let arrivalsChart = null;
+let arrivalsBucket = 'minute';
+let arrivalsLoadedAt = 0;
+const ARRIVALS_REFRESH_MS = 30000;
 let dashboardData = null;
-let filteredStudents = [];
+let studentsByPrn = new Map();
+let scanCursor = null;
+let rosterVersion = null;
+let scanVersion = null;
+
+// Roster table state: the server sorts, filters and pages; we keep the loaded rows
+const ROSTER_PAGE_SIZE = 100;
+let rosterQuery = { sort: 'name', order: 'asc', status: 'all', q: '' };
+let rosterRows = [];
+let rosterNextCursor = null;
+let rosterTotal = null;
+let rosterRequest = 0;
+let searchTimer = null;
 
 document.addEventListener('DOMContentLoaded', function() {
     initializeDashboard();
     loadDashboardData();
     
-    // Set up auto-refresh
-    const dashboardRefresh = new EventManager.AutoRefresh(loadDashboardData, 15000);
-    dashboardRefresh.start();
+    // Live updates, with delta polling whenever the stream is down
+    const dashboardRefresh = new EventManager.AutoRefresh(refreshDashboard, 15000);
+    initializeRealTimeUpdates(dashboardRefresh);
 });
 
 function initializeDashboard() {
@@ -36,8 +52,82 @@ function initializeDashboard() {
         filterStudents('');
     });
     
+    document.getElementById('status-filter').addEventListener('change', function() {
+        rosterQuery.status = this.value;
+        loadStudentsPage(true);
+    });
+    
+    document.querySelectorAll('th.sortable').forEach(header => {
+        header.addEventListener('click', function() {
+            sortStudents(this.dataset.sort);
+        });
+    });
+    
+    document.getElementById('load-more-students').addEventListener('click', function() {
+        loadStudentsPage(false);
+    });
+    
+    document.querySelectorAll('#arrivals-bucket button').forEach(button => {
+        button.addEventListener('click', function() {
+            document.querySelectorAll('#arrivals-bucket button').forEach(other => {
+                other.classList.toggle('active', other === this);
+                other.classList.toggle('btn-light', other === this);
+                other.classList.toggle('btn-outline-light', other !== this);
+            });
+            arrivalsBucket = this.dataset.bucket;
+            loadArrivals();
+        });
+    });
+    
     // Initialize chart
     initializeChart();
+    initializeArrivalsChart();
+}
+
+function initializeArrivalsChart() {
+    const ctx = document.getElementById('arrivalsChart').getContext('2d');
+    
+    arrivalsChart = new Chart(ctx, {
+        type: 'bar',
+        data: {
+            labels: [],
+            datasets: [{
+                label: 'Check-ins',
+                data: [],
+                backgroundColor: '#17a2b8',
+                borderWidth: 0
+            }]
+        },
+        options: {
+            responsive: true,
+            maintainAspectRatio: false,
+            plugins: {
+                legend: { display: false }
+            },
+            scales: {
+                y: { beginAtZero: true, ticks: { precision: 0 } }
+            },
+            animation: false
+        }
+    });
+}
+
+// Bucketed in SQL, so the curve costs one small response however many scans there are
+async function loadArrivals() {
+    try {
+        const response = await EventManager.apiRequest(`/api/arrivals?bucket=${arrivalsBucket}`);
+        arrivalsLoadedAt = Date.now();
+        
+        arrivalsChart.data.labels = response.buckets.map(bucket => bucket.label);
+        arrivalsChart.data.datasets[0].data = response.buckets.map(bucket => bucket.count);
+        arrivalsChart.update('none');
+        
+        document.getElementById('arrivals-peak').textContent = response.peak
+            ? `Peak ${response.peak.count} at ${response.peak.label} IST`
+            : '';
+    } catch (error) {
+        console.error('Failed to load arrivals:', error);
+    }
 }
 
 function initializeChart() {
@@ -90,15 +180,83 @@ function initializeChart() {
 
 async function loadDashboardData() {
     try {
-        const response = await EventManager.apiRequest('/api/dashboard_stats');
+        const response = await EventManager.apiRequest('/api/dashboard_stats?include_students=0');
         dashboardData = response;
+        scanCursor = response.cursor;
+        rosterVersion = response.roster_version;
+        scanVersion = response.scan_version;
         updateDashboard(response);
+        loadArrivals();
+        await loadStudentsPage(true);
     } catch (error) {
         console.error('Failed to load dashboard data:', error);
         EventManager.showToast('Failed to load dashboard data', 'error');
     }
 }
 
+async function refreshDashboard() {
+    if (!dashboardData || scanCursor === null) {
+        return loadDashboardData();
+    }
+
+    try {
+        let newScans = [];
+        let delta;
+        do {
+            delta = await EventManager.apiRequest(
+                `/api/dashboard_delta?after=${scanCursor}&roster_version=${rosterVersion}&scan_version=${scanVersion}`
+            );
+            if (delta.reset) {
+                // Students changed, scans were cleared or a check-in time moved: deltas no longer apply
+                return loadDashboardData();
+            }
+            newScans = newScans.concat(delta.new_scans);
+            scanCursor = delta.cursor;
+        } while (delta.has_more);
+
+        applyDashboardDelta(delta.stats, newScans);
+    } catch (error) {
+        console.error('Failed to refresh dashboard data:', error);
+    }
+}
+
+function applyDashboardDelta(stats, newScans) {
+    dashboardData.stats = stats;
+    updateStatistics(stats);
+    updateChart(stats);
+
+    if (newScans.length === 0) return;
+
+    // Only rows already on screen are updated; sort position and filter
+    // membership catch up on the next reload of the table
+    let visibleChanged = false;
+    newScans.forEach(scan => {
+        const student = studentsByPrn.get(scan.prn);
+        if (student) {
+            student.status = 'Scanned';
+            student.scanned_at = scan.scanned_at;
+            visibleChanged = true;
+        }
+    });
+
+    const latest = newScans.slice().reverse().map(scan => ({
+        name: scan.name,
+        prn: scan.prn,
+        scanned_at: scan.scanned_at
+    }));
+    dashboardData.recent_scans = latest.concat(dashboardData.recent_scans).slice(0, 10);
+    updateRecentScans(dashboardData.recent_scans);
+
+    if (visibleChanged) {
+        renderStudentsTable(rosterRows);
+    }
+    
+    // The curve is not worth a request per check-in
+    if (Date.now() - arrivalsLoadedAt > ARRIVALS_REFRESH_MS) {
+        loadArrivals();
+    }
+}
+
 function updateDashboard(data) {
     // Update statistics cards
     updateStatistics(data.stats);
@@ -108,9 +266,6 @@ function updateDashboard(data) {
     
     // Update recent scans
     updateRecentScans(data.recent_scans);
-    
-    // Update students table
-    updateStudentsTable(data.all_students);
 }
 
 function updateStatistics(stats) {
@@ -143,8 +298,8 @@ function updateRecentScans(recentScans) {
     const scansHTML = recentScans.map(scan => `
         <div class="d-flex justify-content-between align-items-center border-bottom py-2">
             <div>
-                <div class="fw-bold">${scan.name}</div>
-                <small class="text-muted">PRN: ${scan.prn}</small>
+                <div class="fw-bold">${EventManager.escapeHtml(scan.name)}</div>
+                <small class="text-muted">PRN: ${EventManager.escapeHtml(scan.prn)}</small>
             </div>
             <div class="text-end">
                 <span class="badge bg-success status-badge">✓</span>
@@ -157,10 +312,46 @@ function updateRecentScans(recentScans) {
     container.innerHTML = scansHTML;
 }
 
+async function loadStudentsPage(reset) {
+    if (!reset && !rosterNextCursor) return;
+    
+    const params = new URLSearchParams({
+        sort: rosterQuery.sort,
+        order: rosterQuery.order,
+        status: rosterQuery.status,
+        limit: ROSTER_PAGE_SIZE
+    });
+    if (rosterQuery.q) params.set('q', rosterQuery.q);
+    if (!reset) params.set('cursor', rosterNextCursor);
+    
+    // Drop responses to queries the user has already moved on from
+    const request = ++rosterRequest;
+    const loadMore = document.getElementById('load-more-students');
+    loadMore.disabled = true;
+    
+    try {
+        const page = await EventManager.apiRequest(`/api/students?${params}`);
+        if (request !== rosterRequest) return;
+        
+        rosterRows = reset ? page.students : rosterRows.concat(page.students);
+        rosterNextCursor = page.next_cursor;
+        rosterTotal = page.total;
+        studentsByPrn = new Map(rosterRows.map(student => [student.prn, student]));
+        updateStudentsTable(rosterRows);
+    } catch (error) {
+        console.error('Failed to load students:', error);
+        EventManager.showToast('Failed to load students', 'error');
+    } finally {
+        if (request === rosterRequest) loadMore.disabled = false;
+    }
+}
+
 function updateStudentsTable(students) {
     const tbody = document.getElementById('students-table-body');
     const countElement = document.getElementById('student-count');
     
+    document.getElementById('load-more-students').classList.toggle('d-none', !rosterNextCursor);
+    
     if (!students || students.length === 0) {
         tbody.innerHTML = `
             <tr>
@@ -174,9 +365,10 @@ function updateStudentsTable(students) {
         return;
     }
     
-    filteredStudents = students;
     renderStudentsTable(students);
-    countElement.textContent = `Showing ${students.length} students`;
+    countElement.textContent = rosterTotal !== null && rosterTotal !== students.length
+        ? `Showing ${students.length} of ${rosterTotal} students`
+        : `Showing ${students.length} students`;
 }
 
 function renderStudentsTable(students) {
@@ -215,25 +407,31 @@ function renderStudentsTable(students) {
 }
 
 function filterStudents(searchTerm) {
-    if (!dashboardData || !dashboardData.all_students) return;
-    
-    const term = searchTerm.toLowerCase().trim();
-    
-    if (!term) {
-        renderStudentsTable(dashboardData.all_students);
-        document.getElementById('student-count').textContent = `Showing ${dashboardData.all_students.length} students`;
-        return;
+    // Debounced so typing does not fire a request per keystroke
+    clearTimeout(searchTimer);
+    searchTimer = setTimeout(() => {
+        const term = searchTerm.trim();
+        if (term === rosterQuery.q) return;
+        rosterQuery.q = term;
+        loadStudentsPage(true);
+    }, 250);
+}
+
+function sortStudents(column) {
+    if (rosterQuery.sort === column) {
+        rosterQuery.order = rosterQuery.order === 'asc' ? 'desc' : 'asc';
+    } else {
+        rosterQuery.sort = column;
+        rosterQuery.order = 'asc';
     }
     
-    const filtered = dashboardData.all_students.filter(student => 
-        student.name.toLowerCase().includes(term) ||
-        student.prn.toLowerCase().includes(term) ||
-        student.email.toLowerCase().includes(term) ||
-        student.status.toLowerCase().includes(term)
-    );
+    document.querySelectorAll('th.sortable').forEach(header => {
+        const icon = header.querySelector('i');
+        const active = header.dataset.sort === rosterQuery.sort;
+        icon.className = active ? `fas fa-sort-${rosterQuery.order === 'asc' ? 'up' : 'down'}` : 'fas fa-sort';
+    });
     
-    renderStudentsTable(filtered);
-    document.getElementById('student-count').textContent = `Showing ${filtered.length} of ${dashboardData.all_students.length} students`;
+    loadStudentsPage(true);
 }
 
 async function exportData() {
@@ -274,36 +472,36 @@ async function exportData() {
     }
 }
 
-// Real-time updates using Server-Sent Events (if needed in future)
-function initializeRealTimeUpdates() {
-    if (typeof(EventSource) !== "undefined") {
-        const eventSource = new EventSource('/api/events');
-        
-        eventSource.onmessage = function(event) {
-            const data = JSON.parse(event.data);
-            
-            if (data.type === 'scan_update') {
-                loadDashboardData();
-                EventManager.showToast(`New scan: ${data.student_name}`, 'success');
+// Real-time updates using Server-Sent Events
+function initializeRealTimeUpdates(fallback) {
+    let streamedScans = [];
+    
+    const liveUpdates = new EventManager.LiveUpdates({
+        checkin: scan => streamedScans.push(scan),
+        // Each batch of check-ins is followed by the counters after it
+        stats: stats => {
+            if (!dashboardData) return;
+            const fresh = streamedScans.filter(scan => scan.id > scanCursor);
+            streamedScans = [];
+            if (fresh.length > 0) {
+                scanCursor = fresh[fresh.length - 1].id;
             }
-        };
-        
-        eventSource.onerror = function(event) {
-            console.error('EventSource failed:', event);
-        };
-        
-        // Close connection when page is unloaded
-        window.addEventListener('beforeunload', function() {
-            eventSource.close();
-        });
-    }
+            applyDashboardDelta(stats, fresh);
+        },
+        reset: () => {
+            streamedScans = [];
+            loadDashboardData();
+        }
+    }, fallback);
+    
+    liveUpdates.start();
 }
 
 // Handle page visibility changes
 document.addEventListener('visibilitychange', function() {
     if (!document.hidden) {
         // Page became visible, refresh data
-        loadDashboardData();
+        refreshDashboard();
     }
 });
 
@@ -8,17 +8,38 @@ let currentStream = null;
 let cameras = [];
 let currentCameraIndex = 0;
 
+// Offline scan queue: every detection is stored in IndexedDB first and
+// synced to /api/scans/sync, so scanning keeps working without Wi-Fi
+const SCAN_QUEUE_DB = 'depali-scanner';
+const SCAN_QUEUE_STORE = 'pending-scans';
+const SYNC_BATCH_SIZE = 200;
+let scanQueueDb = null;
+let syncChain = Promise.resolve();
+
+// Dashboard delta state: last seen scan id, roster version and recent scans
+let scanCursor = null;
+let rosterVersion = null;
+let scanVersion = null;
+let recentScans = [];
+
+// Manual entry: typing a name or PRN fragment looks the student up
+let manualSearchTimer = null;
+let manualSearchRequest = 0;
+
 document.addEventListener('DOMContentLoaded', function() {
     initializeScanner();
     loadScanStats();
-    loadScanHistory();
     
-    // Set up auto-refresh for stats and history
+    // Live stats and history, with delta polling whenever the stream is down
     const statsRefresh = new EventManager.AutoRefresh(loadScanStats, 10000);
-    const historyRefresh = new EventManager.AutoRefresh(loadScanHistory, 15000);
-    
-    statsRefresh.start();
-    historyRefresh.start();
+    startLiveScanHistory(statsRefresh);
+
+    // Push scans queued while offline as soon as the connection is back
+    const queueRefresh = new EventManager.AutoRefresh(syncInBackground, 15000);
+    queueRefresh.start();
+    window.addEventListener('online', syncInBackground);
+    window.addEventListener('offline', updateQueueStatus);
+    syncInBackground();
 });
 
 function initializeScanner() {
@@ -30,10 +51,14 @@ function initializeScanner() {
     document.getElementById('start-scanner').addEventListener('click', startScanner);
     document.getElementById('stop-scanner').addEventListener('click', stopScanner);
     document.getElementById('switch-camera').addEventListener('click', switchCamera);
-    document.getElementById('refresh-history').addEventListener('click', loadScanHistory);
+    document.getElementById('refresh-history').addEventListener('click', loadScanStats);
     
     // Manual QR input form
     document.getElementById('manual-qr-form').addEventListener('submit', handleManualQRInput);
+    document.getElementById('manual-qr-input').addEventListener('input', function() {
+        clearTimeout(manualSearchTimer);
+        manualSearchTimer = setTimeout(() => searchManualStudents(this.value.trim()), 200);
+    });
     
     // Get available cameras
     getCameras();
@@ -156,18 +181,35 @@ async function handleQRCodeDetected(qrData) {
         // Add visual feedback
         showScanFeedback();
 
-        const response = await EventManager.apiRequest('/api/validate_qr', {
-            method: 'POST',
-            body: JSON.stringify({ qr_hash: qrHash })
-        });
-        
-        if (response.valid) {
+        const scan = { scan_id: newScanId(), qr_hash: qrHash, scanned_at: Date.now() };
+        let response;
+        try {
+            if (await isQueued(qrHash)) {
+                response = { valid: false, message: 'QR code already scanned on this device' };
+            } else {
+                await queueScan(scan);
+                const results = await syncScanQueue();
+                response = results[scan.scan_id];
+                reportSyncedScans(results, scan.scan_id);
+            }
+        } catch (error) {
+            // IndexedDB unavailable (e.g. private browsing): validate directly
+            console.error('Offline queue unavailable:', error);
+            response = await EventManager.apiRequest('/api/validate_qr', {
+                method: 'POST',
+                body: JSON.stringify({ qr_hash: qrHash })
+            });
+        }
+
+        if (!response) {
+            showScanResult(null, 'queued');
+            EventManager.showToast('Scan saved offline, it will sync when the connection returns', 'warning');
+        } else if (response.valid) {
             showScanResult(response.student, 'success');
             EventManager.showToast(`Successfully scanned: ${response.student.name}`, 'success');
             
             // Update stats and history
             loadScanStats();
-            loadScanHistory();
         } else {
             showScanResult(null, 'error', response.message);
             EventManager.showToast(response.message, 'error');
@@ -217,6 +259,18 @@ function showScanResult(student, type, message = '') {
                 </div>
             </div>
         `;
+    } else if (type === 'queued') {
+        resultContainer.innerHTML = `
+            <div class="text-center">
+                <div class="mb-3">
+                    <i class="fas fa-cloud-upload-alt fa-3x text-warning"></i>
+                </div>
+                <h5 class="text-warning">Saved Offline</h5>
+                <div class="mt-3">
+                    <p class="text-muted">The scan is stored on this device and will be checked once the connection returns</p>
+                </div>
+            </div>
+        `;
     } else {
         resultContainer.innerHTML = `
             <div class="text-center">
@@ -242,29 +296,62 @@ function showScanResult(student, type, message = '') {
     }, 5000);
 }
 
+// Stats and history share one delta poll: after the first call only new
+// check-ins since the last seen scan id come back
 async function loadScanStats() {
     try {
-        const response = await EventManager.apiRequest('/api/dashboard_stats');
+        let url = '/api/dashboard_delta?limit=10';
+        if (scanCursor !== null) {
+            url = `/api/dashboard_delta?after=${scanCursor}&roster_version=${rosterVersion}&scan_version=${scanVersion}&limit=10`;
+        }
+        const response = await EventManager.apiRequest(url);
+
+        if (response.reset || response.has_more) {
+            // Roster changed, scans were cleared or we fell far behind:
+            // start over from the latest scans
+            scanCursor = null;
+            return loadScanStats();
+        }
+
+        const previous = scanCursor === null ? [] : recentScans;
+        recentScans = response.new_scans.slice().reverse().concat(previous).slice(0, 10);
+        scanCursor = response.cursor;
+        rosterVersion = response.roster_version;
+        scanVersion = response.scan_version;
+
         updateScanStats(response.stats);
+        updateScanHistory(recentScans);
     } catch (error) {
         console.error('Failed to load scan stats:', error);
     }
 }
 
+function startLiveScanHistory(fallback) {
+    const liveUpdates = new EventManager.LiveUpdates({
+        checkin: scan => {
+            if (scanCursor === null || scan.id <= scanCursor) return;
+            scanCursor = scan.id;
+            recentScans = [scan].concat(recentScans).slice(0, 10);
+        },
+        stats: stats => {
+            updateScanStats(stats);
+            updateScanHistory(recentScans);
+        },
+        reset: () => {
+            scanCursor = null;
+            loadScanStats();
+        }
+    }, fallback);
+    
+    liveUpdates.start();
+}
+
 function updateScanStats(stats) {
     document.getElementById('total-scanned').textContent = EventManager.formatNumber(stats.scanned_count);
     document.getElementById('total-pending').textContent = EventManager.formatNumber(stats.pending_count);
     document.getElementById('scan-rate').textContent = `${stats.scan_percentage}%`;
 }
 
-async function loadScanHistory() {
-    try {
-        const response = await EventManager.apiRequest('/api/dashboard_stats');
-        updateScanHistory(response.recent_scans);
-    } catch (error) {
-        console.error('Failed to load scan history:', error);
-    }
-}
 
 function updateScanHistory(recentScans) {
     const historyContainer = document.getElementById('scan-history');
@@ -284,8 +371,8 @@ function updateScanHistory(recentScans) {
             <div class="scan-history-item bg-light p-3 border">
                 <div class="d-flex justify-content-between align-items-start">
                     <div>
-                        <h6 class="mb-1">${scan.name}</h6>
-                        <small class="text-muted">PRN: ${scan.prn}</small>
+                        <h6 class="mb-1">${EventManager.escapeHtml(scan.name)}</h6>
+                        <small class="text-muted">PRN: ${EventManager.escapeHtml(scan.prn)}</small>
                     </div>
                     <span class="badge bg-success">✓</span>
                 </div>
@@ -332,7 +419,6 @@ async function handleManualQRInput(e) {
             
             // Update stats and history
             loadScanStats();
-            loadScanHistory();
             
             // Close modal and reset form
             const modal = bootstrap.Modal.getInstance(document.getElementById('manualInputModal'));
@@ -347,6 +433,203 @@ async function handleManualQRInput(e) {
     }
 }
 
+function looksLikeQRCode(value) {
+    return value.startsWith('http') || /^[0-9a-f]{16,}$/i.test(value);
+}
+
+async function searchManualStudents(query) {
+    const container = document.getElementById('manual-search-results');
+    const request = ++manualSearchRequest;
+    
+    if (!query || looksLikeQRCode(query)) {
+        container.innerHTML = '';
+        return;
+    }
+    
+    try {
+        const response = await EventManager.apiRequest(`/api/students/search?q=${encodeURIComponent(query)}&limit=8`);
+        if (request !== manualSearchRequest) return;
+        
+        if (response.students.length === 0) {
+            container.innerHTML = '<div class="list-group-item text-muted small">No matching students</div>';
+            return;
+        }
+        
+        // Names and PRNs come from uploaded rosters: set them as text, never as HTML
+        container.replaceChildren(...response.students.map(student => {
+            const button = document.createElement('button');
+            button.type = 'button';
+            button.className = 'list-group-item list-group-item-action d-flex justify-content-between align-items-center';
+            button.disabled = !student.qr_hash;
+            
+            const details = document.createElement('div');
+            const name = document.createElement('div');
+            name.className = 'fw-bold';
+            name.textContent = student.name;
+            const prn = document.createElement('small');
+            prn.className = 'text-muted';
+            prn.textContent = `PRN: ${student.prn}`;
+            details.append(name, prn);
+            
+            const badge = document.createElement('span');
+            badge.className = `badge ${student.status === 'Scanned' ? 'bg-success' : 'bg-warning text-dark'}`;
+            badge.textContent = student.qr_hash ? student.status : 'No QR code';
+            
+            button.append(details, badge);
+            button.addEventListener('click', () => {
+                document.getElementById('manual-qr-input').value = student.qr_hash;
+                container.innerHTML = '';
+                document.getElementById('manual-qr-form').requestSubmit();
+            });
+            return button;
+        }));
+    } catch (error) {
+        console.error('Student search failed:', error);
+    }
+}
+
+// Offline queue helpers
+function openScanQueue() {
+    if (scanQueueDb) return Promise.resolve(scanQueueDb);
+
+    return new Promise((resolve, reject) => {
+        const request = indexedDB.open(SCAN_QUEUE_DB, 1);
+        request.onupgradeneeded = () => {
+            request.result.createObjectStore(SCAN_QUEUE_STORE, { keyPath: 'scan_id' });
+        };
+        request.onsuccess = () => {
+            scanQueueDb = request.result;
+            resolve(scanQueueDb);
+        };
+        request.onerror = () => reject(request.error);
+    });
+}
+
+async function queueStore(mode, work) {
+    const db = await openScanQueue();
+    return new Promise((resolve, reject) => {
+        const transaction = db.transaction(SCAN_QUEUE_STORE, mode);
+        const request = work(transaction.objectStore(SCAN_QUEUE_STORE));
+        transaction.oncomplete = () => resolve(request ? request.result : undefined);
+        transaction.onerror = () => reject(transaction.error);
+    });
+}
+
+function queueScan(scan) {
+    return queueStore('readwrite', store => store.put(scan));
+}
+
+function getQueuedScans() {
+    return queueStore('readonly', store => store.getAll());
+}
+
+function removeQueuedScans(scanIds) {
+    return queueStore('readwrite', store => {
+        scanIds.forEach(scanId => store.delete(scanId));
+    });
+}
+
+async function isQueued(qrHash) {
+    const queued = await getQueuedScans();
+    return queued.some(scan => scan.qr_hash === qrHash);
+}
+
+function newScanId() {
+    if (window.crypto && crypto.randomUUID) {
+        return crypto.randomUUID();
+    }
+    return `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+}
+
+function getDeviceId() {
+    let deviceId = localStorage.getItem('scannerDeviceId');
+    if (!deviceId) {
+        deviceId = `scanner-${newScanId().slice(0, 8)}`;
+        localStorage.setItem('scannerDeviceId', deviceId);
+    }
+    return deviceId;
+}
+
+// Syncs run one after another so a scan is never sent twice at the same time;
+// resolves to the server results keyed by scan_id
+function syncScanQueue() {
+    syncChain = syncChain.then(drainScanQueue);
+    return syncChain;
+}
+
+async function drainScanQueue() {
+    const results = {};
+    if (!navigator.onLine) {
+        updateQueueStatus();
+        return results;
+    }
+
+    try {
+        const queued = await getQueuedScans();
+        queued.sort((a, b) => a.scanned_at - b.scanned_at);
+
+        for (let i = 0; i < queued.length; i += SYNC_BATCH_SIZE) {
+            const batch = queued.slice(i, i + SYNC_BATCH_SIZE);
+            const response = await EventManager.apiRequest('/api/scans/sync', {
+                method: 'POST',
+                body: JSON.stringify({ device_id: getDeviceId(), scans: batch })
+            });
+
+            // The server keeps every answer, so a lost response is safe to resend
+            response.results.forEach(result => {
+                results[result.scan_id] = result;
+            });
+            await removeQueuedScans(batch.map(scan => scan.scan_id));
+        }
+    } catch (error) {
+        console.error('Scan sync failed, keeping queue:', error);
+    }
+
+    updateQueueStatus();
+    return results;
+}
+
+async function syncInBackground() {
+    try {
+        reportSyncedScans(await syncScanQueue());
+    } catch (error) {
+        console.error('Offline queue unavailable:', error);
+    }
+}
+
+function reportSyncedScans(results, currentScanId = null) {
+    const synced = Object.values(results).filter(result => result.scan_id !== currentScanId);
+    if (synced.length === 0) return;
+
+    const admitted = synced.filter(result => result.valid).length;
+    const duplicates = synced.filter(result => result.message === 'QR code already scanned').length;
+    const invalid = synced.length - admitted - duplicates;
+
+    EventManager.showToast(
+        `Synced ${synced.length} offline scan(s): ${admitted} admitted, ${duplicates} already scanned, ${invalid} invalid`,
+        duplicates || invalid ? 'warning' : 'success'
+    );
+    loadScanStats();
+}
+
+async function updateQueueStatus() {
+    const status = document.getElementById('offline-queue-status');
+    if (!status) return;
+
+    let pending = 0;
+    try {
+        pending = (await getQueuedScans()).length;
+    } catch (error) {
+        status.textContent = '';
+        return;
+    }
+
+    const connection = navigator.onLine ? 'Online' : 'Offline';
+    status.innerHTML = pending
+        ? `<i class="fas fa-cloud-upload-alt me-1 text-warning"></i>${connection} &middot; ${EventManager.formatNumber(pending)} scan(s) waiting to sync`
+        : `<i class="fas fa-check me-1 text-success"></i>${connection} &middot; all scans synced`;
+}
+
 // Handle page visibility changes to pause/resume scanning
 document.addEventListener('visibilitychange', function() {
     if (document.hidden && scanning) {
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Full-text student search over name, PRN and email
+students_fts is a trigram FTS5 index kept in sync by the triggers in
+migrations.py, so any 3+ character fragment ("pati", the last digits of a
+PRN, part of an email) is an index lookup rather than a roster scan
+"""
+
+MIN_FTS_LENGTH = 3    # trigram tokens; shorter queries match name prefixes
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+
+FTS_MATCH_SQL = 'SELECT rowid FROM students_fts WHERE students_fts MATCH ?'
+NAME_PREFIX_SQL = "SELECT id FROM students WHERE name LIKE ? ESCAPE '\\'"
+
+# Exact PRN, then a name, PRN or email starting with q or a PRN ending in it,
+# then any other match (params: q, prefix, prefix, prefix, suffix)
+TIER_SQL = '''
+    CASE
+        WHEN s.prn_number = ? COLLATE NOCASE THEN 0
+        WHEN s.name LIKE ? ESCAPE '\\' OR s.prn_number LIKE ? ESCAPE '\\'
+             OR s.email LIKE ? ESCAPE '\\' OR s.prn_number LIKE ? ESCAPE '\\' THEN 1
+        ELSE 2
+    END
+'''
+
+FTS_SEARCH_SQL = f'''
+    SELECT s.id, s.name, s.prn_number, s.email, s.qr_hash, sc.scanned_at
+    FROM students_fts
+    JOIN students s ON s.id = students_fts.rowid
+    LEFT JOIN scans sc ON sc.student_id = s.id
+    WHERE students_fts MATCH ?
+    ORDER BY {TIER_SQL}, s.name
+    LIMIT ?
+'''
+
+# One or two characters: names starting with q, a range on the NOCASE name index
+PREFIX_SEARCH_SQL = '''
+    SELECT s.id, s.name, s.prn_number, s.email, s.qr_hash, sc.scanned_at
+    FROM students s
+    LEFT JOIN scans sc ON sc.student_id = s.id
+    WHERE s.name LIKE ? ESCAPE '\\'
+    ORDER BY s.name COLLATE NOCASE
+    LIMIT ?
+'''
+
+
+def rebuild(conn):
+    """Re-index every student from the students table (caller commits)"""
+    conn.execute("INSERT INTO students_fts (students_fts) VALUES ('rebuild')")
+
+
+def fts_phrase(q):
+    """Quote q as one FTS5 phrase, i.e. a case-insensitive substring"""
+    return '"' + q.replace('"', '""') + '"'
+
+
+def like_escape(q):
+    return q.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def match_clause(q, alias='s'):
+    """(SQL condition, params) selecting students whose name, PRN or email
+    contain q, or whose name starts with it when q is too short to index"""
+    if len(q) >= MIN_FTS_LENGTH:
+        return f'{alias}.id IN ({FTS_MATCH_SQL})', [fts_phrase(q)]
+    return f'{alias}.id IN ({NAME_PREFIX_SQL})', [like_escape(q) + '%']
+
+
+def search(conn, q, limit=DEFAULT_LIMIT):
+    """Best matches first: exact PRN, then a name, PRN or email starting with
+    q or a PRN ending in it, then any other match; ties go by name. Rows are
+    (id, name, prn_number, email, qr_hash, scanned_at)"""
+    q = q.strip()
+    limit = min(max(int(limit), 1), MAX_LIMIT)
+    if not q:
+        return []
+
+    prefix = like_escape(q) + '%'
+    if len(q) >= MIN_FTS_LENGTH:
+        suffix = '%' + like_escape(q)
+        return conn.execute(FTS_SEARCH_SQL, [fts_phrase(q), q, prefix, prefix, prefix, suffix, limit]).fetchall()
+    return conn.execute(PREFIX_SEARCH_SQL, [prefix, limit]).fetchall()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Test atomic QR check-in and the duplicate-scan migration
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+
+from testing import ASHA, roster_db
+from database import get_db
+from app import app, check_in_student
+
+def scan_count():
+    with get_db() as conn:
+        return conn.execute('SELECT COUNT(*) FROM scans').fetchone()[0]
+
+def test_first_and_repeat_scan():
+    """First scan wins, repeats report the student as already scanned"""
+    print("🎫 Testing first and repeat scan...")
+    roster_db([ASHA])
+
+    student, first_scan = check_in_student('hash-001', 'pytest')
+    assert first_scan and student[1] == 'Asha Patil', student
+
+    student, first_scan = check_in_student('hash-001', 'pytest')
+    assert not first_scan and student[2] == 'PRN001', student
+
+    student, first_scan = check_in_student('unknown', 'pytest')
+    assert student is None and not first_scan
+
+    assert scan_count() == 1
+    print("✅ One scan recorded, repeat and invalid codes rejected")
+
+def test_routes_use_check_in():
+    """Both validation routes report the same outcomes"""
+    print("🌐 Testing validation routes...")
+    roster_db([ASHA])
+    client = app.test_client()
+
+    response = client.post('/api/validate_qr', json={'qr_hash': 'hash-001'})
+    assert response.status_code == 200 and response.get_json()['valid']
+
+    response = client.post('/api/validate_qr', json={'qr_hash': 'hash-001'})
+    assert response.get_json()['message'] == 'QR code already scanned'
+
+    response = client.get('/validate/hash-001')
+    assert b'QR code already scanned' in response.data
+
+    response = client.get('/validate/unknown')
+    assert b'Invalid QR code' in response.data
+    print("✅ Routes return first-scan, repeat and invalid results")
+
+def test_concurrent_gates():
+    """Gates scanning the same code at once record exactly one scan"""
+    print("🚦 Testing concurrent gates...")
+    roster_db([ASHA])
+
+    results = []
+    barrier = threading.Barrier(8)
+
+    def gate():
+        barrier.wait()
+        results.append(check_in_student('hash-001', 'gate')[1])
+
+    threads = [threading.Thread(target=gate) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results.count(True) == 1, results
+    assert scan_count() == 1
+    print("✅ Exactly one gate admitted the student")
+
+def test_duplicate_scan_migration():
+    """Databases with duplicate scan rows keep only the earliest scan"""
+    print("🧹 Testing duplicate scan migration...")
+    path = os.path.join(tempfile.mkdtemp(prefix='depali_checkin_'), 'student_event.db')
+
+    # Build a database the way older versions did, without the unique index
+    conn = sqlite3.connect(path)
+    conn.executescript('''
+        CREATE TABLE students (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            prn_number TEXT UNIQUE NOT NULL,
+            email TEXT NOT NULL,
+            qr_code_path TEXT,
+            qr_hash TEXT UNIQUE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            email_sent BOOLEAN DEFAULT FALSE
+        );
+        CREATE TABLE scans (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            student_id INTEGER,
+            scanned_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            scanner_info TEXT
+        );
+        INSERT INTO students (name, prn_number, email, qr_hash)
+        VALUES ('Test Student', 'PRN001', 'test@example.com', 'hash-001');
+        INSERT INTO scans (student_id, scanner_info) VALUES (1, 'first'), (1, 'second'), (1, 'third');
+    ''')
+    conn.close()
+
+    roster_db([ASHA], path)
+
+    with get_db() as conn:
+        rows = conn.execute('SELECT scanner_info FROM scans').fetchall()
+    assert rows == [('first',)], rows
+
+    student, first_scan = check_in_student('hash-001', 'after-migration')
+    assert student and not first_scan
+    print("✅ Duplicates removed and unique index enforced")
+
+def main():
+    """Run check-in tests"""
+    print("🧪 Atomic Check-in Tests")
+    print("=" * 50)
+
+    tests = [
+        test_first_and_repeat_scan,
+        test_routes_use_check_in,
+        test_concurrent_gates,
+        test_duplicate_scan_migration,
+    ]
+
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__} failed: {e}")
+
+    print("\n" + "=" * 50)
+    if failed:
+        print(f"❌ {failed} test(s) failed")
+        return 1
+    print("🎉 All check-in tests passed!")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
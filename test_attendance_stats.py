@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Test the trigger-maintained attendance counters
+Runs against a temporary database
+"""
+
+import sys
+
+from testing import ASHA, NEHA, RAHUL, admin_client, roster_db
+import attendance_stats
+from database import get_db
+from app import check_in_student
+from roster_index import roster_index
+
+def stats_roster():
+    """Three students, only the first with a QR hash and image; returns the database path"""
+    path = roster_db([ASHA, RAHUL[:3], NEHA[:3]])
+    with get_db() as conn:
+        conn.execute("UPDATE students SET qr_code_path = 'qr_codes/PRN001.png' WHERE prn_number = 'PRN001'")
+        conn.commit()
+    return path
+
+def assert_exact(expected=None):
+    with get_db() as conn:
+        assert attendance_stats.verify(conn) == {}, attendance_stats.verify(conn)
+        stats = attendance_stats.read_stats(conn)
+    if expected:
+        assert stats == expected, stats
+    return stats
+
+def test_triggers_track_every_change():
+    """Inserts, updates, scans and deletes keep the counters exact"""
+    print("🔢 Testing trigger-maintained counters...")
+    stats_roster()
+    assert_exact({'total_students': 3, 'with_qr': 1, 'with_hash': 1, 'emailed': 0, 'scanned': 0})
+
+    with get_db() as conn:
+        conn.execute("UPDATE students SET qr_hash = 'hash-002', qr_code_path = 'qr_codes/PRN002.png' WHERE prn_number = 'PRN002'")
+        conn.execute("UPDATE students SET email_sent = TRUE WHERE prn_number IN ('PRN001', 'PRN002')")
+        conn.commit()
+    roster_index.load()
+    check_in_student('hash-001', 'pytest')
+    check_in_student('hash-001', 'pytest')
+    assert_exact({'total_students': 3, 'with_qr': 2, 'with_hash': 2, 'emailed': 2, 'scanned': 1})
+
+    with get_db() as conn:
+        conn.execute("DELETE FROM students WHERE prn_number = 'PRN003'")
+        conn.execute('DELETE FROM scans')
+        conn.commit()
+    assert_exact({'total_students': 2, 'with_qr': 2, 'with_hash': 2, 'emailed': 2, 'scanned': 0})
+    print("✅ Counters match a full recount after every change")
+
+def test_dashboard_and_clear_use_counters():
+    """dashboard_stats and clear_all_data report the stored counters"""
+    print("📊 Testing readers...")
+    stats_roster()
+    check_in_student('hash-001', 'pytest')
+
+    client = admin_client()
+    stats = client.get('/api/dashboard_stats').get_json()['stats']
+    assert stats['total_students'] == 3 and stats['scanned_count'] == 1 and stats['pending_count'] == 2, stats
+
+    cleared = client.post('/api/clear_all_data', json={'confirmation': 'CLEAR_ALL_DATA'}).get_json()['cleared']
+    assert cleared['students'] == 3 and cleared['scans'] == 1, cleared
+    assert_exact({'total_students': 0, 'with_qr': 0, 'with_hash': 0, 'emailed': 0, 'scanned': 0})
+    print("✅ Readers use the single-row counters")
+
+def test_rebuild_repairs_drift():
+    """The rebuild command recomputes drifted counters and verifies them"""
+    print("🔧 Testing rebuild and verify...")
+    path = stats_roster()
+    with get_db() as conn:
+        conn.execute('UPDATE attendance_stats SET total_students = 99, scanned = 7 WHERE id = 1')
+        conn.commit()
+        assert set(attendance_stats.verify(conn)) == {'total_students', 'scanned'}
+
+    argv = sys.argv
+    try:
+        sys.argv = ['attendance_stats.py', '--db', path, '--verify']
+        assert attendance_stats.main() == 1
+        sys.argv = ['attendance_stats.py', '--db', path]
+        assert attendance_stats.main() == 0
+    finally:
+        sys.argv = argv
+    assert_exact({'total_students': 3, 'with_qr': 1, 'with_hash': 1, 'emailed': 0, 'scanned': 0})
+    print("✅ Drift detected and repaired")
+
+def main():
+    """Run attendance stats tests"""
+    print("🧪 Attendance Stats Tests")
+    print("=" * 50)
+
+    tests = [
+        test_triggers_track_every_change,
+        test_dashboard_and_clear_use_counters,
+        test_rebuild_repairs_drift,
+    ]
+
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__} failed: {e}")
+
+    print("\n" + "=" * 50)
+    if failed:
+        print(f"❌ {failed} test(s) failed")
+        return 1
+    print("🎉 All attendance stats tests passed!")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -58,16 +58,16 @@ def test_authentication():
     except Exception as e:
         print(f"❌ Error testing QR validation: {str(e)}")
     
-    # Test 5: Scanner page accessible (should not require auth)
-    print("\n5. Testing scanner page access:")
+    # Test 5: Scanner page access without login (should redirect; its search and live feed are admin APIs)
+    print("\n5. Testing scanner access without login:")
     try:
-        response = requests.get(f"{base_url}/scanner")
-        if response.status_code == 200:
-            print("✅ Scanner page accessible without auth")
+        response = requests.get(f"{base_url}/scanner", allow_redirects=False)
+        if response.status_code == 302:
+            print("✅ Scanner route properly protected (redirects to login)")
         else:
-            print(f"❌ Scanner page blocked (status: {response.status_code})")
+            print(f"❌ Scanner route not protected (status: {response.status_code})")
     except Exception as e:
-        print(f"❌ Error testing scanner page: {str(e)}")
+        print(f"❌ Error testing scanner route: {str(e)}")
     
     # Test 6: Home page accessible
     print("\n6. Testing home page access:")
@@ -86,7 +86,7 @@ def test_authentication():
     print("✅ Dashboard protected") 
     print("✅ Login page accessible")
     print("✅ QR validation open")
-    print("✅ Scanner page open")
+    print("✅ Scanner protected")
     print("✅ Home page accessible")
     print("\n🎯 Security implemented successfully!")
 
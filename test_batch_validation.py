@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Test the batch QR validation endpoint
+"""
+
+import sys
+from datetime import datetime, timezone
+
+from testing import STUDENTS, roster_db
+from database import get_db
+from app import app
+import scan_time
+
+def test_results_in_order():
+    """Each code gets its own result, in the order submitted"""
+    print("📋 Testing per-code results...")
+    roster_db(STUDENTS)
+    client = app.test_client()
+
+    client.post('/api/validate_qr', json={'qr_hash': 'hash-003'})
+    response = client.post('/api/validate_qr_batch', json={'scans': [
+        'hash-001',
+        {'qr_hash': 'unknown'},
+        {'qr_hash': 'hash-003'},
+        {'qr_hash': 'hash-002', 'device_id': 'gate-7'},
+    ]})
+    assert response.status_code == 200
+    data = response.get_json()
+
+    messages = [r['message'] for r in data['results']]
+    assert messages == [
+        'QR code scanned successfully',
+        'Invalid QR code',
+        'QR code already scanned',
+        'QR code scanned successfully',
+    ], messages
+    assert data['summary'] == {'total': 4, 'admitted': 2, 'already_scanned': 1, 'invalid': 1}, data['summary']
+
+    with get_db() as conn:
+        scanner = conn.execute('SELECT scanner_info FROM scans WHERE student_id = 2').fetchone()[0]
+    assert scanner == 'gate-7'
+    print("✅ Results returned in order with summary counts")
+
+def test_earliest_client_scan_wins():
+    """The same badge twice in one batch admits the earliest client scan"""
+    print("⏱️  Testing client timestamps...")
+    roster_db(STUDENTS)
+    client = app.test_client()
+
+    early = scan_time.now_ms() - 10 * 60 * 1000
+    late = datetime.fromtimestamp((early + 5 * 60 * 1000) / 1000, timezone.utc).isoformat()
+    response = client.post('/api/validate_qr_batch', json={'scans': [
+        {'qr_hash': 'hash-001', 'scanned_at': late, 'device_id': 'late'},
+        {'qr_hash': 'hash-001', 'scanned_at': early, 'device_id': 'early'},
+    ]})
+    results = response.get_json()['results']
+    assert [r['valid'] for r in results] == [False, True], results
+
+    with get_db() as conn:
+        row = conn.execute('SELECT scanner_info, scanned_at FROM scans').fetchone()
+    assert row == ('early', early), row
+    print("✅ Earliest scan admitted and stored as epoch ms")
+
+def test_bad_input():
+    """Malformed batches and entries are rejected clearly"""
+    print("🚫 Testing bad input...")
+    roster_db(STUDENTS)
+    client = app.test_client()
+
+    assert client.post('/api/validate_qr_batch', json={'scans': []}).status_code == 400
+    assert client.post('/api/validate_qr_batch', json={}).status_code == 400
+    too_many = ['hash-001'] * (app.config['MAX_BATCH_SCANS'] + 1)
+    assert client.post('/api/validate_qr_batch', json={'scans': too_many}).status_code == 400
+
+    response = client.post('/api/validate_qr_batch', json={'scans': [
+        {'qr_hash': 'hash-001', 'scanned_at': 'yesterday'},
+        {'device_id': 'gate-1'},
+    ]})
+    messages = [r['message'] for r in response.get_json()['results']]
+    assert messages == ['Invalid scan timestamp', 'QR hash is required'], messages
+    print("✅ Bad batches and entries rejected")
+
+def main():
+    """Run batch validation tests"""
+    print("🧪 Batch Validation Tests")
+    print("=" * 50)
+
+    tests = [
+        test_results_in_order,
+        test_earliest_client_scan_wins,
+        test_bad_input,
+    ]
+
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__} failed: {e}")
+
+    print("\n" + "=" * 50)
+    if failed:
+        print(f"❌ {failed} test(s) failed")
+        return 1
+    print("🎉 All batch validation tests passed!")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Test negotiated response compression and precompressed static files
+"""
+
+import gzip
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from testing import numbered_students, roster_client
+from app import app
+import compression
+from compression import compressor, precompress_static
+
+def decode(response):
+    body = response.get_data()
+    encoding = response.headers.get('Content-Encoding')
+    if encoding == 'gzip':
+        return gzip.decompress(body)
+    if encoding == 'br':
+        return compression.brotli.decompress(body)
+    return body
+
+def test_json_negotiation():
+    """Large JSON is compressed per Accept-Encoding; small JSON and identity clients are not"""
+    print("🗜️  Testing JSON compression...")
+    client = roster_client(numbered_students(60))
+    plain = client.get('/api/dashboard_stats')
+    assert 'Content-Encoding' not in plain.headers
+    assert 'Accept-Encoding' in plain.headers['Vary']
+
+    gzipped = client.get('/api/dashboard_stats', headers={'Accept-Encoding': 'gzip'})
+    assert gzipped.headers['Content-Encoding'] == 'gzip'
+    assert len(gzipped.get_data()) < len(plain.get_data()) // 3
+    assert json.loads(decode(gzipped)) == plain.get_json()
+
+    # br is preferred unless the client rates it lower or refuses it
+    preferred = client.get('/api/dashboard_stats', headers={'Accept-Encoding': 'gzip, deflate, br'})
+    refused = client.get('/api/dashboard_stats', headers={'Accept-Encoding': 'gzip, br;q=0'})
+    assert refused.headers['Content-Encoding'] == 'gzip'
+    if compression.BROTLI_AVAILABLE:
+        assert preferred.headers['Content-Encoding'] == 'br'
+        assert json.loads(decode(preferred)) == plain.get_json()
+
+    # The export workbook is worth compressing too
+    export = client.get('/api/export_data', headers={'Accept-Encoding': 'gzip'})
+    assert export.headers['Content-Encoding'] == 'gzip' and decode(export)[:2] == b'PK'
+    assert 'attachment' in export.headers['Content-Disposition']
+
+    # Under the threshold the bytes are sent as they are
+    small = client.get('/api/arrivals', headers={'Accept-Encoding': 'gzip'})
+    assert len(small.get_data()) < compressor.min_size and 'Content-Encoding' not in small.headers
+    print("✅ Negotiated, decodable and skipped when small")
+
+def test_etags_and_metrics():
+    """Weak data-version ETags still give 304s, and sizes before/after are counted"""
+    print("🏷️  Testing ETags and metrics...")
+    client = roster_client(numbered_students(60))
+    before = client.get('/api/metrics').get_json()['compression']
+
+    first = client.get('/api/dashboard_stats', headers={'Accept-Encoding': 'gzip'})
+    etag = first.headers['ETag']
+    assert etag.startswith('W/')
+    repeat = client.get('/api/dashboard_stats', headers={'Accept-Encoding': 'br', 'If-None-Match': etag})
+    assert repeat.status_code == 304 and not repeat.get_data()
+
+    after = client.get('/api/metrics').get_json()['compression']
+    assert after['compressed'] == before['compressed'] + 1
+    sent = after['bytes_after'] - before['bytes_after']
+    assert sent < after['bytes_before'] - before['bytes_before']
+    assert after['endpoints']['dashboard_stats']['bytes_after'] < after['endpoints']['dashboard_stats']['bytes_before']
+    print("✅ 304s unaffected, sizes reported")
+
+def test_precompressed_static():
+    """Fresh .br/.gz files are served for JS/CSS; a stale variant is ignored"""
+    print("📦 Testing precompressed static files...")
+    client = roster_client(numbered_students(60))
+    folder = tempfile.mkdtemp(prefix='depali_static_')
+    shutil.copytree(app.static_folder, folder, dirs_exist_ok=True,
+                    ignore=shutil.ignore_patterns('qr_codes', '*.gz', '*.br'))
+    original_folder = compressor.static_folder
+    compressor.static_folder = folder
+    try:
+        written = precompress_static(folder)
+        assert os.path.join(folder, 'js', 'common.js.gz') in written
+        assert precompress_static(folder) == []
+
+        with open(os.path.join(folder, 'js', 'common.js'), 'rb') as f:
+            source = f.read()
+        response = client.get('/static/js/common.js', headers={'Accept-Encoding': 'gzip'})
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert response.mimetype in ('text/javascript', 'application/javascript')
+        assert decode(response) == source and 'Accept-Encoding' in response.headers['Vary']
+        response.close()
+
+        identity = client.get('/static/js/common.js')
+        assert 'Content-Encoding' not in identity.headers and identity.get_data() == source
+        identity.close()
+
+        # Edited after precompressing: the old variant must not be served
+        later = time.time() + 10
+        os.utime(os.path.join(folder, 'js', 'common.js'), (later, later))
+        stale = client.get('/static/js/common.js', headers={'Accept-Encoding': 'gzip, br'})
+        assert 'Content-Encoding' not in stale.headers and stale.get_data() == source
+        stale.close()
+
+        assert client.get('/static/js/../../app.py').status_code == 404
+    finally:
+        compressor.static_folder = original_folder
+    print("✅ Precompressed variants served only while fresh")
+
+def main():
+    """Run compression tests"""
+    print("🧪 Compression Tests")
+    print("=" * 50)
+
+    tests = [
+        test_json_negotiation,
+        test_etags_and_metrics,
+        test_precompressed_static,
+    ]
+
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__} failed: {e}")
+
+    print("\n" + "=" * 50)
+    if failed:
+        print(f"❌ {failed} test(s) failed")
+        return 1
+    print("🎉 All compression tests passed!")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Test ETag / 304 handling on the dashboard endpoints
+"""
+
+import sys
+
+from testing import ASHA, RAHUL, roster_client
+from app import app
+import scan_time
+
+ENDPOINTS = [
+    '/api/dashboard_stats?include_students=0',
+    '/api/students?sort=name&limit=10',
+    '/api/dashboard_delta?after=0',
+]
+
+def test_unchanged_poll_is_304():
+    """Repeating a poll with its ETag gets an empty 304 until a scan lands"""
+    print("🏷️ Testing 304 on unchanged data...")
+    client = roster_client([ASHA, RAHUL])
+    before = client.get('/api/metrics').get_json()['conditional_get']['not_modified']
+
+    for url in ENDPOINTS:
+        first = client.get(url)
+        etag = first.headers['ETag']
+        assert first.status_code == 200 and etag.startswith('W/'), (url, first.headers)
+
+        again = client.get(url, headers={'If-None-Match': etag})
+        assert again.status_code == 304 and again.data == b'', url
+        assert again.headers['ETag'] == etag
+
+    client.post('/api/validate_qr', json={'qr_hash': 'hash-001'})
+    for url in ENDPOINTS:
+        stale = client.get(url)
+        fresh = client.get(url, headers={'If-None-Match': 'W/"0-0-0"'})
+        assert fresh.status_code == 200 and fresh.get_json() == stale.get_json(), url
+
+    metrics = client.get('/api/metrics').get_json()['conditional_get']
+    assert metrics['not_modified'] - before == len(ENDPOINTS), metrics
+    print("✅ Unchanged polls answered with 304")
+
+def test_tag_tracks_query_and_scan_updates():
+    """Different queries get different tags; a synced earlier scan time changes the tag"""
+    print("🔀 Testing tag inputs...")
+    client = roster_client([ASHA, RAHUL])
+    client.post('/api/validate_qr', json={'qr_hash': 'hash-001'})
+
+    by_name = client.get('/api/students?sort=name').headers['ETag']
+    by_prn = client.get('/api/students?sort=prn').headers['ETag']
+    assert by_name != by_prn
+
+    earlier = scan_time.now_ms() - 30 * 60 * 1000
+    client.post('/api/scans/sync', json={'device_id': 'gate-b', 'scans': [
+        {'scan_id': 'b-1', 'qr_hash': 'hash-001', 'scanned_at': earlier},
+    ]})
+    response = client.get('/api/students?sort=name', headers={'If-None-Match': by_name})
+    assert response.status_code == 200, response.status_code
+    scanned = [s for s in response.get_json()['students'] if s['prn'] == 'PRN001']
+    assert scanned[0]['scanned_at'] == scan_time.format_ist(earlier), scanned
+    print("✅ Tags change with the query and with rewritten scans")
+
+def test_auth_and_errors_not_tagged():
+    """Anonymous callers get 401 rather than 304, and errors carry no ETag"""
+    print("🚫 Testing auth and errors...")
+    client = roster_client([ASHA, RAHUL])
+    etag = client.get('/api/students').headers['ETag']
+
+    anonymous = app.test_client().get('/api/students', headers={'If-None-Match': etag})
+    assert anonymous.status_code == 401
+
+    bad = client.get('/api/students?sort=email')
+    assert bad.status_code == 400 and 'ETag' not in bad.headers
+    print("✅ Only successful admin responses are tagged")
+
+def main():
+    """Run conditional GET tests"""
+    print("🧪 Conditional GET Tests")
+    print("=" * 50)
+
+    tests = [
+        test_unchanged_poll_is_304,
+        test_tag_tracks_query_and_scan_updates,
+        test_auth_and_errors_not_tagged,
+    ]
+
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__} failed: {e}")
+
+    print("\n" + "=" * 50)
+    if failed:
+        print(f"❌ {failed} test(s) failed")
+        return 1
+    print("🎉 All conditional GET tests passed!")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
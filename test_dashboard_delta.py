@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Test the incremental dashboard delta endpoint
+"""
+
+import sys
+
+from testing import numbered_students, roster_client, roster_db
+from database import get_db
+from app import app
+
+def test_only_new_checkins():
+    """A poll after the cursor returns just the new check-ins and current counters"""
+    print("📈 Testing deltas after a cursor...")
+    client = roster_client(numbered_students(3))
+
+    client.post('/api/validate_qr', json={'qr_hash': 'hash-000'})
+    full = client.get('/api/dashboard_stats').get_json()
+    assert full['stats']['scanned_count'] == 1
+
+    client.post('/api/validate_qr', json={'qr_hash': 'hash-001'})
+    delta = client.get(f"/api/dashboard_delta?after={full['cursor']}"
+                       f"&roster_version={full['roster_version']}").get_json()
+    assert not delta['reset'] and not delta['has_more']
+    assert [scan['prn'] for scan in delta['new_scans']] == ['PRN001'], delta
+    assert delta['stats']['scanned_count'] == 2 and delta['stats']['pending_count'] == 1
+
+    empty = client.get(f"/api/dashboard_delta?after={delta['cursor']}"
+                       f"&roster_version={delta['roster_version']}").get_json()
+    assert empty['new_scans'] == [] and empty['cursor'] == delta['cursor']
+    print("✅ Only the new check-in was sent")
+
+def test_paging_with_has_more():
+    """A backlog larger than the limit is paged by the cursor"""
+    print("📄 Testing paging...")
+    client = roster_client(numbered_students(5))
+    client.post('/api/validate_qr_batch', json={'scans': [f'hash-{i:03d}' for i in range(5)]})
+
+    seen = []
+    after = 0
+    while True:
+        delta = client.get(f'/api/dashboard_delta?after={after}&limit=2').get_json()
+        seen.extend(scan['prn'] for scan in delta['new_scans'])
+        after = delta['cursor']
+        if not delta['has_more']:
+            break
+    assert sorted(seen) == [f'PRN{i:03d}' for i in range(5)], seen
+
+    latest = client.get('/api/dashboard_delta?limit=2').get_json()
+    assert len(latest['new_scans']) == 2 and latest['cursor'] == after
+    print("✅ Backlog delivered in pages without gaps")
+
+def test_roster_change_resets():
+    """Adding students tells clients to reload instead of applying deltas"""
+    print("🔄 Testing reset on roster change...")
+    client = roster_client(numbered_students(3))
+    full = client.get('/api/dashboard_stats').get_json()
+
+    with get_db() as conn:
+        conn.execute('''
+            INSERT INTO students (name, prn_number, email, qr_hash)
+            VALUES ('Late Student', 'PRN999', 'late@example.com', 'hash-999')
+        ''')
+        conn.commit()
+
+    delta = client.get(f"/api/dashboard_delta?after={full['cursor']}"
+                       f"&roster_version={full['roster_version']}").get_json()
+    assert delta['reset'] and delta['stats']['total_students'] == 4
+    print("✅ Clients told to reload")
+
+def test_requires_admin():
+    print("🔒 Testing authentication...")
+    roster_db(numbered_students(3))
+    anonymous = app.test_client()
+    assert anonymous.get('/api/dashboard_delta').status_code == 401
+    # The scanner polls the delta, so it is not an anonymous page either
+    assert anonymous.get('/scanner').status_code == 302
+    print("✅ Anonymous request rejected")
+
+def main():
+    """Run dashboard delta tests"""
+    print("🧪 Dashboard Delta Tests")
+    print("=" * 50)
+
+    tests = [
+        test_only_new_checkins,
+        test_paging_with_has_more,
+        test_roster_change_resets,
+        test_requires_admin,
+    ]
+
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__} failed: {e}")
+
+    print("\n" + "=" * 50)
+    if failed:
+        print(f"❌ {failed} test(s) failed")
+        return 1
+    print("🎉 All dashboard delta tests passed!")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
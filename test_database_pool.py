@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Test the shared SQLite connection layer
+"""
+
+import sys
+import threading
+
+from testing import admin_client, fresh_db
+import database
+from database import get_db
+
+def test_pragmas():
+    """Connections run in WAL mode with the tuned pragmas"""
+    print("🔧 Testing connection pragmas...")
+    fresh_db()
+
+    with get_db() as conn:
+        journal_mode = conn.execute('PRAGMA journal_mode').fetchone()[0]
+        synchronous = conn.execute('PRAGMA synchronous').fetchone()[0]
+        busy_timeout = conn.execute('PRAGMA busy_timeout').fetchone()[0]
+
+    assert journal_mode == 'wal', journal_mode
+    assert synchronous == 1, synchronous  # NORMAL
+    assert busy_timeout == database.BUSY_TIMEOUT_MS, busy_timeout
+    print("✅ WAL mode, synchronous=NORMAL and busy_timeout set")
+
+def test_connection_reuse():
+    """The same thread gets the same connection back, nested or sequential"""
+    print("♻️  Testing connection reuse...")
+    fresh_db()
+
+    with get_db() as first:
+        with get_db() as nested:
+            assert nested is first
+    with get_db() as again:
+        assert again is first
+
+    stats = database.pool.stats()
+    assert stats['opened'] == 1, stats
+    assert stats['checkouts'] == stats['releases'], stats
+    assert stats['in_use'] == 0, stats
+    print(f"✅ One connection served {stats['checkouts']} checkouts")
+
+def test_open_transaction_rolled_back():
+    """A connection released mid-transaction is rolled back, not reused dirty"""
+    print("↩️  Testing rollback on release...")
+    fresh_db()
+
+    with get_db() as conn:
+        conn.execute("INSERT INTO students (name, prn_number, email) VALUES ('A', 'P1', 'a@x.com')")
+
+    with get_db() as conn:
+        count = conn.execute('SELECT COUNT(*) FROM students').fetchone()[0]
+
+    assert count == 0
+    assert database.pool.stats()['rolled_back_on_release'] == 1
+    print("✅ Uncommitted work discarded on release")
+
+def test_leak_detection():
+    """A thread that exits while holding a connection is reported as a leak"""
+    print("🕳️  Testing leak detection...")
+    fresh_db()
+
+    worker = threading.Thread(target=database.pool.checkout)
+    worker.start()
+    worker.join()
+
+    stats = database.pool.stats()
+    assert stats['leaked'] == 1, stats
+    print("✅ Leaked checkout reported")
+
+def test_routes_release_connections():
+    """Early returns in the validation routes still release their connection"""
+    print("🚪 Testing route connection release...")
+    fresh_db()
+    client = admin_client()
+
+    client.post('/api/validate_qr', json={'qr_hash': 'does-not-exist'})
+    client.get('/validate/does-not-exist')
+    response = client.get('/api/dashboard_stats')
+    assert response.status_code == 200
+
+    stats = client.get('/api/metrics').get_json()['database']
+    assert stats['in_use'] == 0, stats
+    assert stats['leaked'] == 0, stats
+    assert stats['checkouts'] == stats['releases'], stats
+    print(f"✅ {stats['releases']} releases, nothing left checked out")
+
+def main():
+    """Run connection layer tests"""
+    print("🧪 Database Connection Layer Tests")
+    print("=" * 50)
+
+    tests = [
+        test_pragmas,
+        test_connection_reuse,
+        test_open_transaction_rolled_back,
+        test_leak_detection,
+        test_routes_release_connections,
+    ]
+
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__} failed: {e}")
+
+    print("\n" + "=" * 50)
+    if failed:
+        print(f"❌ {failed} test(s) failed")
+        return 1
+    print("🎉 All connection layer tests passed!")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Test the background job runner and /api/jobs
+"""
+
+import os
+import sys
+import tempfile
+import threading
+
+from testing import numbered_students, roster_client
+from database import get_db
+from app import app
+import jobs
+import scan_time
+from jobs import JobBusy, JobFailed, JobProgress, JobRunner, job_runner
+
+def qr_client(students=0):
+    """Roster still needing QR codes, a QR folder of its own and an admin client"""
+    app.config['QR_FOLDER'] = tempfile.mkdtemp(prefix='depali_jobs_')
+    return roster_client(numbered_students(students, qr=False))
+
+def job(job_id):
+    with get_db() as conn:
+        return jobs.get_job(conn, job_id)
+
+def test_qr_generation_job():
+    """POST returns a job at once; its status reports progress and the summary"""
+    print("🧾 Testing QR generation as a job...")
+    client = qr_client(students=12)
+
+    response = client.post('/api/generate_qr_codes')
+    assert response.status_code == 202, response.get_json()
+    started = response.get_json()
+    assert job_runner.wait(timeout=30)
+
+    status = client.get(started['status_url']).get_json()
+    assert status['status'] == 'succeeded' and status['kind'] == 'generate_qr_codes', status
+    assert status['total'] == 12 and status['done'] == 12 and status['percent'] == 100.0
+    assert status['failed'] == 0 and status['failures'] == [] and status['eta_seconds'] is None
+    assert status['result']['generated'] == 12
+    with get_db() as conn:
+        assert conn.execute('SELECT COUNT(*) FROM students WHERE qr_hash IS NULL').fetchone()[0] == 0
+    assert len([name for name in os.listdir(app.config['QR_FOLDER']) if name.endswith('.png')]) == 12
+
+    listed = client.get('/api/jobs').get_json()['jobs']
+    assert [j['id'] for j in listed] == [started['job_id']]
+    assert client.get('/api/jobs?active=1').get_json()['jobs'] == []
+    assert client.get('/api/jobs/missing').status_code == 404
+    assert app.test_client().get(started['status_url']).status_code == 401
+    print("✅ Job reported progress and result")
+
+def test_progress_and_failures():
+    """Per-item failures are kept, JobFailed keeps its partial result, ETA follows the rate"""
+    print("📈 Testing progress, failures and ETA...")
+    qr_client()
+    runner = JobRunner(workers=1)
+
+    def work(progress):
+        progress.set_total(4)
+        progress.advance(2)
+        progress.fail('PRN002', ValueError('bad email'))
+        progress.advance()
+        return {'message': 'done'}
+    job_id = runner.submit('test', work)
+    assert runner.wait(timeout=10)
+    finished = job(job_id)
+    assert finished['status'] == 'succeeded' and finished['done'] == 4 and finished['failed'] == 1
+    assert finished['failures'] == [{'item': 'PRN002', 'error': 'bad email'}], finished
+
+    def broken(progress):
+        raise JobFailed('Row 3: bad', {'row': 3})
+    job_id = runner.submit('test', broken)
+    assert runner.wait(timeout=10)
+    assert job(job_id)['status'] == 'failed' and job(job_id)['result'] == {'row': 3}
+
+    # Half done after 10 s: 5 items/s, 10 s to go
+    now = scan_time.now_ms()
+    running = jobs.describe(('id', 'test', 'running', 'items', 100, 50, 0, '[]', None, None,
+                             now - 10000, now - 10000, now, None))
+    assert running['rate_per_second'] == 5.0 and running['eta_seconds'] == 10.0, running
+    assert running['percent'] == 50.0
+
+    # Progress never commits a transaction the job has open on the same connection
+    progress = JobProgress(job_id, interval_ms=0)
+    with get_db() as conn:
+        conn.execute('BEGIN IMMEDIATE')
+        conn.execute("INSERT INTO students (name, prn_number, email) VALUES ('X', 'PRNX', 'x@example.com')")
+        progress.advance(7)
+        conn.rollback()
+        assert conn.execute('SELECT COUNT(*) FROM students').fetchone()[0] == 0
+    assert job(job_id)['done'] == 0
+    runner.stop()
+    print("✅ Failures, partial results and ETA reported")
+
+def test_one_job_per_kind():
+    """A second start of a running task gets 409 and the running job's id"""
+    print("🚦 Testing one job per kind...")
+    client = qr_client(students=1)
+    release = threading.Event()
+
+    def blocked(progress):
+        release.wait(10)
+        return {'message': 'released'}
+    job_id = job_runner.submit('generate_qr_codes', blocked)
+    try:
+        response = client.post('/api/generate_qr_codes')
+        assert response.status_code == 409 and response.get_json()['job_id'] == job_id
+        try:
+            job_runner.submit('generate_qr_codes', blocked)
+            assert False, 'expected JobBusy'
+        except JobBusy as e:
+            assert e.job_id == job_id
+        assert client.get('/api/jobs?active=1').get_json()['jobs'][0]['id'] == job_id
+    finally:
+        release.set()
+    assert job_runner.wait(timeout=10)
+    assert client.post('/api/generate_qr_codes').status_code == 202
+    assert job_runner.wait(timeout=30)
+    print("✅ Duplicate start refused")
+
+def test_stale_jobs_interrupted():
+    """A job whose worker stopped heartbeating no longer blocks its kind"""
+    print("💤 Testing abandoned jobs...")
+    qr_client()
+    old = scan_time.now_ms() - jobs.JOB_STALE_MS - 1000
+    with get_db() as conn:
+        conn.execute('''
+            INSERT INTO jobs (id, kind, status, created_at, started_at, updated_at)
+            VALUES ('gone', 'send_emails', 'running', ?, ?, ?)
+        ''', (old, old, old))
+        conn.commit()
+
+    job_id = job_runner.submit('send_emails', lambda progress: {'message': 'sent'})
+    assert job_runner.wait(timeout=10)
+    assert job(job_id)['status'] == 'succeeded'
+    abandoned = job('gone')
+    assert abandoned['status'] == 'interrupted' and abandoned['finished_at'], abandoned
+    print("✅ Abandoned job marked interrupted")
+
+def main():
+    """Run background job tests"""
+    print("🧪 Background Job Tests")
+    print("=" * 50)
+
+    tests = [
+        test_qr_generation_job,
+        test_progress_and_failures,
+        test_one_job_per_kind,
+        test_stale_jobs_interrupted,
+    ]
+
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__} failed: {e}")
+
+    print("\n" + "=" * 50)
+    if failed:
+        print(f"❌ {failed} test(s) failed")
+        return 1
+    print("🎉 All background job tests passed!")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
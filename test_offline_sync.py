@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Test the offline scanner sync endpoint
+"""
+
+import sys
+from datetime import datetime, timezone
+
+from testing import ASHA, RAHUL, admin_client, roster_db
+from database import get_db
+from app import app
+from roster_index import roster_index
+import scan_time
+
+# Offline scans taken a few minutes ago, as epoch ms and as the ISO text some scanners send
+EARLY = scan_time.now_ms() - 30 * 60 * 1000
+
+def iso(ms):
+    return datetime.fromtimestamp(ms / 1000, timezone.utc).isoformat().replace('+00:00', 'Z')
+
+def sync(client, device_id, scans):
+    return client.post('/api/scans/sync', json={'device_id': device_id, 'scans': scans})
+
+def test_retry_returns_same_result():
+    """Re-sending a scan after a lost response does not turn it into a duplicate"""
+    print("🔁 Testing idempotent retry...")
+    roster_db([ASHA, RAHUL])
+    client = app.test_client()
+    scans = [
+        {'scan_id': 'a-1', 'qr_hash': 'hash-001', 'scanned_at': iso(EARLY)},
+        {'scan_id': 'a-2', 'qr_hash': 'unknown', 'scanned_at': iso(EARLY + 60000)},
+    ]
+
+    first = sync(client, 'gate-a', scans).get_json()
+    retry = sync(client, 'gate-a', scans + [
+        {'scan_id': 'a-3', 'qr_hash': 'hash-001', 'scanned_at': iso(EARLY + 120000)},
+    ]).get_json()
+
+    assert retry['results'][:2] == first['results'], (first, retry)
+    assert first['results'][0]['valid'] and first['results'][0]['scan_id'] == 'a-1'
+    assert retry['results'][2]['message'] == 'QR code already scanned'
+    assert retry['summary'] == {'total': 3, 'admitted': 1, 'already_scanned': 1, 'invalid': 1}, retry['summary']
+
+    with get_db() as conn:
+        assert conn.execute('SELECT COUNT(*) FROM scans').fetchone()[0] == 1
+    print("✅ Retried scans get their original answers")
+
+def test_earliest_scan_wins_across_devices():
+    """An offline scan older than the recorded one takes its place"""
+    print("📴 Testing first-scan-wins for late syncs...")
+    roster_db([ASHA, RAHUL])
+    client = app.test_client()
+
+    assert client.post('/api/validate_qr', json={'qr_hash': 'hash-001'}).status_code == 200
+    with get_db() as conn:
+        roster_version = conn.execute('SELECT version FROM roster_version').fetchone()[0]
+    loads = roster_index.loads
+    dashboard = admin_client().get('/api/dashboard_stats?include_students=0').get_json()
+
+    # Gate B was offline and scanned the badge before gate A's live scan
+    result = sync(client, 'gate-b', [
+        {'scan_id': 'b-1', 'qr_hash': 'hash-001', 'scanned_at': iso(EARLY)},
+    ]).get_json()['results'][0]
+    assert result['valid'], result
+
+    # Gate C's queued scan is later than gate B's and loses
+    result = sync(client, 'gate-c', [
+        {'scan_id': 'c-1', 'qr_hash': 'hash-001', 'scanned_at': EARLY + 10 * 60000},
+    ]).get_json()['results'][0]
+    assert result['message'] == 'QR code already scanned', result
+
+    with get_db() as conn:
+        rows = conn.execute('SELECT scanner_info, scanned_at FROM scans').fetchall()
+    assert rows == [('gate-b', EARLY)], rows
+    # A corrected scan time is not a roster change: the index is not reloaded
+    with get_db() as conn:
+        assert conn.execute('SELECT version FROM roster_version').fetchone()[0] == roster_version
+        assert conn.execute('SELECT version FROM scan_version').fetchone()[0] == 1
+    assert roster_index.loads == loads
+    # Dashboards holding the old scan time are told to reload
+    delta = admin_client().get(f"/api/dashboard_delta?after={dashboard['cursor']}"
+                               f"&roster_version={dashboard['roster_version']}"
+                               f"&scan_version={dashboard['scan_version']}").get_json()
+    assert delta['reset'] and delta['scan_version'] == 1, delta
+    print("✅ Earliest scan recorded, later device told it was a duplicate")
+
+def test_implausible_times_refused():
+    """Scan times from long ago or the future are invalid and never back-date a scan"""
+    print("🕰️  Testing out-of-range scan times...")
+    roster_db([ASHA, RAHUL])
+    client = app.test_client()
+    assert client.post('/api/validate_qr', json={'qr_hash': 'hash-001'}).status_code == 200
+    with get_db() as conn:
+        before = conn.execute('SELECT scanner_info, scanned_at FROM scans').fetchall()
+
+    now = scan_time.now_ms()
+    response = sync(client, 'gate-b', [
+        {'scan_id': 'b-1', 'qr_hash': 'hash-001', 'scanned_at': 1600000000000},
+        {'scan_id': 'b-2', 'qr_hash': 'hash-001', 'scanned_at': now - scan_time.SCAN_MAX_AGE_MS - 60000},
+        {'scan_id': 'b-3', 'qr_hash': 'hash-002', 'scanned_at': now + scan_time.SCAN_MAX_SKEW_MS + 60000},
+    ]).get_json()
+    assert [r['message'] for r in response['results']] == ['Scan timestamp out of range'] * 3, response
+    assert response['summary']['admitted'] == 0 and response['summary']['invalid'] == 3
+
+    with get_db() as conn:
+        assert conn.execute('SELECT scanner_info, scanned_at FROM scans').fetchall() == before
+
+    batch = client.post('/api/validate_qr_batch', json={'scans': [
+        {'qr_hash': 'hash-002', 'scanned_at': 1600000000000},
+    ]}).get_json()
+    assert batch['results'][0]['message'] == 'Scan timestamp out of range', batch
+    print("✅ Implausible scan times refused")
+
+def test_bad_input():
+    """Scans without an id are rejected; bad entries get stored answers"""
+    print("🚫 Testing bad input...")
+    roster_db([ASHA, RAHUL])
+    client = app.test_client()
+
+    assert sync(client, 'gate-a', []).status_code == 400
+    assert sync(client, 'gate-a', [{'qr_hash': 'hash-001'}]).status_code == 400
+    assert sync(client, 'gate-a', [{'scan_id': 'x' * 65, 'qr_hash': 'hash-001'}]).status_code == 400
+
+    scans = [
+        {'scan_id': 'a-1', 'qr_hash': 'hash-002', 'scanned_at': 'yesterday'},
+        {'scan_id': 'a-2'},
+    ]
+    for _ in range(2):
+        response = sync(client, 'gate-a', scans)
+        assert response.status_code == 200
+        messages = [r['message'] for r in response.get_json()['results']]
+        assert messages == ['Invalid scan timestamp', 'QR hash is required'], messages
+    print("✅ Bad batches rejected, bad entries answered consistently")
+
+def main():
+    """Run offline sync tests"""
+    print("🧪 Offline Sync Tests")
+    print("=" * 50)
+
+    tests = [
+        test_retry_returns_same_result,
+        test_earliest_scan_wins_across_devices,
+        test_implausible_times_refused,
+        test_bad_input,
+    ]
+
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__} failed: {e}")
+
+    print("\n" + "=" * 50)
+    if failed:
+        print(f"❌ {failed} test(s) failed")
+        return 1
+    print("🎉 All offline sync tests passed!")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Test QR code rendering on a process pool (qr_render.py)
+"""
+
+import os
+import sys
+import tempfile
+
+from testing import roster_client
+from database import get_db
+from app import app
+from jobs import job_runner
+from qr_render import QrRenderer, qr_renderer, render_qr
+
+def test_pool_matches_serial():
+    """Pool workers write the same PNGs as rendering in-process, and report failures by index"""
+    print("🖨️  Testing pooled QR rendering...")
+    folder = tempfile.mkdtemp(prefix='depali_qr_')
+    items = [(f'https://example.com/validate/{i:064x}', os.path.join(folder, f'qr_{i}.png')) for i in range(10)]
+    items[7] = (items[7][0], os.path.join(folder, 'missing', 'qr_7.png'))
+
+    chunks = []
+    renderer = QrRenderer(workers=2, chunk_size=3)
+    failures = renderer.render(items, lambda count, failed: chunks.append((count, sorted(failed))))
+    assert list(failures) == [7] and 'No such file' in failures[7], failures
+    assert chunks == [(3, []), (3, []), (3, [7]), (1, [])], chunks
+
+    serial = os.path.join(folder, 'serial.png')
+    render_qr(items[4][0], serial)
+    with open(serial, 'rb') as a, open(items[4][1], 'rb') as b:
+        assert a.read() == b.read()
+
+    stats = renderer.stats()
+    assert stats['rendered'] == 9 and stats['failed'] == 1 and stats['workers'] == 2, stats
+    assert QrRenderer(workers=4).render([]) == {}
+    print("✅ Pooled images identical to serial ones")
+
+def test_generate_endpoint_uses_pool():
+    """The job writes every rendered code in one update and leaves failed students for a rerun"""
+    print("🏭 Testing /api/generate_qr_codes on the pool...")
+    prns = [f'PRN{i:03d}' for i in range(9)] + ['2023/IT/01']
+    app.config['QR_FOLDER'] = tempfile.mkdtemp(prefix='depali_qr_')
+    client = roster_client([(f'Student {prn}', prn, f'{i}@example.com') for i, prn in enumerate(prns)])
+    workers, chunk_size = qr_renderer.workers, qr_renderer.chunk_size
+    qr_renderer.workers, qr_renderer.chunk_size = 2, 4
+    try:
+        response = client.post('/api/generate_qr_codes')
+        assert response.status_code == 202, response.get_json()
+        assert job_runner.wait(timeout=60)
+        job = client.get(response.get_json()['status_url']).get_json()
+    finally:
+        qr_renderer.workers, qr_renderer.chunk_size = workers, chunk_size
+
+    assert job['status'] == 'succeeded' and job['done'] == 10 and job['failed'] == 1, job
+    assert job['failures'][0]['item'] == '2023/IT/01'
+    assert job['result']['generated'] == 9 and job['result']['failed'] == 1
+    with get_db() as conn:
+        rows = conn.execute('SELECT prn_number, qr_hash, qr_code_path FROM students').fetchall()
+    for prn, qr_hash, qr_path in rows:
+        if prn == '2023/IT/01':
+            assert qr_hash is None and qr_path is None
+        else:
+            assert len(qr_hash) == 64 and os.path.isfile(qr_path), (prn, qr_path)
+    assert len({qr_hash for _, qr_hash, _ in rows if qr_hash}) == 9
+    assert client.get('/api/metrics').get_json()['qr_render']['runs'] >= 1
+    print("✅ Codes rendered on the pool and stored together")
+
+def main():
+    """Run QR rendering tests"""
+    print("🧪 QR Rendering Tests")
+    print("=" * 50)
+
+    tests = [
+        test_pool_matches_serial,
+        test_generate_endpoint_uses_pool,
+    ]
+
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__} failed: {e}")
+
+    print("\n" + "=" * 50)
+    if failed:
+        print(f"❌ {failed} test(s) failed")
+        return 1
+    print("🎉 All QR rendering tests passed!")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Test the paginated student roster endpoint
+"""
+
+import sys
+
+from testing import roster_client
+from database import get_db
+from app import app
+import roster_pages
+
+NAMES = ['Meera Joshi', 'asha patil', 'Rohan Desai', 'Asha Patil', 'Kiran More', 'Zoya Khan', 'Rohan Desai']
+STUDENTS = [(name, f'PRN{(len(NAMES) - i):03d}', f'student{i}@example.com', f'hash-{i:03d}')
+            for i, name in enumerate(NAMES)]
+
+def scanned_roster(scanned=(0, 2, 5)):
+    """Roster with duplicate names and a few check-ins, and a logged-in admin client"""
+    client = roster_client(STUDENTS)
+    for i in scanned:
+        client.post('/api/validate_qr', json={'qr_hash': f'hash-{i:03d}'})
+    return client
+
+def expected_order(sort, order):
+    """PRNs in the order the roster should come back, worked out in Python"""
+    with get_db() as conn:
+        rows = conn.execute('''
+            SELECT s.id, s.name, s.prn_number, sc.scanned_at, sc.id
+            FROM students s LEFT JOIN scans sc ON sc.student_id = s.id
+        ''').fetchall()
+    keys = {
+        'name': lambda r: (r[1], r[0]),
+        'prn': lambda r: (r[2],),
+        'status': lambda r: (r[4] is not None, r[1], r[0]),
+        'scanned_at': lambda r: (r[4] is not None, r[3] or 0, r[4] or 0, r[1] if r[4] is None else '', r[0]),
+    }
+    rows.sort(key=keys[sort], reverse=(order == 'desc'))
+    return [row[2] for row in rows]
+
+def read_all(client, query, limit):
+    """Follow next_cursor to the end, returning every row"""
+    students = []
+    cursor = ''
+    while True:
+        page = client.get(f'/api/students?{query}&limit={limit}&cursor={cursor}').get_json()
+        assert len(page['students']) <= limit, page
+        students.extend(page['students'])
+        cursor = page['next_cursor']
+        if not cursor:
+            return students, page
+
+def test_sorted_pages():
+    """Every sort and direction pages through each student exactly once, in order"""
+    print("📄 Testing keyset pages...")
+    client = scanned_roster()
+
+    for sort in ['name', 'prn', 'status', 'scanned_at']:
+        for order in ['asc', 'desc']:
+            expected = expected_order(sort, order)
+            # Page sizes that split segments mid-way and exactly at the boundary
+            for limit in [1, 2, 3, 4, 100]:
+                students, _ = read_all(client, f'sort={sort}&order={order}', limit)
+                assert [s['prn'] for s in students] == expected, (sort, order, limit, students)
+    print("✅ Pages match the full sort with no gaps or repeats")
+
+def test_filters_and_totals():
+    """Status and text filters narrow the rows and report how many match"""
+    print("🔎 Testing filters...")
+    client = scanned_roster()
+
+    scanned, page = read_all(client, 'status=scanned', 2)
+    assert {s['prn'] for s in scanned} == {'PRN007', 'PRN005', 'PRN002'}, scanned
+    assert all(s['status'] == 'Scanned' and s['scanned_at'] for s in scanned)
+    assert page['total'] == 3 and page['total_students'] == 7
+
+    pending, page = read_all(client, 'status=pending&sort=scanned_at', 2)
+    assert len(pending) == 4 and all(s['status'] == 'Pending' for s in pending)
+    assert page['total'] == 4
+
+    # Case-insensitive substring on name, PRN or email; LIKE wildcards are literal
+    asha, page = read_all(client, 'q=ASHA', 1)
+    assert sorted(s['name'] for s in asha) == ['Asha Patil', 'asha patil'] and page['total'] == 2
+    asha_scanned, page = read_all(client, 'q=asha&status=scanned', 5)
+    assert [s['prn'] for s in asha_scanned] == [] and page['total'] == 0
+    by_email, _ = read_all(client, 'q=student4@', 5)
+    assert [s['name'] for s in by_email] == ['Kiran More']
+    wildcard, page = read_all(client, 'q=%25', 5)
+    assert wildcard == [] and page['total'] == 0
+    print("✅ Filters and totals agree")
+
+def test_optional_roster_and_errors():
+    """dashboard_stats can skip the roster; bad parameters and anonymous calls are refused"""
+    print("🚫 Testing options and errors...")
+    client = scanned_roster(scanned=())
+
+    full = client.get('/api/dashboard_stats').get_json()
+    assert len(full['all_students']) == len(NAMES)
+    slim = client.get('/api/dashboard_stats?include_students=0').get_json()
+    assert 'all_students' not in slim and slim['stats'] == full['stats']
+
+    # Well-formed tokens whose key does not fit the sort, or holds non-scalars
+    forged = [roster_pages.encode_cursor(0, key) for key in ([{}], [['a']], [True], ['a', 1, 2])]
+    forged.append(roster_pages.encode_cursor(True, []))
+    for query in ['sort=email', 'order=up', 'status=late', 'cursor=not-a-cursor'] + [
+            f'sort=prn&cursor={token}' for token in forged] + [f'cursor={token}' for token in forged]:
+        response = client.get(f'/api/students?{query}')
+        assert response.status_code == 400, (query, response.status_code)
+
+    anonymous = app.test_client()
+    assert anonymous.get('/api/students').status_code == 401
+    print("✅ Roster optional, errors rejected")
+
+def main():
+    """Run roster API tests"""
+    print("🧪 Roster API Tests")
+    print("=" * 50)
+
+    tests = [
+        test_sorted_pages,
+        test_filters_and_totals,
+        test_optional_roster_and_errors,
+    ]
+
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__} failed: {e}")
+
+    print("\n" + "=" * 50)
+    if failed:
+        print(f"❌ {failed} test(s) failed")
+        return 1
+    print("🎉 All roster API tests passed!")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
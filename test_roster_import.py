@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Test the bulk roster import behind /api/upload_students
+"""
+
+import io
+import os
+import sys
+import tempfile
+import time
+
+from testing import TEST_DIR, roster_client
+import pandas as pd
+from openpyxl import Workbook
+
+from database import get_db
+import roster_import
+from jobs import job_runner
+
+CSV = '''Student Name,PRN Number,Email Address,Branch
+Asha Patil,PRN001,asha@example.com,IT
+ Rohan Desai ,0042, rohan@example.com ,CS
+Asha Again,PRN001,asha2@example.com,IT
+Meera Joshi,PRN009,meera@example.com,IT
+,PRN010,nobody@example.com,IT
+Kiran More,PRN011,,IT
+Zoya Khan,PRN012,zoya@example.com,EXTC
+'''
+
+# Sheet rows of CSV's two rows with a blank, as listed in rejected_rows
+REJECTED = [
+    {'row': 6, 'name': '', 'prn_number': 'PRN010', 'email': 'nobody@example.com', 'reason': 'missing name'},
+    {'row': 7, 'name': 'Kiran More', 'prn_number': 'PRN011', 'email': '', 'reason': 'missing email'},
+]
+
+def registered_client(registered=()):
+    """Fresh database already holding the given (name, prn) students, plus an admin client"""
+    return roster_client([(name, prn, f'{prn}@example.com') for name, prn in registered])
+
+def upload(client, data, name):
+    """Post a sheet and wait for its import job; (status code, job or error body)"""
+    response = client.post('/api/upload_students', data={'file': (data, name)})
+    if response.status_code != 202:
+        return response.status_code, response.get_json()
+    assert job_runner.wait(timeout=30)
+    return 202, client.get(response.get_json()['status_url']).get_json()
+
+def students():
+    with get_db() as conn:
+        return dict(conn.execute('SELECT prn_number, name FROM students').fetchall())
+
+def test_counts_are_exact():
+    """Repeats in the file, PRNs already registered and blank rows are each counted"""
+    print("🔢 Testing import counts...")
+    registered_client(registered=[('Meera (registered)', 'PRN009')])
+
+    df = pd.read_csv(io.StringIO(CSV), dtype=str, keep_default_na=False)
+    with get_db() as conn:
+        counts = roster_import.import_students(conn, df)
+    assert counts == {
+        'rows': 7, 'inserted': 3, 'duplicates': 2, 'duplicates_in_file': 1,
+        'duplicates_in_db': 1, 'rejected': 2, 'missing_values': 2, 'invalid_prn': 0,
+        'invalid_email': 0, 'prns_coerced': 0, 'rejected_rows': REJECTED, 'chunks': 1,
+    }, counts
+
+    # First row of a repeated PRN wins; registered students are left as they were;
+    # text is stripped and leading zeros kept
+    assert students() == {
+        'PRN001': 'Asha Patil', '0042': 'Rohan Desai', 'PRN009': 'Meera (registered)', 'PRN012': 'Zoya Khan',
+    }, students()
+    with get_db() as conn:
+        assert conn.execute("SELECT email FROM students WHERE prn_number = '0042'").fetchone()[0] == 'rohan@example.com'
+        assert conn.execute('SELECT total_students FROM attendance_stats').fetchone()[0] == 4
+
+        empty = roster_import.import_students(conn, df.iloc[0:0])
+    assert empty['rows'] == 0 and empty['inserted'] == 0
+    print("✅ Inserted, repeated, registered and blank rows counted exactly")
+
+def test_upload_endpoint():
+    """CSV and Excel uploads report the breakdown; a sheet without the columns is refused"""
+    print("📤 Testing /api/upload_students...")
+    client = registered_client()
+
+    status, job = upload(client, io.BytesIO(CSV.encode()), 'roster.csv')
+    assert status == 202 and job['status'] == 'succeeded', job
+    body = job['result']
+    assert body['inserted'] == 4 and body['duplicates'] == 1, body
+    assert '1 repeated in the file' in body['message'], body['message']
+    assert '2 rows rejected (2 missing a name, PRN or email)' in body['message'], body['message']
+    assert job['unit'] == 'bytes' and job['percent'] == 100.0, job
+
+    # Excel stores PRNs as numbers; they must come back without a trailing .0
+    workbook = io.BytesIO()
+    pd.DataFrame({'Student Name': ['Numeric PRN', 'Asha Patil'], 'PRN Number': [1102310789, 'PRN001'],
+                  'Email Address': ['n@example.com', 'a@example.com']}).to_excel(workbook, index=False)
+    workbook.seek(0)
+    _, job = upload(client, workbook, 'roster.xlsx')
+    body = job['result']
+    assert body['inserted'] == 1 and body['duplicates_in_db'] == 1, body
+    assert '1102310789' in students()
+
+    bad = io.BytesIO(b'Name,PRN\nAsha,PRN1\n')
+    _, job = upload(client, bad, 'roster.csv')
+    assert job['status'] == 'failed' and 'Email Address' in job['error'], job
+    assert client.post('/api/upload_students', data={}).status_code == 400
+    print("✅ Endpoint reports counts and rejects bad sheets")
+
+def write_csv(text):
+    path = os.path.join(tempfile.mkdtemp(prefix='depali_import_'), 'roster.csv')
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write(text)
+    return path
+
+def test_chunked_csv():
+    """Small chunks give the same counts, report progress, and catch repeats across chunks"""
+    print("🧩 Testing chunked CSV import...")
+    registered_client(registered=[('Meera (registered)', 'PRN009')])
+    # Excel's CSV export starts with a byte order mark
+    path = write_csv('\ufeff' + CSV + 'Late Repeat,0042,late@example.com,IT\n')
+
+    sizes = [len(chunk) for chunk, _ in roster_import.iter_csv_chunks(path, chunk_rows=3)]
+    assert sizes == [3, 3, 2], sizes
+
+    seen = []
+    with get_db() as conn:
+        counts = roster_import.import_file(conn, path, chunk_rows=3,
+                                           progress=lambda c, position: seen.append((c['rows'], position)))
+    assert counts == {
+        'rows': 8, 'inserted': 3, 'duplicates': 3, 'duplicates_in_file': 2,
+        'duplicates_in_db': 1, 'rejected': 2, 'missing_values': 2, 'invalid_prn': 0,
+        'invalid_email': 0, 'prns_coerced': 0, 'rejected_rows': REJECTED, 'chunks': 3,
+    }, counts
+    assert [rows for rows, _ in seen] == [3, 6, 8] and seen[-1][1] == os.path.getsize(path), seen
+    print("✅ Chunks bounded, counts unchanged")
+
+def test_schema_errors_stop_early():
+    """A malformed row stops the import at once and names its row"""
+    print("🛑 Testing schema errors...")
+    client = registered_client()
+
+    rows = ''.join(f'Student {i},PRN{i:03d},s{i}@example.com\n' for i in range(10))
+    path = write_csv('Student Name,PRN Number,Email Address\n' + rows + 'Bad,Row,x@example.com,extra\n' + rows)
+    try:
+        with get_db() as conn:
+            roster_import.import_file(conn, path, chunk_rows=4)
+        assert False, 'expected a schema error'
+    except roster_import.RosterSchemaError as e:
+        assert e.row == 12, e.row
+        # The two full chunks before the bad row were committed
+        assert e.counts['inserted'] == 8 and e.counts['chunks'] == 2, e.counts
+    assert len(students()) == 8
+
+    for text, row in [('Name,PRN Number,Email Address\n', 1), ('', 1)]:
+        try:
+            with get_db() as conn:
+                roster_import.import_file(conn, write_csv(text))
+            assert False, 'expected a schema error'
+        except roster_import.RosterSchemaError as e:
+            assert e.row == row, (text, e.row)
+
+    bad = 'Student Name,PRN Number,Email Address\nAsha,PRN1,a@example.com\nToo,Many,f@example.com,x\n'
+    _, job = upload(client, io.BytesIO(bad.encode()), 'roster.csv')
+    body = job['result']
+    assert job['status'] == 'failed' and job['error'].startswith('Row 3:'), job
+    assert body['row'] == 3 and body['inserted'] == 0, body
+    print("✅ Stopped at the first bad row")
+
+def write_xlsx(rows):
+    """Workbook with the required headings out of order and columns around them"""
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(['Sr', 'Email Address', 'Branch', 'Student Name', 'PRN Number', 'Phone'])
+    for row in rows:
+        sheet.append(row)
+    path = os.path.join(tempfile.mkdtemp(prefix='depali_import_'), 'roster.xlsx')
+    workbook.save(path)
+    return path
+
+def test_streamed_xlsx():
+    """.xlsx rows are streamed in chunks and read the same as pandas reads them"""
+    print("📗 Testing streamed .xlsx import...")
+    path = write_xlsx([
+        [1, ' asha@example.com ', 'IT', 'Asha Patil', 'PRN001', 98200],
+        [2, 'big@example.com', 'IT', 'Float PRN', 120000000000.0, None],
+        [None, None, None, None, None, None],
+        [3, 'zero@example.com', 'CS', 'Leading Zero', '0042'],
+        [4, 'again@example.com', 'IT', 'Asha Again', 'PRN001', None],
+        [5, None, 'IT', 'No Email', 'PRN005', None],
+        [6, None, 'IT', None, None, 98200],
+    ])
+
+    chunks = list(roster_import.iter_xlsx_chunks(path, chunk_rows=2))
+    assert [len(chunk) for chunk, _ in chunks] == [2, 2, 2], chunks
+    streamed = pd.concat([chunk for chunk, _ in chunks], ignore_index=True)
+    assert list(streamed.columns) == list(roster_import.REQUIRED_COLUMNS)
+    assert streamed['PRN Number'].tolist() == ['PRN001', '120000000000', '0042', 'PRN001', 'PRN005', '']
+
+    registered_client()
+    with get_db() as conn:
+        counts = roster_import.import_file(conn, path, chunk_rows=2)
+    pandas_path = roster_import.read_sheet(path)
+    registered_client()
+    with get_db() as conn:
+        expected = roster_import.import_students(conn, pandas_path, chunk_rows=2)
+    expected['rows'] -= 1    # pandas keeps the blank row (sheet row 4) and rejects it
+    expected['missing_values'] -= 1
+    expected['rejected'] -= 1
+    expected['rejected_rows'] = [row for row in expected['rejected_rows'] if row['row'] != 4]
+    assert counts == dict(expected, chunks=3), (counts, expected)
+    # A row whose required cells are all blank is reported, as in a CSV
+    assert [row['row'] for row in counts['rejected_rows']] == [7, 8], counts['rejected_rows']
+    assert counts['missing_values'] == 2, counts
+    assert students()['120000000000'] == 'Float PRN'
+
+    garbage = write_csv('not a workbook')
+    os.rename(garbage, garbage.replace('.csv', '.xlsx'))
+    workbook = Workbook()
+    workbook.active.append(['Student Name', 'PRN Number'])
+    no_email = os.path.join(TEST_DIR, 'no_email.xlsx')
+    workbook.save(no_email)
+    for bad in [garbage.replace('.csv', '.xlsx'), no_email]:
+        try:
+            list(roster_import.iter_xlsx_chunks(bad))
+            assert False, 'expected a schema error'
+        except roster_import.RosterSchemaError as e:
+            assert e.row == 1, (bad, e)
+    print("✅ Same rows as pandas, without loading the workbook")
+
+def test_validation():
+    """Float PRNs are coerced; placeholders and bad emails are rejected with their sheet rows"""
+    print("🧹 Testing roster validation...")
+    path = write_csv(
+        'Student Name,PRN Number,Email Address\n'
+        '  Asha \t Patil ,1102310789.0,asha@example.com\n'
+        'Rohan Desai,1.10231079E+09,rohan@example.com\n'
+        'Meera Joshi,N/A,meera@example.com\n'
+        'Kiran More,PRN011,kiran@\n'
+        'Zoya Khan,ＰＲＮ０１２,zoya@example.com \n'
+        ',-,not an email\n'
+        'Dev Shah,12.5,dev@example.com\n'
+    )
+    chunks = list(roster_import.iter_csv_chunks(path, chunk_rows=4))
+    assert [chunk.index.tolist() for chunk, _ in chunks] == [[2, 3, 4, 5], [6, 7, 8]]
+
+    rows, rejected, counts = roster_import.validate(pd.concat(chunk for chunk, _ in chunks))
+    assert rows.to_dict('index') == {
+        2: {'name': 'Asha Patil', 'prn_number': '1102310789', 'email': 'asha@example.com'},
+        3: {'name': 'Rohan Desai', 'prn_number': '1102310790', 'email': 'rohan@example.com'},
+        6: {'name': 'Zoya Khan', 'prn_number': 'PRN012', 'email': 'zoya@example.com'},
+        8: {'name': 'Dev Shah', 'prn_number': '12.5', 'email': 'dev@example.com'},
+    }, rows
+    assert rejected['reason'].to_dict() == {
+        4: 'invalid PRN',
+        5: 'invalid email',
+        7: 'missing name, invalid PRN, invalid email',
+    }, rejected
+    assert counts == {'rejected': 3, 'missing_values': 1, 'invalid_prn': 2,
+                      'invalid_email': 2, 'prns_coerced': 2}, counts
+
+    client = registered_client()
+    with open(path, 'rb') as f:
+        _, job = upload(client, f, 'roster.csv')
+    body = job['result']
+    assert body['inserted'] == 4 and [row['row'] for row in body['rejected_rows']] == [4, 5, 7], body
+    assert body['rejected_rows'][0] == {'row': 4, 'name': 'Meera Joshi', 'prn_number': 'N/A',
+                                        'email': 'meera@example.com', 'reason': 'invalid PRN'}
+    assert '3 rows rejected (1 missing a name, PRN or email, 2 with an invalid PRN, 2 with an invalid email)' \
+        in body['message'] and '2 PRNs stored as numbers' in body['message'], body['message']
+
+    # The report is capped; the counts are not
+    big = pd.DataFrame({'Student Name': [f'Student {i}' for i in range(100000)],
+                        'PRN Number': [str(1102310000 + i) for i in range(100000)],
+                        'Email Address': [f's{i}@example.com' if i % 100 else 'x' for i in range(100000)]})
+    started = time.perf_counter()
+    rows, rejected, counts = roster_import.validate(big)
+    elapsed = time.perf_counter() - started
+    assert len(rows) == 99000 and counts['invalid_email'] == 1000
+    assert elapsed < 1.0, f'100k rows validated in {elapsed:.2f}s'
+    registered_client()
+    with get_db() as conn:
+        counts = roster_import.import_students(conn, big.head(20000))
+    assert counts['rejected'] == 200 and len(counts['rejected_rows']) == roster_import.REJECTED_REPORT_ROWS
+    with get_db() as conn:
+        roster_import.record_import(conn, 'hash', 'roster.csv', 'append', counts)
+        assert 'rejected_rows' not in conn.execute('SELECT counts FROM roster_imports').fetchone()[0]
+    print(f"✅ Rows validated and reported (100k rows in {elapsed:.2f}s)")
+
+def main():
+    """Run roster import tests"""
+    print("🧪 Roster Import Tests")
+    print("=" * 50)
+
+    tests = [
+        test_counts_are_exact,
+        test_upload_endpoint,
+        test_chunked_csv,
+        test_schema_errors_stop_early,
+        test_streamed_xlsx,
+        test_validation,
+    ]
+
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__} failed: {e}")
+
+    print("\n" + "=" * 50)
+    if failed:
+        print(f"❌ {failed} test(s) failed")
+        return 1
+    print("🎉 All roster import tests passed!")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
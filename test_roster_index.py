@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Test the in-memory roster index used by QR validation
+"""
+
+import sqlite3
+import sys
+
+from testing import ASHA, RAHUL, roster_client, roster_db
+import database
+from app import check_in_student
+from roster_index import roster_index
+from scan_cache import scan_cache
+
+def test_rejections_skip_database():
+    """Unknown and already-scanned codes are answered from memory"""
+    print("⚡ Testing in-memory rejections...")
+    roster_db([ASHA, RAHUL])
+
+    assert check_in_student('hash-001', 'pytest')[1]
+    scan_cache.clear()  # exercise the index rather than the short-TTL cache
+    checkouts = database.pool.stats()['checkouts']
+    before = roster_index.stats()
+
+    student, first_scan = check_in_student('hash-001', 'pytest')
+    assert student[1] == 'Asha Patil' and not first_scan
+    student, first_scan = check_in_student('not-a-code', 'pytest')
+    assert student is None and not first_scan
+
+    assert database.pool.stats()['checkouts'] == checkouts
+    stats = roster_index.stats()
+    assert stats['invalid'] == before['invalid'] + 1, stats
+    assert stats['already_scanned'] == before['already_scanned'] + 1, stats
+    print("✅ No connection checked out for rejected codes")
+
+def test_other_worker_roster_change():
+    """A student added through another connection becomes scannable"""
+    print("👥 Testing cross-worker roster changes...")
+    path = roster_db([ASHA, RAHUL])
+
+    assert check_in_student('hash-003', 'pytest')[0] is None
+
+    # Simulate a different gunicorn worker writing to the same file
+    other = sqlite3.connect(path)
+    other.execute('''
+        INSERT INTO students (name, prn_number, email, qr_hash)
+        VALUES ('Neha Kulkarni', 'PRN003', 'neha@example.com', 'hash-003')
+    ''')
+    other.commit()
+    other.close()
+
+    student, first_scan = check_in_student('hash-003', 'pytest')
+    assert first_scan and student[1] == 'Neha Kulkarni', student
+    print("✅ Index reloaded after another worker's commit")
+
+def test_other_worker_scan():
+    """A scan recorded by another worker is still rejected here"""
+    print("🔁 Testing cross-worker scans...")
+    path = roster_db([ASHA, RAHUL])
+
+    other = sqlite3.connect(path)
+    other.execute("INSERT INTO scans (student_id, scanner_info) VALUES (2, 'other worker')")
+    other.commit()
+    other.close()
+
+    student, first_scan = check_in_student('hash-002', 'pytest')
+    assert student and not first_scan
+    assert roster_index.lookup('hash-002')[1]
+    print("✅ Bitmap caught up after the database rejected the scan")
+
+def test_clear_resets_bitmap():
+    """Clearing all data empties the index"""
+    print("🗑️  Testing clear_all_data refresh...")
+    client = roster_client([ASHA, RAHUL])
+
+    check_in_student('hash-001', 'pytest')
+    response = client.post('/api/clear_all_data', json={'confirmation': 'CLEAR_ALL_DATA'})
+    assert response.status_code == 200
+
+    assert roster_index.stats()['students'] == 0
+    assert check_in_student('hash-001', 'pytest')[0] is None
+    print("✅ Index emptied with the roster")
+
+def main():
+    """Run roster index tests"""
+    print("🧪 Roster Index Tests")
+    print("=" * 50)
+
+    tests = [
+        test_rejections_skip_database,
+        test_other_worker_roster_change,
+        test_other_worker_scan,
+        test_clear_resets_bitmap,
+    ]
+
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__} failed: {e}")
+
+    print("\n" + "=" * 50)
+    if failed:
+        print(f"❌ {failed} test(s) failed")
+        return 1
+    print("🎉 All roster index tests passed!")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
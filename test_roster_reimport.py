@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Test diff-based roster re-imports (/api/roster/reimport)
+"""
+
+import io
+import os
+import sys
+
+from testing import TEST_DIR, roster_client
+from database import get_db
+from jobs import job_runner
+
+UPDATED = '''Student Name,PRN Number,Email Address
+Asha Patil,PRN001,asha.new@example.com
+Rohan Desai,PRN002,rohan@example.com
+Zoya Khan,PRN005,zoya@example.com
+'''
+
+def emailed_roster():
+    """Roster of four emailed students with QR codes, PRN003 checked in; (admin client, PRN004's QR image)"""
+    client = roster_client([
+        ('Asha Patil', 'PRN001', 'asha@example.com', 'hash-1'),
+        ('Rohan Desai', 'PRN002', 'rohan@example.com', 'hash-2'),
+        ('Meera Joshi', 'PRN003', 'meera@example.com', 'hash-3'),
+        ('Kiran More', 'PRN004', 'kiran@example.com', 'hash-4'),
+    ])
+    qr_path = os.path.join(TEST_DIR, 'qr_PRN004.png')
+    open(qr_path, 'wb').close()
+    with get_db() as conn:
+        conn.execute('UPDATE students SET email_sent = TRUE')
+        conn.execute("UPDATE students SET qr_code_path = ? WHERE prn_number = 'PRN004'", (qr_path,))
+        conn.execute("INSERT INTO scans (student_id, scanned_at) SELECT id, 1 FROM students WHERE prn_number = 'PRN003'")
+        conn.commit()
+    return client, qr_path
+
+def finished(client, response):
+    """The job a 202 response started, once it is done"""
+    assert response.status_code == 202, response.get_json()
+    assert job_runner.wait(timeout=30)
+    return client.get(response.get_json()['status_url']).get_json()
+
+def preview(client, text, force=False):
+    data = {'file': (io.BytesIO(text.encode()), 'roster.csv')}
+    if force:
+        data['force'] = '1'
+    return finished(client, client.post('/api/roster/reimport', data=data))
+
+def apply(client, result, **extra):
+    body = {'upload_id': result['upload_id'],
+            'expected': {key: result[key] for key in ('new', 'changed', 'missing')}}
+    body.update(extra)
+    return finished(client, client.post('/api/roster/reimport/apply', json=body))
+
+def roster():
+    with get_db() as conn:
+        return {prn: (name, email, qr_hash, bool(sent)) for prn, name, email, qr_hash, sent in conn.execute(
+            'SELECT prn_number, name, email, qr_hash, email_sent FROM students')}
+
+def test_preview_then_apply():
+    """The preview writes nothing; the apply keeps QR hashes and checked-in students"""
+    print("🔁 Testing re-import preview and apply...")
+    client, qr_path = emailed_roster()
+    before = roster()
+
+    result = preview(client, UPDATED)['result']
+    assert result['preview'] and (result['new'], result['changed'], result['missing']) == (1, 1, 2), result
+    assert result['kept_checked_in'] == 1 and result['unchanged'] == 1
+    assert result['changes']['changed'] == [{
+        'prn_number': 'PRN001', 'name': 'Asha Patil', 'email': 'asha.new@example.com',
+        'current_name': 'Asha Patil', 'current_email': 'asha@example.com',
+    }], result['changes']
+    assert {row['prn_number'] for row in result['changes']['missing']} == {'PRN003', 'PRN004'}
+    assert roster() == before
+
+    applied = apply(client, result)
+    assert applied['status'] == 'succeeded', applied
+    counts = applied['result']
+    assert (counts['inserted'], counts['updated'], counts['removed']) == (1, 1, 1), counts
+
+    after = roster()
+    # Email changed: same QR, but the new address has not been emailed yet
+    assert after['PRN001'] == ('Asha Patil', 'asha.new@example.com', 'hash-1', False)
+    assert after['PRN002'] == before['PRN002']
+    assert after['PRN003'] == before['PRN003'], 'a checked-in student must be kept'
+    assert 'PRN004' not in after and not os.path.exists(qr_path)
+    assert after['PRN005'][:2] == ('Zoya Khan', 'zoya@example.com')
+    with get_db() as conn:
+        assert conn.execute('SELECT COUNT(*) FROM scans').fetchone()[0] == 1
+        assert conn.execute('SELECT total_students FROM attendance_stats').fetchone()[0] == 4
+    print("✅ Diff applied, hashes and scans untouched")
+
+def test_same_file_skipped():
+    """Uploading the last applied file again is a no-op unless forced"""
+    print("⏭️  Testing repeat uploads...")
+    client, _ = emailed_roster()
+    assert apply(client, preview(client, UPDATED)['result'])['status'] == 'succeeded'
+
+    again = preview(client, UPDATED)['result']
+    assert again['skipped'] and 'identical' in again['message'], again
+
+    forced = preview(client, UPDATED, force=True)['result']
+    assert (forced['new'], forced['changed'], forced['missing'], forced['kept_checked_in']) == (0, 0, 1, 1), forced
+    print("✅ Identical file skipped")
+
+def test_stale_preview_refused():
+    """An apply whose preview no longer matches the table writes nothing"""
+    print("🧊 Testing stale previews...")
+    client, _ = emailed_roster()
+    result = preview(client, UPDATED)['result']
+    with get_db() as conn:
+        conn.execute("INSERT INTO students (name, prn_number, email) VALUES ('Late', 'PRN009', 'late@example.com')")
+        conn.commit()
+    before = roster()
+
+    stale = apply(client, result)
+    assert stale['status'] == 'failed' and 'changed since the preview' in stale['error'], stale
+    assert roster() == before
+
+    kept = apply(client, preview(client, UPDATED)['result'], remove_missing=False)['result']
+    assert kept['removed'] == 0 and 'PRN009' in roster() and 'PRN004' in roster()
+
+    for upload_id in ['../student_event.db', 'student_event.db', 'students_20250101_000000.csv']:
+        assert client.post('/api/roster/reimport/apply', json={'upload_id': upload_id}).status_code == 404
+    print("✅ Stale preview refused")
+
+def test_uploads_kept_apart():
+    """Uploads in the same second get their own files, and malformed apply options are refused"""
+    print("🗂️  Testing upload names and apply options...")
+    client, _ = emailed_roster()
+    first = preview(client, UPDATED)['result']
+    second = preview(client, UPDATED.replace('zoya@', 'zoya.k@'))['result']
+    assert first['upload_id'] != second['upload_id'], first['upload_id']
+
+    before = roster()
+    for value in ['false', 0, None]:
+        body = {'upload_id': first['upload_id'], 'remove_missing': value}
+        response = client.post('/api/roster/reimport/apply', json=body)
+        assert response.status_code == 400 and 'remove_missing' in response.get_json()['error'], response.get_json()
+    for value in [[1, 0, 0], {'new': 1, 'changed': 0}, {'new': '1', 'changed': 0, 'missing': 0},
+                  {'new': True, 'changed': 0, 'missing': 0}]:
+        body = {'upload_id': first['upload_id'], 'expected': value}
+        response = client.post('/api/roster/reimport/apply', json=body)
+        assert response.status_code == 400 and 'expected' in response.get_json()['error'], response.get_json()
+    assert roster() == before
+
+    assert apply(client, first, remove_missing=False)['result']['removed'] == 0
+    assert roster()['PRN005'][1] == 'zoya@example.com'
+    print("✅ Each upload applied from its own file")
+
+def test_appended_file_reimported():
+    """A file first uploaded as an append is still diffed when re-imported"""
+    print("📎 Testing re-import after an append upload...")
+    client, _ = emailed_roster()
+    response = client.post('/api/upload_students', data={'file': (io.BytesIO(UPDATED.encode()), 'roster.csv')})
+    appended = finished(client, response)
+    assert appended['status'] == 'succeeded' and appended['result']['inserted'] == 1, appended
+    # The append skipped PRN001, so its new email is not in the table yet
+    assert roster()['PRN001'][1] == 'asha@example.com'
+
+    result = preview(client, UPDATED)['result']
+    assert not result.get('skipped') and result['changed'] == 1, result
+    assert apply(client, result)['status'] == 'succeeded'
+    assert roster()['PRN001'][1] == 'asha.new@example.com'
+    print("✅ Appended file diffed and applied")
+
+def main():
+    """Run roster re-import tests"""
+    print("🧪 Roster Re-import Tests")
+    print("=" * 50)
+
+    tests = [
+        test_preview_then_apply,
+        test_same_file_skipped,
+        test_stale_preview_refused,
+        test_uploads_kept_apart,
+        test_appended_file_reimported,
+    ]
+
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__} failed: {e}")
+
+    print("\n" + "=" * 50)
+    if failed:
+        print(f"❌ {failed} test(s) failed")
+        return 1
+    print("🎉 All roster re-import tests passed!")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
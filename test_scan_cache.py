@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Test the short-TTL scan result cache
+"""
+
+import sys
+import time
+
+from testing import ASHA, admin_client, roster_db
+import database
+from app import app
+from roster_index import roster_index
+from scan_cache import ScanResultCache, scan_cache
+
+STUDENT = (1, 'Asha Patil', 'PRN001', 'asha@example.com')
+
+def test_repeats_served_from_cache():
+    """Repeated detections of an admitted badge skip the roster index and database"""
+    print("♻️  Testing repeated detections...")
+    roster_db([ASHA])
+    client = app.test_client()
+
+    assert client.post('/api/validate_qr', json={'qr_hash': 'hash-001'}).status_code == 200
+    before_cache = scan_cache.stats()
+    before_index = roster_index.stats()
+    checkouts = database.pool.stats()['checkouts']
+
+    for _ in range(5):
+        response = client.post('/api/validate_qr', json={'qr_hash': 'hash-001'})
+        assert response.get_json()['message'] == 'QR code already scanned'
+
+    assert scan_cache.stats()['hits'] - before_cache['hits'] == 5
+    assert roster_index.stats()['hits'] == before_index['hits']
+    assert database.pool.stats()['checkouts'] == checkouts
+    print("✅ Five repeats answered from the cache")
+
+def test_expiry_and_eviction():
+    """Entries expire after the TTL and the least recently used one is evicted"""
+    print("⏳ Testing TTL and LRU bounds...")
+    roster_db([ASHA])
+
+    cache = ScanResultCache(ttl_ms=50, max_entries=2)
+    cache.put('a', STUDENT)
+    cache.put('b', STUDENT)
+    assert cache.get('a') == STUDENT  # 'b' is now least recently used
+    cache.put('c', STUDENT)
+    assert cache.get('b') is None and cache.get('c') == STUDENT
+
+    time.sleep(0.06)
+    assert cache.get('a') is None
+    stats = cache.stats()
+    assert stats['evictions'] == 1 and stats['expired'] == 1, stats
+    print("✅ Size and age bounds hold")
+
+def test_cleared_on_roster_reload():
+    """Clearing all data drops cached outcomes in the same worker"""
+    print("🧹 Testing invalidation on reload...")
+    roster_db([ASHA])
+    client = app.test_client()
+
+    client.post('/api/validate_qr', json={'qr_hash': 'hash-001'})
+    assert scan_cache.stats()['entries'] == 1
+
+    assert admin_client().post('/api/clear_all_data', json={'confirmation': 'CLEAR_ALL_DATA'}).status_code == 200
+
+    response = client.post('/api/validate_qr', json={'qr_hash': 'hash-001'})
+    assert response.get_json()['message'] == 'Invalid QR code'
+    print("✅ Cache emptied with the roster")
+
+def main():
+    """Run scan cache tests"""
+    print("🧪 Scan Cache Tests")
+    print("=" * 50)
+
+    tests = [
+        test_repeats_served_from_cache,
+        test_expiry_and_eviction,
+        test_cleared_on_roster_reload,
+    ]
+
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__} failed: {e}")
+
+    print("\n" + "=" * 50)
+    if failed:
+        print(f"❌ {failed} test(s) failed")
+        return 1
+    print("🎉 All scan cache tests passed!")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Test the write-behind scan journal (SCAN_WRITE_MODE=journal)
+Runs against a temporary database and journal file
+"""
+
+import io
+import multiprocessing
+import os
+import sys
+
+from testing import ASHA, admin_client, roster_db
+import app as app_module
+import database
+from database import get_db
+from app import app
+from jobs import job_runner
+from roster_index import roster_index
+from scan_journal import ScanJournal
+
+STUDENT = (1, 'Asha Patil', 'PRN001', 'asha@example.com')
+
+def fresh_journal():
+    """Roster of one student; returns an unused journal path beside its database"""
+    return os.path.join(os.path.dirname(roster_db([ASHA])), 'scan_journal.log')
+
+def scan_count():
+    with get_db() as conn:
+        return conn.execute('SELECT COUNT(*) FROM scans').fetchone()[0]
+
+def test_group_commit():
+    """Check-ins are journaled first and reach the scans table on flush"""
+    print("📒 Testing journal append and flush...")
+    journal = ScanJournal(fresh_journal(), fsync=False)
+
+    assert journal.record(STUDENT, 'hash-001', 'gate-1', '2025-09-18 10:00:00 IST')
+    assert not journal.record(STUDENT, 'hash-001', 'gate-2', '2025-09-18 10:00:01 IST')
+    assert scan_count() == 0
+    assert journal.stats()['queue_depth'] == 1
+
+    assert journal.drain() == 1
+    assert scan_count() == 1
+    stats = journal.stats()
+    assert stats['queue_depth'] == 0 and stats['batches'] == 1 and stats['flushed'] == 1, stats
+    journal.stop()
+    print(f"✅ Flushed in {stats['last_flush_ms']} ms")
+
+def test_replay_after_crash():
+    """Entries left in the journal are replayed on the next start"""
+    print("💥 Testing replay on restart...")
+    path = fresh_journal()
+
+    crashed = ScanJournal(path, fsync=False)
+    assert crashed.record(STUDENT, 'hash-001', 'gate-1', '2025-09-18 10:00:00 IST')
+    crashed._file.close()  # process dies before the writer flushes
+
+    restarted = ScanJournal(path, fsync=False)
+    restarted.start()
+    assert restarted.stats()['replayed'] == 1
+    assert scan_count() == 1
+    restarted.stop()
+    print("✅ Journaled scan recovered")
+
+def _gate_process(db_path, journal_path, barrier, results):
+    """One gunicorn-like worker scanning the same badge"""
+    database.configure(db_path)
+    roster_index.load()
+    journal = ScanJournal(journal_path, fsync=False)
+    barrier.wait()
+    results.put(journal.record(STUDENT, 'hash-001', f'worker-{os.getpid()}', '2025-09-18 10:00:00 IST'))
+
+def test_cross_process_first_scan_wins():
+    """Workers sharing the journal admit a badge exactly once"""
+    print("🚦 Testing first-scan-wins across processes...")
+    journal_path = fresh_journal()
+    db_path = database.pool.path
+
+    context = multiprocessing.get_context('fork')
+    barrier = context.Barrier(4)
+    results = context.Queue()
+    workers = [context.Process(target=_gate_process, args=(db_path, journal_path, barrier, results))
+               for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    outcomes = [results.get() for _ in workers]
+    assert outcomes.count(True) == 1, outcomes
+
+    journal = ScanJournal(journal_path, fsync=False)
+    journal.drain()
+    journal.stop()
+    assert scan_count() == 1
+    print("✅ One worker admitted the student")
+
+def test_validate_route_in_journal_mode():
+    """/api/validate_qr acknowledges from the journal"""
+    print("🌐 Testing validate_qr in journal mode...")
+    journal = ScanJournal(fresh_journal(), fsync=False)
+    app_module.scan_journal = journal
+    try:
+        client = app.test_client()
+        response = client.post('/api/validate_qr', json={'qr_hash': 'hash-001'})
+        assert response.status_code == 200 and response.get_json()['valid']
+        response = client.post('/api/validate_qr', json={'qr_hash': 'hash-001'})
+        assert response.get_json()['message'] == 'QR code already scanned'
+        assert journal.stats()['appended'] == 1
+    finally:
+        app_module.scan_journal = None
+        journal.stop()
+    assert scan_count() == 1
+    print("✅ Route served from the journal and drained on stop")
+
+def test_streams_woken():
+    """Journaled admissions and their flush both wake the check-in stream"""
+    print("📡 Testing stream notifications...")
+    notified = []
+    broadcaster = app_module.scan_events
+    broadcaster.notify = lambda: notified.append(True)
+    journal = ScanJournal(fresh_journal(), fsync=False, on_flush=lambda: app_module.scan_events.notify())
+    app_module.scan_journal = journal
+    try:
+        client = app.test_client()
+        response = client.post('/api/validate_qr_batch', json={'scans': ['hash-001', 'hash-001', 'nope']})
+        assert response.get_json()['summary']['admitted'] == 1
+        assert len(notified) == 1
+        client.post('/api/validate_qr', json={'qr_hash': 'hash-001'})
+        assert len(notified) == 1    # a repeat is not news
+        assert journal.drain() == 1 and len(notified) == 2
+    finally:
+        app_module.scan_journal = None
+        del broadcaster.notify
+        journal.stop()
+    print("✅ Streams woken on admission and on flush")
+
+def test_clear_discards_journal():
+    """Clearing all data drops journaled check-ins instead of flushing them onto reused ids"""
+    print("🧹 Testing clear_all_data in journal mode...")
+    journal = ScanJournal(fresh_journal(), fsync=False)
+    app_module.scan_journal = journal
+    try:
+        assert journal.record(STUDENT, 'hash-001', 'gate-1', '2025-09-18 10:00:00 IST')
+        response = admin_client().post('/api/clear_all_data', json={'confirmation': 'CLEAR_ALL_DATA'})
+        assert response.status_code == 200, response.get_json()
+        assert journal.stats()['discarded'] == 1 and journal.stats()['queue_depth'] == 0
+        with get_db() as conn:
+            conn.execute("INSERT INTO students (name, prn_number, email) VALUES ('Rohan Desai', 'PRN002', 'rohan@example.com')")
+            conn.commit()
+        assert journal.drain() == 0
+    finally:
+        app_module.scan_journal = None
+        journal.stop()
+    assert scan_count() == 0
+    print("✅ Pending check-ins discarded with the roster")
+
+def test_reimport_keeps_journaled_student():
+    """A re-import sees check-ins still in the journal and keeps those students"""
+    print("🔁 Testing re-import in journal mode...")
+    journal = ScanJournal(fresh_journal(), fsync=False)
+    app_module.scan_journal = journal
+    client = admin_client()
+    try:
+        assert journal.record(STUDENT, 'hash-001', 'gate-1', '2025-09-18 10:00:00 IST')
+        roster = 'Student Name,PRN Number,Email Address\nRohan Desai,PRN002,rohan@example.com\n'
+        response = client.post('/api/roster/reimport', data={'file': (io.BytesIO(roster.encode()), 'roster.csv')})
+        assert job_runner.wait(timeout=30)
+        result = client.get(response.get_json()['status_url']).get_json()['result']
+        assert result['kept_checked_in'] == 1, result
+
+        response = client.post('/api/roster/reimport/apply', json={
+            'upload_id': result['upload_id'],
+            'expected': {key: result[key] for key in ('new', 'changed', 'missing')}})
+        assert job_runner.wait(timeout=30)
+        result = client.get(response.get_json()['status_url']).get_json()['result']
+        assert result['removed'] == 0 and result['kept_checked_in'] == 1, result
+    finally:
+        app_module.scan_journal = None
+        journal.stop()
+    with get_db() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM students WHERE prn_number = 'PRN001'").fetchone()[0] == 1
+    assert scan_count() == 1
+    print("✅ Journaled student kept on re-import")
+
+def main():
+    """Run scan journal tests"""
+    print("🧪 Scan Journal Tests")
+    print("=" * 50)
+
+    tests = [
+        test_group_commit,
+        test_replay_after_crash,
+        test_cross_process_first_scan_wins,
+        test_validate_route_in_journal_mode,
+        test_streams_woken,
+        test_clear_discards_journal,
+        test_reimport_keeps_journaled_student,
+    ]
+
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__} failed: {e}")
+
+    print("\n" + "=" * 50)
+    if failed:
+        print(f"❌ {failed} test(s) failed")
+        return 1
+    print("🎉 All scan journal tests passed!")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
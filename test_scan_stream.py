@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Test the Server-Sent Events check-in stream
+"""
+
+import json
+import sys
+
+from testing import numbered_students, roster_client
+import app as app_module
+from database import get_db
+from app import dashboard_counters
+from scan_events import ScanBroadcaster
+
+def stream_client(**options):
+    """Roster of four, a fast broadcaster and a logged-in admin client"""
+    client = roster_client(numbered_students(4))
+    app_module.scan_events.stop()
+    app_module.scan_events = ScanBroadcaster(dashboard_counters, poll_interval_ms=20, heartbeat_s=1, **options)
+    return client
+
+def open_stream(client, last_event_id=None):
+    headers = {'Last-Event-ID': last_event_id} if last_event_id else {}
+    response = client.get('/api/scans/stream', headers=headers, buffered=False)
+    assert response.status_code == 200, response.status_code
+    assert response.mimetype == 'text/event-stream'
+    return response, iter(response.response)
+
+def read_until(frames, event, limit=20):
+    """Parse frames up to and including the next `event`; returns them as dicts"""
+    seen = []
+    for _ in range(limit):
+        chunk = next(frames)
+        chunk = chunk.decode() if isinstance(chunk, bytes) else chunk
+        if chunk.startswith((':', 'retry:')):
+            continue
+        fields = dict(line.split(': ', 1) for line in chunk.strip().splitlines())
+        fields['data'] = json.loads(fields['data'])
+        seen.append(fields)
+        if fields['event'] == event:
+            return seen
+    raise AssertionError(f'No {event} event in {seen}')
+
+def test_live_checkins():
+    """A committed check-in reaches an open stream with fresh counters"""
+    print("📡 Testing live push...")
+    client = stream_client()
+    response, frames = open_stream(client)
+    assert read_until(frames, 'stats')[-1]['data']['scanned_count'] == 0
+
+    client.post('/api/validate_qr', json={'qr_hash': 'hash-001'})
+    events = read_until(frames, 'stats')
+    assert [e['event'] for e in events] == ['checkin', 'stats'], events
+    assert events[0]['data']['prn'] == 'PRN001' and events[0]['id'].endswith('-1')
+    assert events[1]['data']['scanned_count'] == 1
+    response.close()
+    assert app_module.scan_events.stats()['subscribers'] == 0
+    print("✅ Check-in pushed with counters")
+
+def test_resume_with_last_event_id():
+    """A reconnect gets exactly the check-ins it missed, from memory or the database"""
+    print("🔌 Testing Last-Event-ID resume...")
+    client = stream_client()
+    response, frames = open_stream(client)
+    read_until(frames, 'stats')
+    client.post('/api/validate_qr', json={'qr_hash': 'hash-000'})
+    last_id = read_until(frames, 'stats')[0]['id']
+    response.close()
+
+    client.post('/api/validate_qr_batch', json={'scans': ['hash-001', 'hash-002']})
+    app_module.scan_events.poll()
+
+    response, frames = open_stream(client, last_id)
+    missed = [e['data']['prn'] for e in read_until(frames, 'stats') if e['event'] == 'checkin']
+    assert missed == ['PRN001', 'PRN002'], missed
+    response.close()
+
+    # A worker that never saw those scans replays them from the database
+    app_module.scan_events = ScanBroadcaster(dashboard_counters, poll_interval_ms=20, heartbeat_s=1)
+    response, frames = open_stream(client, last_id)
+    missed = [e['data']['prn'] for e in read_until(frames, 'stats') if e['event'] == 'checkin']
+    assert missed == ['PRN001', 'PRN002'], missed
+    response.close()
+    print("✅ Missed check-ins replayed")
+
+def test_reset_on_roster_change():
+    """Roster edits, corrected scan times and stale resume ids produce a reset event"""
+    print("🔄 Testing reset events...")
+    client = stream_client()
+    response, frames = open_stream(client)
+    read_until(frames, 'stats')
+
+    with get_db() as conn:
+        conn.execute("UPDATE students SET name = 'Renamed' WHERE prn_number = 'PRN000'")
+        conn.commit()
+    assert read_until(frames, 'stats')[0]['event'] == 'reset'
+
+    # An offline sync moving a check-in earlier rewrites a row the stream already sent
+    client.post('/api/validate_qr', json={'qr_hash': 'hash-001'})
+    read_until(frames, 'stats')
+    with get_db() as conn:
+        conn.execute('UPDATE scans SET scanned_at = scanned_at - 60000')
+        conn.commit()
+    reset = read_until(frames, 'stats')[0]
+    assert reset['event'] == 'reset' and reset['data']['scan_version'] == 1, reset
+    response.close()
+
+    response, frames = open_stream(client, '0-5')
+    assert read_until(frames, 'stats')[0]['event'] == 'reset'
+    response.close()
+    print("✅ Clients told to reload")
+
+def test_subscriber_limit():
+    """Past the per-worker limit the stream answers 503"""
+    print("🚧 Testing subscriber limit...")
+    client = stream_client(max_subscribers=1)
+    response, frames = open_stream(client)
+    next(frames)
+    assert client.get('/api/scans/stream', buffered=False).status_code == 503
+    response.close()
+    assert app_module.scan_events.stats()['rejected'] == 1
+    print("✅ Extra subscriber rejected")
+
+def test_admin_only():
+    """The stream and the scanner page that listens to it need the admin login"""
+    print("🔒 Testing authentication...")
+    stream_client()
+    anonymous = app_module.app.test_client()
+    assert anonymous.get('/api/scans/stream').status_code == 401
+    assert anonymous.get('/scanner').status_code == 302
+    print("✅ Anonymous stream and scanner refused")
+
+def main():
+    """Run scan stream tests"""
+    print("🧪 Scan Stream Tests")
+    print("=" * 50)
+
+    tests = [
+        test_live_checkins,
+        test_resume_with_last_event_id,
+        test_reset_on_roster_change,
+        test_subscriber_limit,
+        test_admin_only,
+    ]
+
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__} failed: {e}")
+
+    print("\n" + "=" * 50)
+    if failed:
+        print(f"❌ {failed} test(s) failed")
+        return 1
+    print("🎉 All scan stream tests passed!")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
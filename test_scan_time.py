@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Test epoch-millisecond scan times and the /api/arrivals buckets
+Runs against temporary databases through Flask's test client
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+
+from testing import fresh_db, numbered_students, roster_client
+from database import get_db
+from app import app
+import scan_time
+
+TEN_AM_IST = 1758169800000    # 2025-09-18 10:00:00 IST
+MINUTE = 60 * 1000
+
+def scanned_at_offsets(offsets_ms=()):
+    """One checked-in student per offset from 10:00 IST, and an admin client"""
+    client = roster_client(numbered_students(len(offsets_ms)))
+    with get_db() as conn:
+        conn.executemany('INSERT INTO scans (student_id, scanned_at) VALUES (?, ?)',
+                         [(i + 1, TEN_AM_IST + offset) for i, offset in enumerate(offsets_ms)])
+        conn.commit()
+    return client
+
+def test_legacy_text_times_converted():
+    """Old IST strings and UTC defaults become the same instant in epoch ms"""
+    print("🕰️  Testing conversion of text scan times...")
+    path = os.path.join(tempfile.mkdtemp(prefix='depali_scan_time_'), 'student_event.db')
+
+    conn = sqlite3.connect(path)
+    conn.executescript('''
+        CREATE TABLE students (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            prn_number TEXT UNIQUE NOT NULL,
+            email TEXT NOT NULL,
+            qr_code_path TEXT,
+            qr_hash TEXT UNIQUE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            email_sent BOOLEAN DEFAULT FALSE
+        );
+        CREATE TABLE scans (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            student_id INTEGER,
+            scanned_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            scanner_info TEXT
+        );
+        INSERT INTO students (name, prn_number, email) VALUES
+            ('Asha Patil', 'PRN001', 'a@example.com'),
+            ('Rohan Desai', 'PRN002', 'r@example.com'),
+            ('Meera Joshi', 'PRN003', 'm@example.com'),
+            ('Kiran More', 'PRN004', 'k@example.com');
+        INSERT INTO scans (student_id, scanned_at) VALUES
+            (1, '2025-09-18 10:00:00 IST'),
+            (2, '2025-09-18 04:30:00'),
+            (3, 'not a time'),
+            (4, '2025-09-18 10:05:00 IST');
+        DELETE FROM scans WHERE student_id = 4;
+    ''')
+    conn.close()
+
+    fresh_db(path)
+
+    with get_db() as conn:
+        rows = dict(conn.execute('SELECT student_id, scanned_at FROM scans').fetchall())
+        assert rows[1] == rows[2] == TEN_AM_IST, rows
+        # Unreadable times fall back to the migration time rather than being lost
+        assert abs(rows[3] - scan_time.now_ms()) < 60 * 1000, rows
+        assert conn.execute("SELECT typeof(scanned_at) FROM scans GROUP BY 1").fetchall() == [('integer',)]
+        # The deleted scan's id is not reused
+        cursor = conn.execute('INSERT INTO scans (student_id) VALUES (4)')
+        assert cursor.lastrowid == 5
+        conn.rollback()
+        indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE tbl_name = 'scans'")}
+    for name in ['idx_scans_student_unique', 'idx_scans_scanned_at']:
+        assert name in indexes, indexes
+    assert scan_time.format_ist(rows[1]) == '2025-09-18 10:00:00 IST'
+    print("✅ Times converted, indexes and sequence kept")
+
+def test_arrival_buckets():
+    """Counts per IST minute with empty minutes filled and a running total"""
+    print("📈 Testing arrival buckets...")
+    client = scanned_at_offsets([0, 30 * 1000, MINUTE - 1, 3 * MINUTE, 3 * MINUTE + 10 * 1000])
+
+    data = client.get('/api/arrivals').get_json()
+    assert [b['label'] for b in data['buckets']] == ['10:00', '10:01', '10:02', '10:03'], data
+    assert [b['count'] for b in data['buckets']] == [3, 0, 0, 2]
+    assert [b['cumulative'] for b in data['buckets']] == [3, 3, 3, 5]
+    assert data['total'] == 5 and data['peak']['label'] == '10:00' and not data['truncated']
+
+    hourly = client.get('/api/arrivals?bucket=hour').get_json()
+    assert [(b['label'], b['count']) for b in hourly['buckets']] == [('10:00', 5)], hourly
+
+    # An explicit window counts earlier scans into the running total
+    since = TEN_AM_IST + 2 * MINUTE
+    window = client.get(f'/api/arrivals?since={since}&until={since + 2 * MINUTE}').get_json()
+    assert [(b['count'], b['cumulative']) for b in window['buckets']] == [(0, 3), (2, 5)], window
+    print("✅ Buckets aligned, filled and totalled")
+
+def test_arrival_limits_and_errors():
+    """Wide windows keep the latest buckets; bad buckets and anonymous calls are refused"""
+    print("🚫 Testing limits and errors...")
+    client = scanned_at_offsets([0, 3 * 24 * 60 * MINUTE])
+
+    data = client.get('/api/arrivals?bucket=minute').get_json()
+    assert data['truncated'] and len(data['buckets']) == 1440
+    assert data['buckets'][-1]['count'] == 1 and data['buckets'][-1]['cumulative'] == 2
+
+    assert client.get('/api/arrivals?bucket=day').status_code == 400
+    assert app.test_client().get('/api/arrivals').status_code == 401
+
+    empty = scanned_at_offsets().get('/api/arrivals').get_json()
+    assert empty['buckets'] == [] and empty['total'] == 0 and empty['peak'] is None
+    print("✅ Window capped, errors rejected")
+
+def main():
+    """Run scan time tests"""
+    print("🧪 Scan Time Tests")
+    print("=" * 50)
+
+    tests = [
+        test_legacy_text_times_converted,
+        test_arrival_buckets,
+        test_arrival_limits_and_errors,
+    ]
+
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__} failed: {e}")
+
+    print("\n" + "=" * 50)
+    if failed:
+        print(f"❌ {failed} test(s) failed")
+        return 1
+    print("🎉 All scan time tests passed!")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Test versioned schema migrations and hot-path query plans
+A full table scan or temp sort on a hot query fails this suite
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+
+from testing import fresh_db
+import app as app_module
+import attendance_stats
+import database
+import roster_pages
+import scan_journal
+import scan_time
+import student_search
+from database import get_db
+from app import init_db
+from migrations import MIGRATIONS, add_column, column_exists, run_migrations
+
+# Queries run on every scan, poll or send, taken from the modules that run them
+NOW = scan_time.now_ms()
+HOT_QUERIES = {
+    'check-in insert': (app_module.CHECK_IN_SQL, ('gate-1', NOW, 'x')),
+    'validate lookup by qr_hash': (app_module.STUDENT_BY_HASH_SQL, ('x',)),
+    'scan lookup by student': (scan_journal.SCANNED_SQL, (1,)),
+    'journal flush insert': (scan_journal.INSERT_SCAN_SQL, (1, 'gate-1', NOW)),
+    'attendance counters': (attendance_stats.READ_SQL, ()),
+    'recent scans': (app_module.RECENT_SCANS_SQL, ()),
+    'dashboard latest': (app_module.LATEST_SCANS_SQL, (100,)),
+    'dashboard delta': (app_module.SCANS_AFTER_SQL, (0, 101)),
+    'dashboard roster': (app_module.ROSTER_STATUS_SQL, ()),
+    'student search match': (student_search.FTS_MATCH_SQL, ('"pati"',)),
+    'student search name prefix': (student_search.NAME_PREFIX_SQL, ('as%',)),
+    'student search ranked': (student_search.FTS_SEARCH_SQL, ('"pati"', 'pati', 'pati%', 'pati%', 'pati%', '%pati', 10)),
+    'student search short prefix': (student_search.PREFIX_SEARCH_SQL, ('as%', 10)),
+    'arrivals window': (app_module.ARRIVALS_RANGE_SQL, ()),
+    'arrival buckets': (app_module.ARRIVAL_BUCKETS_SQL,
+                        (scan_time.IST_OFFSET_MS, 60000, 60000, scan_time.IST_OFFSET_MS, NOW - 3600000, NOW)),
+    'arrivals before window': (app_module.ARRIVALS_BEFORE_SQL, (NOW - 3600000,)),
+    'email queue': (app_module.EMAIL_QUEUE_SQL, ()),
+    'qr generation queue': (app_module.QR_QUEUE_SQL, ()),
+}
+
+# A cursor value for each roster page key column; scanned_at is epoch ms
+CURSOR_VALUES = {'s.name': 'M', 's.id': 0, 's.prn_number': 'PRN050', 'sc.scanned_at': NOW, 'sc.id': 0}
+
+def roster_page_queries():
+    """Every roster page segment, both ways, from the top and from a cursor"""
+    queries = {}
+    for sort, listing in roster_pages.LISTINGS.items():
+        for segments in listing.values():
+            for segment in segments:
+                after = [CURSOR_VALUES[column] for column in segment[2]]
+                for order in ('asc', 'desc'):
+                    for start in (None, after):
+                        name = f"roster page by {sort}, {segment[0]}, {order}{' after cursor' if start else ''}"
+                        queries[name] = roster_pages.segment_query(segment, order, after=start, limit=51)
+    return queries
+
+# Plan lines that are fine for one query: walks in rowid order that stop at
+# a LIMIT, and sorts of rows an index has already narrowed down
+ALLOWED_STEPS = {
+    'recent scans': {'SCAN sc'},
+    # Puts the last `limit` scans, read newest first, back in id order
+    'dashboard latest': {'SCAN sc', 'SCAN (subquery-1)', 'USE TEMP B-TREE FOR ORDER BY'},
+    # FTS5 lookups show up as a SCAN of the virtual table's index
+    'student search match': {'SCAN students_fts VIRTUAL TABLE INDEX 0:M3'},
+    # Ranking sorts only the FTS matches
+    'student search ranked': {'SCAN students_fts VIRTUAL TABLE INDEX 0:M3', 'USE TEMP B-TREE FOR ORDER BY'},
+    # Groups the scanned_at range already read from its index
+    'arrival buckets': {'USE TEMP B-TREE FOR GROUP BY'},
+    # The single row an INSERT ... SELECT without FROM produces
+    'journal flush insert': {'SCAN CONSTANT ROW'},
+}
+
+def plan_problems(conn, name, sql, params):
+    """Return plan lines that mean a full table scan or a temp sort"""
+    problems = []
+    for row in conn.execute(f'EXPLAIN QUERY PLAN {sql}', params):
+        detail = row[3]
+        if detail in ALLOWED_STEPS.get(name, set()):
+            continue
+        if (detail.startswith('SCAN ') and 'USING' not in detail) or 'TEMP B-TREE' in detail:
+            problems.append(detail)
+    return problems
+
+def test_migrations_recorded_once():
+    """Every step is recorded in schema_version and never re-applied"""
+    print("📦 Testing migration bookkeeping...")
+    fresh_db()
+
+    with get_db() as conn:
+        versions = [row[0] for row in conn.execute('SELECT version FROM schema_version ORDER BY version')]
+        assert versions == [version for version, _, _ in MIGRATIONS], versions
+        assert run_migrations(conn) == []
+    print(f"✅ Schema at version {versions[-1]}, re-run is a no-op")
+
+def test_legacy_database_upgrade():
+    """A database created before versioning keeps its data and gains the indexes"""
+    print("🏚️  Testing upgrade of an unversioned database...")
+    path = os.path.join(tempfile.mkdtemp(prefix='depali_migrations_'), 'student_event.db')
+
+    conn = sqlite3.connect(path)
+    conn.executescript('''
+        CREATE TABLE students (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            prn_number TEXT UNIQUE NOT NULL,
+            email TEXT NOT NULL,
+            qr_code_path TEXT,
+            qr_hash TEXT UNIQUE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            email_sent BOOLEAN DEFAULT FALSE
+        );
+        CREATE TABLE scans (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            student_id INTEGER,
+            scanned_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            scanner_info TEXT
+        );
+        INSERT INTO students (name, prn_number, email) VALUES ('Asha Patil', 'PRN001', 'asha@example.com');
+    ''')
+    conn.close()
+
+    database.configure(path)
+    assert init_db()
+
+    with get_db() as conn:
+        assert conn.execute('SELECT COUNT(*) FROM students').fetchone()[0] == 1
+        indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    for index in ['idx_scans_student_unique', 'idx_students_name', 'idx_students_email_queue']:
+        assert index in indexes, indexes
+    print("✅ Data kept, indexes created")
+
+def test_add_column_helper():
+    """add_column is safe to run against a column that already exists"""
+    print("➕ Testing add_column helper...")
+    fresh_db()
+
+    with get_db() as conn:
+        add_column(conn, 'events', 'venue', 'TEXT')
+        add_column(conn, 'events', 'venue', 'TEXT')
+        assert column_exists(conn, 'events', 'venue')
+    print("✅ Column added once")
+
+def test_hot_query_plans():
+    """No hot query does a full table scan or a temp sort"""
+    print("🔍 Testing hot query plans...")
+    fresh_db()
+
+    with get_db() as conn:
+        failures = {}
+        queries = {**HOT_QUERIES, **roster_page_queries()}
+        for name, (sql, params) in queries.items():
+            problems = plan_problems(conn, name, sql, params)
+            if problems:
+                failures[name] = problems
+    assert not failures, failures
+    print(f"✅ {len(queries)} hot queries use indexes")
+
+def main():
+    """Run migration tests"""
+    print("🧪 Schema Migration Tests")
+    print("=" * 50)
+
+    tests = [
+        test_migrations_recorded_once,
+        test_legacy_database_upgrade,
+        test_add_column_helper,
+        test_hot_query_plans,
+    ]
+
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__} failed: {e}")
+
+    print("\n" + "=" * 50)
+    if failed:
+        print(f"❌ {failed} test(s) failed")
+        return 1
+    print("🎉 All migration tests passed!")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Test the cross-worker dashboard snapshot cache
+Worker processes are started with multiprocessing against a temporary database
+"""
+
+import multiprocessing
+import os
+import sys
+import time
+
+from testing import TEST_DIR, numbered_students, roster_client, roster_db
+import database
+from snapshot_cache import SnapshotCache, snapshot_cache
+
+def worker(path, barrier, results):
+    """One 'gunicorn worker': wait for the others, then ask for the same version"""
+    database.configure(path)
+    cache = SnapshotCache(max_age_ms=60000)
+    barrier.wait()
+
+    def compute():
+        time.sleep(0.2)
+        return {'computed_by': os.getpid()}
+    results.put(cache.get('dashboard', (1, 7), compute))
+
+def test_dashboard_uses_cache():
+    """Repeat polls at one version are hits; a check-in yields a fresh snapshot"""
+    print("📸 Testing dashboard snapshots...")
+    client = roster_client(numbered_students(5))
+    client.post('/api/validate_qr', json={'qr_hash': 'hash-001'})
+
+    before = snapshot_cache.stats()
+    first = client.get('/api/dashboard_stats?include_students=0').get_json()
+    second = client.get('/api/dashboard_stats?include_students=0').get_json()
+    assert first == second
+    assert first['stats']['scanned_count'] == 1 and [s['prn'] for s in first['recent_scans']] == ['PRN001']
+
+    client.post('/api/validate_qr', json={'qr_hash': 'hash-003'})
+    third = client.get('/api/dashboard_stats?include_students=0').get_json()
+    assert third['stats']['scanned_count'] == 2
+    assert [s['prn'] for s in third['recent_scans']] == ['PRN003', 'PRN001']
+
+    after = snapshot_cache.stats()
+    assert after['recomputes'] - before['recomputes'] == 2
+    assert after['hits'] - before['hits'] == 1
+    assert after['recomputes_all_workers'] == {'dashboard': 2}
+    print("✅ One recompute per data version")
+
+def test_one_worker_computes():
+    """Processes asking for the same new version compute it once between them"""
+    print("👥 Testing cross-process single computation...")
+    path = roster_db(numbered_students(5))
+    context = multiprocessing.get_context('spawn')
+    barrier = context.Barrier(4)
+    results = context.Queue()
+    processes = [context.Process(target=worker, args=(path, barrier, results)) for _ in range(4)]
+    for process in processes:
+        process.start()
+    snapshots = [results.get(timeout=60) for _ in processes]
+    for process in processes:
+        process.join(timeout=60)
+
+    assert len({s['computed_by'] for s in snapshots}) == 1, snapshots
+    assert SnapshotCache().stats()['recomputes_all_workers'] == {'dashboard': 1}
+    print("✅ Computed once, read by the rest")
+
+def test_staleness_and_versions():
+    """Old snapshots expire, older versions never overwrite newer ones, failures fall back"""
+    print("⏱️  Testing staleness bound...")
+    roster_db(numbered_students(5))
+    cache = SnapshotCache(max_age_ms=50)
+
+    assert cache.get('dashboard', (1, 2), lambda: 'v2') == 'v2'
+    assert cache.get('dashboard', (1, 2), lambda: 'recomputed') == 'v2'
+    # A request still in an older read transaction gets its own answer, not stored
+    assert cache.get('dashboard', (1, 1), lambda: 'v1') == 'v1'
+    assert cache.get('dashboard', (1, 2), lambda: 'recomputed') == 'v2'
+
+    time.sleep(0.1)
+    assert cache.get('dashboard', (1, 2), lambda: 'fresh') == 'fresh'
+    stats = cache.stats()
+    assert stats['expired'] == 1 and stats['recomputes'] == 3 and stats['hits'] == 2
+
+    broken = SnapshotCache(path=os.path.join(TEST_DIR, 'missing', 'dir', 'cache.db'))
+    assert broken.get('dashboard', (1, 2), lambda: 'direct') == 'direct'
+    assert broken.stats()['errors'] == 1
+    print("✅ Bounded, monotonic and optional")
+
+def main():
+    """Run snapshot cache tests"""
+    print("🧪 Snapshot Cache Tests")
+    print("=" * 50)
+
+    tests = [
+        test_dashboard_uses_cache,
+        test_one_worker_computes,
+        test_staleness_and_versions,
+    ]
+
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__} failed: {e}")
+
+    print("\n" + "=" * 50)
+    if failed:
+        print(f"❌ {failed} test(s) failed")
+        return 1
+    print("🎉 All snapshot cache tests passed!")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Test the FTS5 student search index and /api/students/search
+"""
+
+import os
+import sys
+
+from testing import roster_client, roster_db
+from database import get_db
+from app import app
+import student_search
+
+STUDENTS = [
+    ('Asha Patil', 'PRN20250417', 'asha.patil@example.com', 'hash-001'),
+    ('Rohan Patil', 'PRN20250418', 'rohan@example.com', 'hash-002'),
+    ('Deepa Kulkarni', 'PRN20251234', 'deepa@example.com', 'hash-003'),
+    ('Patrick "Pat" Dsouza', 'PRN20259999', 'pat@example.com', None),
+]
+
+def names(conn, q):
+    return [row[1] for row in student_search.search(conn, q)]
+
+def test_triggers_keep_index_in_sync():
+    """Inserts, renames and deletes show up in search straight away"""
+    print("🔄 Testing index sync...")
+    roster_db(STUDENTS)
+
+    with get_db() as conn:
+        assert names(conn, 'kulk') == ['Deepa Kulkarni']
+        conn.execute("UPDATE students SET name = 'Deepa Joshi' WHERE prn_number = 'PRN20251234'")
+        conn.execute("INSERT INTO students (name, prn_number, email) VALUES ('Kulsum Shaikh', 'PRN3', 'k@example.com')")
+        conn.execute("DELETE FROM students WHERE name = 'Rohan Patil'")
+        conn.commit()
+
+        assert names(conn, 'kulk') == []
+        assert names(conn, 'joshi') == ['Deepa Joshi']
+        assert names(conn, 'kuls') == ['Kulsum Shaikh']
+        assert names(conn, 'patil') == ['Asha Patil']
+        conn.execute("INSERT INTO students_fts (students_fts) VALUES ('integrity-check')")
+    print("✅ Index follows the students table")
+
+def test_ranking_and_fragments():
+    """Exact PRN first, then prefixes and PRN endings, then other matches"""
+    print("🏅 Testing ranking...")
+    roster_db(STUDENTS)
+
+    with get_db() as conn:
+        # Exact PRN (any case) ahead of other PRNs sharing the prefix
+        assert names(conn, 'prn20250418') == ['Rohan Patil']
+        assert names(conn, 'prn2025041') == ['Asha Patil', 'Rohan Patil']
+        # Last four digits of the PRN
+        assert names(conn, '1234') == ['Deepa Kulkarni']
+        # Name prefix beats a match in the middle of a name
+        assert names(conn, 'pat') == ['Patrick "Pat" Dsouza', 'Asha Patil', 'Rohan Patil']
+        # Short queries are name prefixes
+        assert names(conn, 'as') == ['Asha Patil']
+        assert names(conn, 'il') == []
+        # Quotes and LIKE wildcards are plain text
+        assert names(conn, '"pat"') == ['Patrick "Pat" Dsouza']
+        assert names(conn, '%a_') == []
+        assert names(conn, '') == []
+    print("✅ Matches ranked as expected")
+
+def test_search_endpoint():
+    """The API returns ranked matches with QR hashes, to admins only"""
+    print("🌐 Testing /api/students/search...")
+    client = roster_client(STUDENTS)
+    client.post('/api/validate_qr', json={'qr_hash': 'hash-001'})
+
+    response = client.get('/api/students/search?q=patil&limit=1')
+    assert response.status_code == 200
+    students = response.get_json()['students']
+    assert len(students) == 1 and students[0]['prn'] == 'PRN20250417', students
+    assert students[0]['qr_hash'] == 'hash-001' and students[0]['status'] == 'Scanned'
+
+    # The dashboard roster filter goes through the same index
+    page = client.get('/api/students?q=PATIL&sort=prn&order=desc').get_json()
+    assert [s['prn'] for s in page['students']] == ['PRN20250418', 'PRN20250417'] and page['total'] == 2
+
+    assert app.test_client().get('/api/students/search?q=patil').status_code == 401
+    print("✅ Endpoint ranked and protected")
+
+def test_scanner_page_requires_login():
+    """The scanner's manual search is admin-only, so the page asks for the same login"""
+    print("🔐 Testing scanner page login...")
+    roster_db(STUDENTS)
+    client = app.test_client()
+    password = os.environ.get('ADMIN_PASSWORD', 'admin123')
+
+    response = client.get('/scanner')
+    assert response.status_code == 302 and response.location.endswith('/admin/login?next=/scanner'), response.location
+
+    response = client.post('/admin/login?next=/scanner', data={'password': password})
+    assert response.status_code == 302 and response.location.endswith('/scanner'), response.location
+    assert client.get('/scanner').status_code == 200
+    assert client.get('/api/students/search?q=patil').status_code == 200
+
+    # Only local paths are followed after login
+    response = app.test_client().post('/admin/login?next=//evil.example', data={'password': password})
+    assert response.location.endswith('/admin'), response.location
+    print("✅ Scanner behind the admin login")
+
+def main():
+    """Run student search tests"""
+    print("🧪 Student Search Tests")
+    print("=" * 50)
+
+    tests = [
+        test_triggers_keep_index_in_sync,
+        test_ranking_and_fragments,
+        test_search_endpoint,
+        test_scanner_page_requires_login,
+    ]
+
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__} failed: {e}")
+
+    print("\n" + "=" * 50)
+    if failed:
+        print(f"❌ {failed} test(s) failed")
+        return 1
+    print("🎉 All student search tests passed!")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
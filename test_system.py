@@ -13,6 +13,17 @@ from datetime import datetime
 
 BASE_URL = 'http://localhost:5000'
 
+def wait_for_job(response, timeout=120):
+    """Follow a 202 background job to the end; its result, or its error"""
+    status_url = f"{BASE_URL}{response.json()['status_url']}"
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = requests.get(status_url, timeout=5).json()
+        if job['status'] not in ('queued', 'running'):
+            return job['result'] if job['status'] == 'succeeded' else {'error': job['error']}
+        time.sleep(1)
+    return {'error': 'Timed out waiting for the job'}
+
 def test_database_connection():
     """Test database connectivity and schema"""
     print("Testing database connection...")
@@ -85,8 +96,8 @@ Test Student 3,TEST003,test3@example.com"""
             files = {'file': ('test_students.csv', f, 'text/csv')}
             response = requests.post(f"{BASE_URL}/api/upload_students", files=files, timeout=10)
         
-        if response.status_code == 200:
-            data = response.json()
+        if response.status_code == 202:
+            data = wait_for_job(response)
             if data.get('success'):
                 print(f"✓ File upload successful - {data.get('inserted', 0)} students inserted")
                 return True
@@ -110,8 +121,8 @@ def test_qr_generation():
     try:
         response = requests.post(f"{BASE_URL}/api/generate_qr_codes", timeout=15)
         
-        if response.status_code == 200:
-            data = response.json()
+        if response.status_code == 202:
+            data = wait_for_job(response)
             if data.get('success'):
                 print(f"✓ QR generation successful - {data.get('generated', 0)} codes generated")
                 
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Shared setup for the test files: throwaway databases, seeded rosters and an admin client
+Import it before app so DATABASE_PATH never points at the real database
+"""
+
+import os
+import tempfile
+
+TEST_DIR = tempfile.mkdtemp(prefix='depali_test_')
+os.environ.setdefault('DATABASE_PATH', os.path.join(TEST_DIR, 'student_event.db'))
+
+import database
+from database import get_db
+from app import app, init_db
+from roster_index import roster_index
+
+# clear_all_data and the QR and upload jobs write to these; keep them off the real folders
+app.config['QR_FOLDER'] = app.config['UPLOAD_FOLDER'] = TEST_DIR
+
+# (name, prn_number, email, qr_hash); ids 1, 2, 3 when seeded in this order
+ASHA = ('Asha Patil', 'PRN001', 'asha@example.com', 'hash-001')
+RAHUL = ('Rahul Deshmukh', 'PRN002', 'rahul@example.com', 'hash-002')
+NEHA = ('Neha Kulkarni', 'PRN003', 'neha@example.com', 'hash-003')
+STUDENTS = [ASHA, RAHUL, NEHA]
+
+
+def numbered_students(count, qr=True):
+    """'Student 0' / PRN000 / student0@example.com rows, with hash-000 style codes unless qr is False"""
+    return [(f'Student {i}', f'PRN{i:03d}', f'student{i}@example.com', f'hash-{i:03d}' if qr else None)
+            for i in range(count)]
+
+
+def fresh_db(path=None):
+    """Point the pool at a new migrated database file (or the one at path); returns its path"""
+    path = path or os.path.join(tempfile.mkdtemp(prefix='depali_test_'), 'student_event.db')
+    database.configure(path)
+    assert init_db()
+    return path
+
+
+def seed_students(rows):
+    """Insert (name, prn_number, email[, qr_hash]) rows and reload the roster index"""
+    with get_db() as conn:
+        conn.executemany('INSERT OR IGNORE INTO students (name, prn_number, email, qr_hash) VALUES (?, ?, ?, ?)',
+                         [tuple(row) + (None,) * (4 - len(row)) for row in rows])
+        conn.commit()
+    roster_index.load()
+
+
+def roster_db(students=(), path=None):
+    """Fresh (or given) database holding students; returns its path"""
+    path = fresh_db(path)
+    seed_students(students)
+    return path
+
+
+def admin_client():
+    """Test client with an authenticated admin session"""
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['admin_authenticated'] = True
+    return client
+
+
+def roster_client(students=()):
+    """Fresh database holding students, and an admin client for it"""
+    roster_db(students)
+    return admin_client()